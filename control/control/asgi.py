@@ -3,6 +3,14 @@ ASGI config for control project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn (in requirements.txt) to get the live list updates
+(server-sent events, trafficApp.views.live_events) and the async views:
+
+    python manage.py serve --host 0.0.0.0 --port 8000
+
+which runs uvicorn with the worker / concurrency settings from settings.py
+(see "Serving" there); plain `uvicorn control.asgi:application` works too.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +20,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'control.settings')
+# route to the async views (settings.ASYNC_VIEWS) and turn on the live
+# updates (settings.LIVE_EVENTS_ENABLED); read when settings load
+os.environ.setdefault('TRAFFIC_ASYNC_VIEWS', '1')
+os.environ.setdefault('TRAFFIC_LIVE_EVENTS', '1')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (configured by get_asgi_application)
+from trafficApp import scheduler  # noqa: E402
+
+scheduler.start_for_serving()
+
+if settings.DEBUG:
+    # what runserver does for WSGI: serve static files in development
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    application = ASGIStaticFilesHandler(application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 from django.conf.global_settings import STATICFILES_DIRS
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'trafficApp.middleware.PerformanceMiddleware',
 ]
 
 ROOT_URLCONF = 'control.urls'
@@ -63,13 +65,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # compile each template once per process (the dev autoreloader
+            # still clears this cache when a template changes)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -80,13 +89,57 @@ WSGI_APPLICATION = 'control.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+SQLITE_DATABASE = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    # TRAFFIC_DB_PATH points the app at another file, e.g. a benchmark database
+    'NAME': os.environ.get('TRAFFIC_DB_PATH', BASE_DIR / 'db.sqlite3'),
+    # Several operators write at once: WAL lets readers run alongside the
+    # writer, BEGIN IMMEDIATE takes the write lock up front (no deadlocking
+    # lock upgrades) and `timeout` is the busy timeout in seconds.
+    # In-process queuing and retries live in trafficApp/utils/writes.py.
+    'OPTIONS': {
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    },
 }
 
+# TRAFFIC_DB_ENGINE=postgres: PostgreSQL through psycopg 3, configured by the
+# TRAFFIC_PG_* variables. Connections come from a pool per process
+# (psycopg_pool, PG_POOL_MIN_SIZE..PG_POOL_MAX_SIZE, waiting up to
+# PG_POOL_TIMEOUT seconds for a free one); TRAFFIC_PG_POOL=0 keeps persistent
+# connections per thread instead. Keep PG_POOL_MAX_SIZE x worker processes
+# under the server's max_connections. Search runs on pg_trgm indexes
+# (trafficApp/utils/search.py). The SQLite file stays reachable as the
+# "sqlite" alias, the source of `manage.py copy_from_sqlite`.
+
+DB_ENGINE = os.environ.get('TRAFFIC_DB_ENGINE', 'sqlite')
+PG_POOL_MIN_SIZE = 2
+PG_POOL_MAX_SIZE = 16
+PG_POOL_TIMEOUT = 10
+
+if DB_ENGINE == 'postgres':
+    _pooled = os.environ.get('TRAFFIC_PG_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('TRAFFIC_PG_NAME', 'traffic'),
+            'USER': os.environ.get('TRAFFIC_PG_USER', 'traffic'),
+            'PASSWORD': os.environ.get('TRAFFIC_PG_PASSWORD', ''),
+            'HOST': os.environ.get('TRAFFIC_PG_HOST', 'localhost'),
+            'PORT': os.environ.get('TRAFFIC_PG_PORT', '5432'),
+            'OPTIONS': {
+                'pool': {'min_size': PG_POOL_MIN_SIZE, 'max_size': PG_POOL_MAX_SIZE, 'timeout': PG_POOL_TIMEOUT},
+            } if _pooled else {},
+            # the pool manages connection lifetimes itself
+            'CONN_MAX_AGE': 0 if _pooled else 60,
+            'CONN_HEALTH_CHECKS': not _pooled,
+        },
+        'sqlite': SQLITE_DATABASE,
+    }
+else:
+    DATABASES = {'default': SQLITE_DATABASE}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,3 +184,134 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Pending deletions
+# Soft-deleted boats are archived this many hours after deletion by a
+# sweeper thread that every serving process (control.wsgi / control.asgi:
+# runserver, `manage.py serve`, uvicorn, gunicorn) runs every
+# AUTO_ARCHIVE_INTERVAL_SECONDS. Management commands never start it. Set
+# TRAFFIC_AUTO_ARCHIVE_INTERVAL=0 to turn it off, e.g. when cron runs
+# `manage.py archive_expired` instead.
+
+PENDING_DELETION_RETENTION_HOURS = 48
+AUTO_ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('TRAFFIC_AUTO_ARCHIVE_INTERVAL', 300))
+
+
+# Performance metrics
+# Server-Timing header (with DEBUG on, or for staff users) and per-URL-name
+# histograms at /metrics/ (staff only), with the SQL of the slowest queries
+# at /metrics/slow/. False takes the middleware out of the chain.
+# Requests slower than PERF_SLOW_REQUEST_MS are logged with their slowest
+# queries (None: never).
+
+PERF_METRICS_ENABLED = True
+PERF_METRICS_WINDOW_SECONDS = 15 * 60
+PERF_SLOW_REQUEST_MS = 1000
+
+# List tables
+# Rows of the list pages are built by the compiled renderers in
+# trafficApp/utils/rows.py; False renders every row through its _row.html
+# partial instead (same HTML, much slower on large pages).
+
+FAST_ROW_RENDERING = True
+
+# Imports
+# Uploads to /import/ larger than IMPORT_INLINE_MAX_BYTES are imported by a
+# thread of the receiving process instead of inside the request
+# (trafficApp/utils/importer.py), and /import/<id>/ shows their progress.
+# A traffic log of 100k rows takes about half a minute. Jobs of a process
+# that is stopped mid-import stay unfinished; the chunks imported so far
+# are kept.
+
+IMPORT_INLINE_MAX_BYTES = 256 * 1024
+
+# Live updates
+# Open list pages get traffic / boat changes pushed over server-sent events
+# (trafficApp/utils/live.py; needs the ASGI server, see control/asgi.py).
+# Each process polls the event log every LIVE_EVENTS_POLL_SECONDS for
+# changes made by other processes; its own changes are sent immediately.
+# Ids that commit out of order are looked for again for
+# LIVE_EVENTS_GAP_SECONDS. The log keeps the last LIVE_EVENTS_RETAIN events
+# for reconnecting clients.
+# Every write also writes an event, so this is on by default only with the
+# ASGI profile, which sets TRAFFIC_LIVE_EVENTS=1 (control/asgi.py, `manage.py
+# serve`). Set it for management commands too (import_legacy, move_to_cold)
+# to have their changes pushed.
+
+LIVE_EVENTS_ENABLED = os.environ.get('TRAFFIC_LIVE_EVENTS') == '1'
+LIVE_EVENTS_POLL_SECONDS = 1.0
+LIVE_EVENTS_GAP_SECONDS = 10
+LIVE_EVENTS_KEEPALIVE_SECONDS = 15
+LIVE_EVENTS_RETAIN = 10_000
+
+# Occupancy
+# /occupancy/ answers "which boats were in at time T" from the traffic log
+# (trafficApp/utils/occupancy.py), starting from the latest snapshot before
+# T. Snapshots are OCCUPANCY_SNAPSHOT_DAYS apart: fewer days, less to replay
+# per query but more rows. Run `manage.py rebuild_occupancy --extend` daily.
+
+OCCUPANCY_SNAPSHOT_DAYS = 7
+
+# Cold tier
+# `manage.py move_to_cold` moves traffic older than TIERING_HOT_DAYS and
+# archived boats without recent traffic out of the tables the daily pages
+# read, into ColdTrafficEntry / ColdBoat (trafficApp/utils/tiering.py), in
+# transactions of TIERING_CHUNK_SIZE rows. /history/, the admin, occupancy
+# and reports read both tiers. Run it from cron, e.g. weekly.
+
+TIERING_HOT_DAYS = int(os.environ.get('TRAFFIC_HOT_DAYS', 730))
+TIERING_CHUNK_SIZE = 2000
+
+# Reports
+# /reports/occupancy/ results are cached (default cache) per date range and
+# grouping, keyed on the latest live event, so changes made through the app
+# are seen at once; REPORT_CACHE_SECONDS caps how long other changes
+# (raw SQL, bulk scripts) can stay unseen.
+
+REPORT_CACHE_SECONDS = 600
+
+# Analytics
+# `manage.py export_analytics` keeps a columnar copy of the traffic log in
+# ANALYTICS_DIR (NumPy arrays per month, trafficApp/analytics/), rewriting
+# only the months that changed; trafficApp.analytics.query aggregates over
+# it without touching the database.
+
+ANALYTICS_DIR = Path(os.environ.get('TRAFFIC_ANALYTICS_DIR', BASE_DIR / 'analytics'))
+
+# List cache
+# GET results of the boat / traffic / pending-deletion lists are cached per
+# query string until a write changes the model they list
+# (trafficApp/utils/listcache.py). Each process keeps at most
+# LIST_CACHE_MAX_ENTRIES results and LIST_CACHE_MAX_BYTES (pickled), least
+# recently used out first. LIST_CACHE_ALIAS: a CACHES alias to share results
+# between worker processes (e.g. a FileBasedCache); None keeps them local.
+# TRAFFIC_LIST_CACHE=0 turns it off (the server load benchmark does).
+
+LIST_CACHE_ENABLED = os.environ.get('TRAFFIC_LIST_CACHE', '1') == '1'
+LIST_CACHE_MAX_ENTRIES = 256
+LIST_CACHE_MAX_BYTES = 32 * 1024 * 1024
+LIST_CACHE_ALIAS = None
+
+# Serving
+# `manage.py serve` runs uvicorn (trafficApp/management/commands/serve.py).
+# The default ASGI profile (control/asgi.py) sets TRAFFIC_ASYNC_VIEWS=1, which
+# routes the list pages, traffic create and the boat endpoints to their async
+# views; WSGI servers keep the sync ones. Each async request runs its sync
+# parts (templates, transactions) in a thread of its own, so
+# ASGI_LIMIT_CONCURRENCY also bounds the threads and SQLite connections per
+# worker process; beyond it uvicorn answers 503. SQLite has one writer, so
+# more processes mostly add lock waits on write-heavy loads.
+
+ASYNC_VIEWS = os.environ.get('TRAFFIC_ASYNC_VIEWS') == '1'
+ASGI_WORKERS = None             # None: one per CPU
+ASGI_LIMIT_CONCURRENCY = 64
+ASGI_BACKLOG = 256
+ASGI_KEEPALIVE_SECONDS = 5
+
+# Typeahead
+# /typeahead/ answers from a prefix index of the boat registry kept in each
+# process (trafficApp/utils/typeahead.py), rebuilt on the first lookup after
+# a boat changes. At most TYPEAHEAD_LIMIT boats per answer.
+
+TYPEAHEAD_LIMIT = 10
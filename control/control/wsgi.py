@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'control.settings')
 
 application = get_wsgi_application()
+
+from trafficApp import scheduler  # noqa: E402  (needs the app registry)
+
+scheduler.start_for_serving()
@@ -1,7 +1,35 @@
 from django.contrib import admin
-from .models import Boat, TrafficEntry
+from .models import Boat, ColdBoat, ColdTrafficEntry, TrafficEntry, DailyTrafficSummary
 
 
 admin.site.register(Boat)
 admin.site.register(TrafficEntry)
-# Register your models here.
+admin.site.register(DailyTrafficSummary)
+
+
+class ColdTierAdmin(admin.ModelAdmin):
+    # rows moved out by `manage.py move_to_cold`: searchable, never edited
+    list_display = ("id", "name", "berth", "boatType", "moved_at")
+    search_fields = ("name", "berth")
+    list_filter = ("boatType",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ColdBoat)
+class ColdBoatAdmin(ColdTierAdmin):
+    list_display = ("id", "name", "berth", "boatType", "archived_at", "moved_at")
+
+
+@admin.register(ColdTrafficEntry)
+class ColdTrafficEntryAdmin(ColdTierAdmin):
+    list_display = ("id", "trDate", "trTime", "name", "berth", "direction", "trafficBoatId", "moved_at")
+    list_filter = ("direction", "boatType")
+    date_hierarchy = "trDate"
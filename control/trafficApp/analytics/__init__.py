@@ -0,0 +1,21 @@
+"""
+Columnar snapshot of the traffic log for long-range analytics.
+
+    snapshot.py - exports both tiers of the log (utils/tiering.py) into one
+                  directory of NumPy columns per month, rewriting only the
+                  months that changed (manage.py export_analytics)
+    query.py    - aggregations over the snapshot through memory-mapped
+                  columns; reads files only, never the database
+
+Year-over-year questions (movements per month, passengers by purpose,
+busiest hours) then cost a pass over a few small arrays instead of ORM
+loops competing with the operators for the database:
+
+    python manage.py export_analytics          # cron, e.g. nightly
+    >>> from trafficApp.analytics import query
+    >>> snap = query.Snapshot()
+    >>> snap.aggregate("month", measure="passengers", start="2024-01")
+    >>> query.busiest_hours(snap, direction="out")
+
+Needs numpy (requirements.txt).
+"""
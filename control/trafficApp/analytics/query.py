@@ -0,0 +1,136 @@
+# trafficApp/analytics/query.py
+"""
+Aggregations over the columnar snapshot (analytics/snapshot.py).
+
+Only the snapshot directory is read: the manifest, then each month's
+columns through np.load(mmap_mode="r"), so a query maps what it touches and
+the operating system shares the pages between processes. Nothing here
+imports the models or opens a database connection.
+
+Every aggregation is one np.bincount per month over integer codes, plus
+a mask when filtered; month and year totals only need the mask's count.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+MEASURES = ("movements", "passengers")
+GROUPINGS = ("month", "year", "weekday", "hour", "direction", "boatType", "purpose", "berth")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+class Snapshot:
+    """One export, as listed by its manifest when opened."""
+
+    def __init__(self, path=None):
+        self.root = Path(path or settings.ANALYTICS_DIR)
+        try:
+            manifest = json.loads((self.root / "manifest.json").read_text())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No analytics snapshot in {self.root} (run manage.py export_analytics).")
+        self.exported_at = manifest["exported_at"]
+        self.months = sorted(manifest["months"])
+        self.rows = {month: info["rows"] for month, info in manifest["months"].items()}
+        self.dictionaries = manifest["dictionaries"]
+        self._columns = {}
+
+    def __len__(self):
+        return sum(self.rows.values())
+
+    def column(self, month, name):
+        """A month's column, memory-mapped on first use."""
+        key = (month, name)
+        if key not in self._columns:
+            self._columns[key] = np.load(self.root / month / f"{name}.npy", mmap_mode="r")
+        return self._columns[key]
+
+    def select(self, start=None, end=None):
+        """The exported months from `start` to `end` ('YYYY-MM', dates, or None), inclusive."""
+        start = _month(start) if start else None
+        end = _month(end) if end else None
+        return [m for m in self.months if (start is None or m >= start) and (end is None or m <= end)]
+
+    def code(self, name, value):
+        """The code of `value` in a dictionary-encoded column, or -1 if it never occurs."""
+        try:
+            return self.dictionaries[name].index(value)
+        except ValueError:
+            return -1
+
+    def aggregate(self, by, *, measure="movements", start=None, end=None, direction=None, boat_type=None):
+        """
+        Movements (or passengers) per `by` over the months start..end,
+        optionally only one direction / boat type: {key: total}, keys in
+        order, zero totals left out. Month keys are 'YYYY-MM', years ints,
+        weekdays 'Mon'.., hours 0-23 (untimed entries are left out), the
+        rest the column's values.
+        """
+        if by not in GROUPINGS:
+            raise ValueError(f"Unknown grouping {by!r}; one of {', '.join(GROUPINGS)}.")
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}; one of {', '.join(MEASURES)}.")
+        filters = [(name, self.code(name, value)) for name, value in (("direction", direction),
+                                                                     ("boatType", boat_type)) if value]
+        if by in ("month", "year"):
+            totals = {}
+        elif by == "weekday":
+            totals = np.zeros(7, dtype=np.int64)
+        elif by == "hour":
+            totals = np.zeros(24, dtype=np.int64)
+        else:
+            totals = np.zeros(len(self.dictionaries[by]), dtype=np.int64)
+
+        for month in self.select(start, end):
+            mask = None
+            for name, code in filters:
+                match = self.column(month, name) == code
+                mask = match if mask is None else mask & match
+            weights = self.column(month, "passengers") if measure == "passengers" else None
+
+            if by in ("month", "year"):
+                key = month if by == "month" else int(month[:4])
+                if weights is None:
+                    value = self.rows[month] if mask is None else int(np.count_nonzero(mask))
+                else:
+                    value = int(weights.sum(dtype=np.int64) if mask is None else weights[mask].sum(dtype=np.int64))
+                totals[key] = totals.get(key, 0) + value
+                continue
+
+            if by == "weekday":
+                keys = (self.column(month, "day").astype(np.int64) + 3) % 7    # 1970-01-01 was a Thursday
+            elif by == "hour":
+                minute = self.column(month, "minute")
+                timed = minute >= 0
+                mask = timed if mask is None else mask & timed
+                keys = minute // 60
+            else:
+                keys = self.column(month, by)
+            if mask is not None:
+                keys = keys[mask]
+                weights = weights[mask] if weights is not None else None
+            totals += np.bincount(keys, weights=weights, minlength=len(totals))[:len(totals)].astype(np.int64)
+
+        if isinstance(totals, dict):
+            return {key: value for key, value in sorted(totals.items()) if value}
+        labels = WEEKDAYS if by == "weekday" else range(24) if by == "hour" else self.dictionaries[by]
+        return {label: int(value) for label, value in zip(labels, totals) if value}
+
+
+def _month(value):
+    return value if isinstance(value, str) else value.strftime("%Y-%m")
+
+
+def movements_per_month(snapshot=None, **filters):
+    return (snapshot or Snapshot()).aggregate("month", **filters)
+
+
+def passengers_by_purpose(snapshot=None, **filters):
+    return (snapshot or Snapshot()).aggregate("purpose", measure="passengers", **filters)
+
+
+def busiest_hours(snapshot=None, **filters):
+    """Movements per hour of the day, busiest first."""
+    hours = (snapshot or Snapshot()).aggregate("hour", **filters)
+    return dict(sorted(hours.items(), key=lambda item: -item[1]))
@@ -0,0 +1,235 @@
+# trafficApp/analytics/snapshot.py
+"""
+Export the traffic log into ANALYTICS_DIR, one directory per month:
+
+    manifest.json           what was exported, from which source version
+    2025-07/id.npy          one .npy per column, COLUMNS order and dtypes
+    2025-07/day.npy ...
+
+An entry's month is the month of trDate (occurred_at is trDate + trTime,
+so it always falls on the same local day). Entries without a date are not
+exported. Text columns are dictionary-encoded: the manifest lists each
+column's values once and the arrays hold their positions, codes that stay
+stable from one export to the next.
+
+Exports are incremental. A run that finds TrafficEntry's list cache version
+(utils/listcache.py, bumped by every write path) unchanged does nothing
+else. Otherwise each month's signature, its row count and id sum over both
+tiers plus its DailyTrafficSummary counters, is compared with the one
+exported, and only months whose signature changed are rewritten, along
+with the current and previous month, where corrections that leave the
+counters alone (a purpose, a time) usually land; --full rewrites
+everything. The database is read in keyset chunks, short reads that WAL
+lets run next to the writer; queries (query.py) read only the files.
+
+A month is written to a temporary directory and swapped in, and the
+manifest is replaced last, so a reader sees either the old export or the
+new one.
+"""
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, Count, Func, Sum
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMinute
+from django.utils import timezone
+
+from ..models import ColdTrafficEntry, DailyTrafficSummary, TrafficEntry
+from ..utils import listcache
+
+FORMAT = 1
+CHUNK_SIZE = 5000
+MANIFEST = "manifest.json"
+
+# column -> dtype; minute is the minute of the day of trTime, -1 when untimed;
+# boat is 0 for entries without one, passengers 0 when not recorded
+COLUMNS = {
+    "id":         "int64",
+    "day":        "datetime64[D]",
+    "minute":     "int16",
+    "direction":  "uint8",
+    "boatType":   "uint8",
+    "passengers": "int32",
+    "purpose":    "uint32",
+    "berth":      "uint32",
+    "boat":       "int64",
+}
+ENCODED = ("direction", "boatType", "purpose", "berth")
+TIERS = (TrafficEntry, ColdTrafficEntry)
+
+
+class Month(Func):
+    """'YYYY-MM' of a date column, computed by the database."""
+    output_field = CharField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # dates are stored as ISO text
+        return self.as_sql(compiler, connection, template="substr(%(expressions)s, 1, 7)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="to_char(%(expressions)s, 'YYYY-MM')", **extra_context)
+
+
+@dataclass
+class ExportReport:
+    written: list = field(default_factory=list)     # months (re)written
+    removed: list = field(default_factory=list)     # months that no longer have traffic
+    rows: int = 0                                   # rows written
+    unchanged: bool = False                         # nothing was written since the last export
+
+
+def directory(path=None):
+    return Path(path or settings.ANALYTICS_DIR)
+
+
+def read_manifest(root):
+    try:
+        return json.loads((root / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def signatures():
+    """{month: [rows, id sum, *summary counters]} of the whole log, both tiers."""
+    found = {}
+    for model in TIERS:
+        rows = (
+            model.objects.filter(trDate__isnull=False)
+            .annotate(month=Month("trDate"))
+            .values("month")
+            .annotate(rows=Count("id"), ids=Sum("id"))
+            .order_by()
+        )
+        for row in rows:
+            signature = found.setdefault(row["month"], [0, 0])
+            signature[0] += row["rows"]
+            signature[1] += int(row["ids"])      # numeric on PostgreSQL
+    counters = [f.name for f in DailyTrafficSummary._meta.fields if f.name not in ("id", "day")]
+    summed = {}
+    for day, *values in DailyTrafficSummary.objects.order_by().values_list("day", *counters):
+        totals = summed.setdefault(day.strftime("%Y-%m"), [0] * len(counters))
+        for i, value in enumerate(values):
+            totals[i] += value
+    return {month: signature + summed.get(month, [0] * len(counters)) for month, signature in found.items()}
+
+
+def _fetch(model, first, last):
+    """One tier's rows of the month [first, last) as chunks of raw DB values, in COLUMNS order."""
+    qs = (
+        model.objects.filter(trDate__gte=first, trDate__lt=last)
+        .annotate(
+            minute_of_day=Coalesce(ExtractHour("trTime") * 60 + ExtractMinute("trTime"), -1),
+            boat=Coalesce("trafficBoatId", 0),
+            pax=Coalesce("passengers", 0),
+        )
+        .order_by("trDate", "id")
+        .values_list("id", "trDate", "minute_of_day", "direction", "boatType", "pax", "purpose", "berth", "boat")
+    )
+    sql, params = qs.query.sql_with_params()
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while chunk := cursor.fetchmany(CHUNK_SIZE):
+            yield chunk
+
+
+def read_month(month, dictionaries):
+    """The month's columns as arrays, sorted by (day, id); new text values are added to `dictionaries`."""
+    year, number = map(int, month.split("-"))
+    first = date(year, number, 1)
+    last = (first + timedelta(days=32)).replace(day=1)
+    lookups = {name: {value: code for code, value in enumerate(dictionaries[name])} for name in ENCODED}
+    values = {name: [] for name in COLUMNS}
+    names = list(COLUMNS)
+
+    for model in TIERS:
+        for chunk in _fetch(model, first, last):
+            for name, column in zip(names, zip(*chunk)):
+                if name in lookups:
+                    lookup, known = lookups[name], dictionaries[name]
+                    codes = []
+                    for value in column:
+                        value = value or ""
+                        code = lookup.get(value)
+                        if code is None:
+                            code = lookup[value] = len(known)
+                            known.append(value)
+                        codes.append(code)
+                    column = codes
+                values[name].extend(column)
+
+    arrays = {name: np.array(values[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+    order = np.lexsort((arrays["id"], arrays["day"]))
+    return {name: array[order] for name, array in arrays.items()}
+
+
+def write_month(root, month, arrays):
+    """Write the month's columns next to the old ones, then swap the directories."""
+    staging, final, old = root / f"{month}.tmp", root / month, root / f"{month}.old"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    for name, array in arrays.items():
+        np.save(staging / f"{name}.npy", array)
+    shutil.rmtree(old, ignore_errors=True)
+    if final.exists():
+        final.rename(old)
+    staging.rename(final)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_manifest(root, manifest):
+    staging = root / f"{MANIFEST}.tmp"
+    staging.write_text(json.dumps(manifest, indent=1))
+    os.replace(staging, root / MANIFEST)
+
+
+def export(path=None, *, full=False, today=None, progress=None):
+    """Bring the snapshot in `path` (default ANALYTICS_DIR) up to date; returns an ExportReport."""
+    root = directory(path)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(root)
+    if full or manifest.get("format") != FORMAT:
+        manifest = {}
+    report = ExportReport()
+
+    # read before the data: a write during the export leaves the next run something to do
+    version = listcache.versions(TrafficEntry)[0]
+    if manifest.get("source_version") == version:
+        report.unchanged = True
+        return report
+
+    today = today or timezone.localdate()
+    recent = {today.strftime("%Y-%m"), (today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")}
+    months = manifest.get("months", {})
+    dictionaries = manifest.get("dictionaries") or {name: [] for name in ENCODED}
+    current = signatures()
+
+    for month, signature in sorted(current.items()):
+        if month not in recent and months.get(month, {}).get("signature") == signature:
+            continue
+        arrays = read_month(month, dictionaries)
+        write_month(root, month, arrays)
+        months[month] = {"rows": len(arrays["id"]), "signature": signature}
+        report.written.append(month)
+        report.rows += len(arrays["id"])
+        if progress:
+            progress(month, len(arrays["id"]))
+    for month in sorted(set(months) - set(current)):
+        shutil.rmtree(root / month, ignore_errors=True)
+        del months[month]
+        report.removed.append(month)
+
+    write_manifest(root, {
+        "format": FORMAT,
+        "source_version": version,
+        "exported_at": timezone.now().isoformat(),
+        "columns": COLUMNS,
+        "dictionaries": dictionaries,
+        "months": months,
+    })
+    return report
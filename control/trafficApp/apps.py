@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class TrafficappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trafficApp'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401  (connects the receivers)
+
+        post_migrate.connect(signals.install_search_index, sender=self)
+        # the auto-archive sweeper is started by the WSGI / ASGI entry points
+        # (scheduler.start_for_serving), not here: ready() runs in every
+        # process, migrate and shell included
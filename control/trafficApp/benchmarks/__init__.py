@@ -0,0 +1,26 @@
+"""
+Synthetic-data benchmarks for the list and write endpoints.
+
+    seed.py     - realistic boats / traffic volumes (manage.py seed_benchmark)
+    harness.py  - latency percentiles, query counts and peak memory per
+                  scenario, compared with a stored JSON baseline
+                  (manage.py run_benchmark)
+    load.py     - requests/second and latency of real servers under
+                  concurrent load (manage.py benchmark_servers)
+
+Point the app at a scratch database first; seeding refuses to touch a
+database that already has data:
+
+    TRAFFIC_DB_PATH=/tmp/bench.sqlite3 python manage.py migrate
+    TRAFFIC_DB_PATH=/tmp/bench.sqlite3 python manage.py seed_benchmark
+    TRAFFIC_DB_PATH=/tmp/bench.sqlite3 python manage.py run_benchmark \
+        --baseline trafficApp/benchmarks/baseline.json --output results.json
+
+To compare with PostgreSQL, copy the same data over and rerun (the "sqlite"
+alias reads TRAFFIC_DB_PATH):
+
+    export TRAFFIC_DB_ENGINE=postgres TRAFFIC_PG_USER=... TRAFFIC_DB_PATH=/tmp/bench.sqlite3
+    python manage.py migrate && python manage.py copy_from_sqlite
+    python manage.py run_benchmark --only search --no-writes        # search latency
+    python manage.py benchmark_servers --profile wsgi --mix write=1  # write throughput
+"""
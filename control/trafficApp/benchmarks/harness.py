@@ -0,0 +1,292 @@
+# trafficApp/benchmarks/harness.py
+"""
+Latency / query-count / memory benchmark of the list and write endpoints.
+
+Every scenario is a request through the full Django stack (test Client:
+middleware, view, template). Each one is warmed up, then timed `repeat`
+times without instrumentation; one extra instrumented run records the
+number of SQL queries and the peak Python memory (tracemalloc) of a request.
+
+Write scenarios restore what they change (deleted boats are undeleted,
+created traffic is removed afterwards) so the dataset stays comparable
+between runs.
+
+The list cache (utils/listcache.py) is off except in the "_cached"
+scenarios: everything else measures the queries behind a list, which is
+what a cache miss costs.
+"""
+import json
+import platform
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import django
+from django.db import connection
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Boat, DailyTrafficSummary, TrafficEntry
+from ..utils.paginators import KeysetPaginator
+from ..views import SORT_MAP
+
+PERCENTILES = (50, 90, 95, 99)
+REGRESSION_RATIO = 1.25  # p50 / p95 slower than baseline by more than this
+PER = 50
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    url: str                 # path, or a url name when prepare() supplies a "pk"
+    params: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    prepare: object = None   # callable -> {"pk": url arg, "data": extra params} for one run
+    cleanup: object = None   # callable(prepared, response) after each run
+    settings: dict = field(default_factory=dict)   # overridden while it runs
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# ---- scenarios ----
+def list_scenarios(*, sort_keys=None, deep_fraction=0.9):
+    """GET scenarios for every list mode; deep pages sit at `deep_fraction`."""
+    scenarios = [
+        Scenario("boats", "get", reverse("boats")),
+        Scenario("pending_deletions", "get", reverse("pending-deletions")),
+        Scenario("traffic_day_latest", "get", reverse("traffic")),
+    ]
+    traffic = reverse("traffic")
+
+    first = DailyTrafficSummary.objects.order_by("day").values_list("day", flat=True).first()
+    last = DailyTrafficSummary.objects.order_by("-day").values_list("day", flat=True).first()
+    if first and last:
+        deep_day = last - timedelta(days=int((last - first).days * deep_fraction))
+        scenarios.append(Scenario("traffic_day_deep", "get", traffic, {"day": deep_day.isoformat()}))
+
+    total = TrafficEntry.objects.count()
+    deep_page = max(1, int(total / PER * deep_fraction))
+    for key in sort_keys or SORT_MAP:
+        for direction in ("asc", "desc"):
+            params = {"mode": "per", "per": PER, "sort": key, "dir": direction}
+            scenarios.append(Scenario(f"traffic_per_{key}_{direction}_p1", "get", traffic, dict(params)))
+            scenarios.append(Scenario(f"traffic_per_{key}_{direction}_deep", "get", traffic,
+                                      {**params, "page": deep_page}))
+
+            # cursor mode: a cursor pointing deep into the same ordering
+            paginator = KeysetPaginator(TrafficEntry.objects.all(), per=PER,
+                                        field=SORT_MAP[key], direction=direction)
+            row = _row_at(key, direction, int(total * deep_fraction))
+            cursor_params = {"mode": "cursor", "per": PER, "sort": key, "dir": direction}
+            if row is not None:
+                cursor_params["cursor"] = paginator.encode_cursor(row, paginator.NEXT)
+            scenarios.append(Scenario(f"traffic_cursor_{key}_{direction}_deep", "get", traffic, cursor_params))
+
+    sample = TrafficEntry.objects.exclude(name="").values_list("name", flat=True).first()
+    if sample:
+        term = sample[:3].lower()
+        scenarios.append(Scenario("traffic_search_day", "get", traffic, {"q": term}))
+        scenarios.append(Scenario("traffic_search_per", "get", traffic, {"q": term, "mode": "per", "per": PER}))
+        scenarios.append(Scenario("boats_search", "get", reverse("boats"), {"q": term}))
+
+    # repeat requests answered from the list cache
+    cached = {"LIST_CACHE_ENABLED": True}
+    scenarios += [
+        Scenario("boats_cached", "get", reverse("boats"), settings=cached),
+        Scenario("pending_deletions_cached", "get", reverse("pending-deletions"), settings=cached),
+        Scenario("traffic_day_latest_cached", "get", traffic, settings=cached),
+        Scenario("traffic_per_occurred_at_desc_p1_cached", "get", traffic,
+                 {"mode": "per", "per": PER, "sort": "occurred_at", "dir": "desc"}, settings=cached),
+    ]
+    return scenarios
+
+
+def _row_at(key, direction, offset):
+    field_name = SORT_MAP[key]
+    order = ([F(field_name).asc(nulls_last=True), "id"] if direction == "asc"
+             else [F(field_name).desc(nulls_last=True), "-id"])
+    return TrafficEntry.objects.order_by(*order)[offset:offset + 1].first()
+
+
+def write_scenarios():
+    """POST scenarios; each run restores the state it changed."""
+    def pick_visible():
+        pk = Boat.objects.visible().order_by("?").values_list("pk", flat=True).first()
+        return {"pk": pk}
+
+    def pick_pending():
+        pk = pick_visible()["pk"]
+        Boat.all_objects.filter(pk=pk).update(deleted=True, deleted_at=timezone.now())
+        return {"pk": pk}
+
+    def undelete(prepared, resp):
+        Boat.all_objects.filter(pk=prepared["pk"]).update(
+            deleted=False, deleted_at=None, archived=False, archived_at=None)
+
+    def traffic_form():
+        boat = Boat.objects.visible().order_by("?").first()
+        return {"data": {
+            "boatType": boat.boatType, "name": boat.name, "berth": boat.berth,
+            "trDate": timezone.localdate().isoformat(), "trTime": "12:00",
+            "direction": "in", "passengers": 2, "boat_id": boat.pk,
+        }}
+
+    def remove_created(prepared, resp):
+        # deleted through the ORM so the daily summary follows
+        if resp is not None and resp.status_code == 200:
+            TrafficEntry.objects.get(pk=resp.json()["id"]).delete()
+
+    return [
+        Scenario("traffic_create", "post", reverse("traffic-create"),
+                 headers={"X-Requested-With": "XMLHttpRequest"},
+                 prepare=traffic_form, cleanup=remove_created),
+        Scenario("boat_soft_delete", "post", "boat-soft-delete", prepare=pick_visible, cleanup=undelete),
+        Scenario("boat_archive", "post", "boat-archive", prepare=pick_pending, cleanup=undelete),
+        Scenario("boat_cancel_delete", "post", "boat-cancel-delete", prepare=pick_pending, cleanup=undelete),
+    ]
+
+
+# ---- running ----
+def _request(client, scenario, prepared):
+    url = scenario.url
+    data = dict(scenario.params)
+    if prepared:
+        if "pk" in prepared:
+            url = reverse(scenario.url, args=[prepared["pk"]])
+        data.update(prepared.get("data", {}))
+    send = client.get if scenario.method == "get" else client.post
+    return send(url, data, headers=scenario.headers)
+
+
+def _once(client, scenario, *, instrument=False):
+    """One request: (seconds, status), or (queries, peak bytes, status) if instrumented."""
+    prepared = scenario.prepare() if scenario.prepare else None
+    resp = None
+    try:
+        if not instrument:
+            started = time.perf_counter()
+            resp = _request(client, scenario, prepared)
+            if getattr(resp, "streaming", False):
+                b"".join(resp.streaming_content)
+            return time.perf_counter() - started, resp.status_code
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = _request(client, scenario, prepared)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return len(ctx.captured_queries), peak, resp.status_code
+    finally:
+        if scenario.cleanup:
+            scenario.cleanup(prepared, resp)
+
+
+def run_scenario(client, scenario, *, repeat=20, warmup=2):
+    with override_settings(**scenario.settings):
+        return _run_scenario(client, scenario, repeat=repeat, warmup=warmup)
+
+
+def _run_scenario(client, scenario, *, repeat, warmup):
+    for _ in range(warmup):
+        _once(client, scenario)
+    timings, statuses = [], set()
+    for _ in range(repeat):
+        elapsed, status = _once(client, scenario)
+        timings.append(elapsed * 1000)
+        statuses.add(status)
+    queries, peak, status = _once(client, scenario, instrument=True)
+    statuses.add(status)
+    timings.sort()
+    result = {f"p{pct}_ms": round(_percentile(timings, pct), 3) for pct in PERCENTILES}
+    result.update({
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(timings[-1], 3),
+        "runs": repeat,
+        "queries": queries,
+        "peak_kb": round(peak / 1024, 1),
+        "status": sorted(statuses),
+    })
+    return result
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "boats": Boat.all_objects.count(),
+        "traffic_entries": TrafficEntry.objects.count(),
+    }
+
+
+def run(*, repeat=20, warmup=2, include=None, sort_keys=None, writes=True, progress=None):
+    """Run every scenario; returns the results document (JSON-serialisable)."""
+    client = Client()
+    results = {}
+    with override_settings(ALLOWED_HOSTS=["testserver"], LIST_CACHE_ENABLED=False):
+        scenarios = list_scenarios(sort_keys=sort_keys)
+        if writes:
+            scenarios += write_scenarios()
+        for scenario in scenarios:
+            if include and not any(part in scenario.name for part in include):
+                continue
+            results[scenario.name] = run_scenario(client, scenario, repeat=repeat, warmup=warmup)
+            if progress:
+                progress(scenario.name, results[scenario.name])
+    return {"environment": environment(), "scenarios": results}
+
+
+def compare(results, baseline, *, ratio=REGRESSION_RATIO):
+    """
+    Per-scenario comparison with a baseline document. A scenario regresses
+    when its p50 or p95 is more than `ratio` times the baseline's, or when it
+    runs more queries than it used to.
+    """
+    rows = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            rows.append({"scenario": name, "status": "new"})
+            continue
+        p50 = current["p50_ms"] / base["p50_ms"] if base["p50_ms"] else None
+        p95 = current["p95_ms"] / base["p95_ms"] if base["p95_ms"] else None
+        regressed = (
+            (p50 is not None and p50 > ratio)
+            or (p95 is not None and p95 > ratio)
+            or current["queries"] > base["queries"]
+        )
+        rows.append({
+            "scenario": name,
+            "status": "regressed" if regressed else "ok",
+            "p50_ratio": round(p50, 2) if p50 else None,
+            "p95_ratio": round(p95, 2) if p95 else None,
+            "queries": (base["queries"], current["queries"]),
+        })
+    return rows
+
+
+def load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def dump(document, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=2, sort_keys=True)
+        fh.write("\n")
@@ -0,0 +1,204 @@
+# trafficApp/benchmarks/load.py
+"""
+Requests/second and latency of the real servers under concurrent load:
+the WSGI profile (sync views, uvicorn's thread pool) against the ASGI one
+(async views), both started through `manage.py serve` on the current
+database.
+
+`concurrency` clients keep one request each in flight for `duration`
+seconds, with their own keep-alive connection and CSRF cookie. Each picks
+its next request from a weighted mix:
+
+* traffic   a random page of the traffic list (per-page mode);
+* boats     the boat list as JSON for a random name prefix;
+* pending   the pending deletions page;
+* write     soft-delete, then cancel-delete, of a boat the client owns, so
+            the registry ends up as it started.
+
+`mix` changes the weights; {"write": 1} measures concurrent-write
+throughput alone, e.g. SQLite (one writer) against PostgreSQL (row locks).
+The list cache is off in the servers (TRAFFIC_LIST_CACHE=0), as in the
+latency harness, so every GET pays for its queries.
+"""
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.urls import reverse
+
+from ..models import Boat, TrafficEntry
+from .harness import _percentile
+
+MIX = {"traffic": 4, "boats": 3, "pending": 1, "write": 2}
+PROFILES = ("wsgi", "asgi")
+PER = 50
+
+
+@dataclass
+class Targets:
+    """What the clients request, chosen up front from the database."""
+    traffic_pages: int
+    prefixes: list
+    boats: list                    # visible boat ids, one per writing client
+    urls: dict = field(default_factory=dict)
+
+
+def targets(concurrency):
+    pages = max(1, -(-TrafficEntry.objects.count() // PER))
+    names = list(Boat.objects.visible().values_list("name", flat=True)[:500])
+    prefixes = sorted({name[:2] for name in names if len(name) >= 2}) or ["A"]
+    boats = list(Boat.objects.visible().order_by("?").values_list("pk", flat=True)[:concurrency])
+    urls = {
+        "traffic": reverse("traffic"),
+        "boats": reverse("boats"),
+        "pending": reverse("pending-deletions"),
+        "soft_delete": reverse("boat-soft-delete", args=[0]),
+        "cancel_delete": reverse("boat-cancel-delete", args=[0]),
+    }
+    return Targets(pages, prefixes, boats, urls)
+
+
+# ---- servers ----
+def start_server(profile, port, *, workers=None, timeout=30):
+    """`manage.py serve` for one profile; returns the process once it answers."""
+    argv = [sys.executable, "manage.py", "serve", "--port", str(port)]
+    if workers:
+        argv += ["--workers", str(workers)]
+    if profile == "wsgi":
+        argv.append("--wsgi")
+    env = dict(os.environ, TRAFFIC_LIST_CACHE="0")
+    proc = subprocess.Popen(argv, cwd=settings.BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{profile} server exited with status {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{reverse('pending-deletions')}", timeout=2):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError(f"{profile} server did not answer within {timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ---- load ----
+async def _client(session, base, target, boat, deadline, record, mix):
+    import aiohttp
+
+    async with session.get(base + target.urls["traffic"]) as resp:
+        await resp.read()
+    token = next((c.value for c in session.cookie_jar if c.key == "csrftoken"), "")
+    headers = {"X-CSRFToken": token, "X-Requested-With": "XMLHttpRequest"}
+    kinds = [kind for kind in mix if mix[kind] and (kind != "write" or boat is not None)]
+    if not kinds:
+        return
+    weights = [mix[kind] for kind in kinds]
+    deleted = False
+
+    while time.monotonic() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        if kind == "traffic":
+            method, url = "GET", base + target.urls["traffic"]
+            kwargs = {"params": {"mode": "per", "per": PER, "page": random.randint(1, target.traffic_pages)}}
+        elif kind == "boats":
+            method, url = "GET", base + target.urls["boats"]
+            kwargs = {"params": {"q": random.choice(target.prefixes)}, "headers": {"Accept": "application/json"}}
+        elif kind == "pending":
+            method, url, kwargs = "GET", base + target.urls["pending"], {}
+        else:
+            name = "cancel_delete" if deleted else "soft_delete"
+            method, url = "POST", base + target.urls[name].replace("/0/", f"/{boat}/")
+            kwargs = {"headers": headers}
+        started = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as resp:
+                await resp.read()
+                status = resp.status
+        except aiohttp.ClientError:
+            status = None
+        record(kind, (time.perf_counter() - started) * 1000, status)
+        if kind == "write" and status == 200:
+            deleted = not deleted
+
+    if deleted:
+        url = base + target.urls["cancel_delete"].replace("/0/", f"/{boat}/")
+        async with session.post(url, headers=headers) as resp:
+            await resp.read()
+
+
+async def drive(base, target, *, concurrency, duration, mix=MIX):
+    """Run the clients against `base`; returns (elapsed seconds, samples)."""
+    import aiohttp
+
+    samples = []
+
+    def record(kind, ms, status):
+        samples.append((kind, ms, status))
+
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    sessions = [aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True),
+                                      timeout=aiohttp.ClientTimeout(total=60))
+                for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*(
+            _client(session, base, target, target.boats[i] if i < len(target.boats) else None,
+                    deadline, record, mix)
+            for i, session in enumerate(sessions)
+        ))
+    finally:
+        for session in sessions:
+            await session.close()
+    return time.perf_counter() - started, samples
+
+
+def summarize(elapsed, samples):
+    def stats(rows):
+        timings = sorted(ms for _, ms, _ in rows)
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for _, _, status in rows if status is None or status >= 400),
+            "p50_ms": round(_percentile(timings, 50), 3) if timings else None,
+            "p95_ms": round(_percentile(timings, 95), 3) if timings else None,
+            "mean_ms": round(statistics.fmean(timings), 3) if timings else None,
+        }
+
+    result = stats(samples)
+    result["rps"] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+    result["by_kind"] = {kind: stats([row for row in samples if row[0] == kind]) for kind in MIX}
+    return result
+
+
+def run(*, concurrency=16, duration=10.0, port=8765, workers=None, profiles=PROFILES, mix=MIX, progress=None):
+    """Start each profile's server in turn and load it; returns the results document."""
+    target = targets(concurrency)
+    results = {}
+    for offset, profile in enumerate(profiles):
+        proc = start_server(profile, port + offset, workers=workers)
+        try:
+            elapsed, samples = asyncio.run(drive(f"http://127.0.0.1:{port + offset}", target,
+                                                 concurrency=concurrency, duration=duration, mix=mix))
+        finally:
+            stop_server(proc)
+        results[profile] = summarize(elapsed, samples)
+        if progress:
+            progress(profile, results[profile])
+    return {"concurrency": concurrency, "duration_s": duration, "workers": workers or "default",
+            "mix": mix, "profiles": results}
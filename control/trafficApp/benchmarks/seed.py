@@ -0,0 +1,172 @@
+# trafficApp/benchmarks/seed.py
+"""
+Deterministic synthetic data at harbour-office scale.
+
+Boats get marina-style names and berths; a share of them are pending
+deletion or archived. Traffic is spread over `years` years ending today with
+a summer peak, mostly tied to a boat, with some untimed rows (trTime and
+occurred_at NULL), missing passenger counts and free-text comments.
+
+Rows go in with bulk_create in chunks. The FTS triggers are dropped for the
+duration and the index is rebuilt once at the end, and the daily summary is
+rebuilt from the finished table, both much faster than per-row maintenance.
+"""
+import math
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from ..models import Boat, BoatType, DailyTrafficSummary, TrafficEntry
+from ..utils import listcache, search, writes
+
+CHUNK_SIZE = 5000
+
+SYLLABLES = ("al", "be", "ca", "do", "el", "fi", "ga", "ha", "is", "ka", "lu", "ma",
+             "ne", "os", "pa", "ri", "sa", "ta", "ul", "ve", "xa", "zo")
+PIERS = "ABCDEFGHJK"
+PURPOSES = ("", "", "", "fuel", "provisions", "repair", "charter", "crew change")
+COMMENTS = ("", "", "", "", "late", "pilot on board", "customs", "anchored outside")
+
+
+@dataclass
+class SeedReport:
+    boats: int = 0
+    pending: int = 0
+    archived: int = 0
+    entries: int = 0
+    untimed: int = 0
+    first_day: date = None
+    last_day: date = None
+
+
+def boat_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+
+
+def seed_boats(rng, count, *, pending_share=0.02, archived_share=0.05):
+    types = [value for value, _ in BoatType.choices]
+    weights = [50, 30, 8, 6, 6][:len(types)]
+    now = timezone.now()
+    boats = []
+    for n in range(count):
+        roll = rng.random()
+        deleted = roll < pending_share + archived_share
+        archived = roll < archived_share
+        deleted_at = now - timedelta(hours=rng.uniform(0, 47)) if deleted else None
+        if archived:
+            deleted_at = now - timedelta(days=rng.uniform(3, 900))
+        boats.append(Boat(
+            boatType=rng.choices(types, weights)[0],
+            name=boat_name(rng),
+            berth=f"{rng.choice(PIERS)}{rng.randint(1, 80)}",
+            state=rng.choice(("in", "in", "out")),
+            cid="Yearly" if rng.random() < 0.4 else "",
+            ecod="Yearly" if rng.random() < 0.4 else "",
+            deleted=deleted,
+            deleted_at=deleted_at,
+            archived=archived,
+            archived_at=deleted_at + timedelta(hours=48) if archived else None,
+        ))
+    # bulk_create bypasses Boat.save(), which would clear the flags
+    for start in range(0, len(boats), CHUNK_SIZE):
+        writes.run(Boat.objects.bulk_create, boats[start:start + CHUNK_SIZE])
+    return boats
+
+
+def _day_weights(first_day, days):
+    # summer peak, quieter winters
+    weights = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        season = math.cos((day.timetuple().tm_yday - 200) / 365 * 2 * math.pi)
+        weights.append(1.0 + 0.8 * season)
+    return weights
+
+
+def seed_traffic(rng, boats, count, *, years=5, untimed_share=0.06, chunk_size=CHUNK_SIZE,
+                 progress=None):
+    tz = timezone.get_current_timezone()
+    last_day = timezone.localdate()
+    first_day = last_day - timedelta(days=int(365 * years) - 1)
+    days = (last_day - first_day).days + 1
+    cumulative = []
+    total = 0.0
+    for weight in _day_weights(first_day, days):
+        total += weight
+        cumulative.append(total)
+
+    untimed = 0
+    batch = []
+    for n in range(count):
+        day = first_day + timedelta(days=rng.choices(range(days), cum_weights=cumulative)[0])
+        boat = rng.choice(boats) if rng.random() < 0.9 else None
+        if rng.random() < untimed_share:
+            tr_time, occurred_at = None, None
+            untimed += 1
+        else:
+            tr_time = time(rng.randint(6, 21), rng.randint(0, 59))
+            occurred_at = timezone.make_aware(datetime.combine(day, tr_time), tz)
+        batch.append(TrafficEntry(
+            boatType=boat.boatType if boat else rng.choice(BoatType.values),
+            name=boat.name if boat else boat_name(rng),
+            berth=boat.berth if boat else f"{rng.choice(PIERS)}{rng.randint(1, 80)}",
+            trafficBoatId=boat,
+            trDate=day,
+            trTime=tr_time,
+            occurred_at=occurred_at,
+            direction=rng.choices(("in", "out", "repair"), (48, 48, 4))[0],
+            passengers=rng.randint(1, 12) if rng.random() < 0.7 else None,
+            purpose=rng.choice(PURPOSES),
+            trComments=rng.choice(COMMENTS),
+        ))
+        if len(batch) >= chunk_size:
+            writes.run(TrafficEntry.objects.bulk_create, batch)
+            batch = []
+            if progress:
+                progress(n + 1, count)
+    if batch:
+        writes.run(TrafficEntry.objects.bulk_create, batch)
+    if progress:
+        progress(count, count)
+    return first_day, last_day, untimed
+
+
+def _drop_search_triggers(model, using):
+    fts = search.fts_table(model)
+    with connections[using].cursor() as cursor:
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+
+
+def seed(*, boats=3000, entries=2_000_000, years=5, random_seed=1, using="default", progress=None):
+    """Fill an empty database; returns a SeedReport."""
+    rng = random.Random(random_seed)
+    report = SeedReport()
+
+    sqlite = connections[using].vendor == "sqlite"
+    if sqlite:
+        _drop_search_triggers(TrafficEntry, using)
+        _drop_search_triggers(Boat, using)
+
+    created = seed_boats(rng, boats)
+    # pks are needed for the FK: re-read what was just inserted
+    fleet = list(Boat.all_objects.only("id", "boatType", "name", "berth"))
+    report.boats = len(created)
+    report.pending = sum(1 for b in created if b.deleted and not b.archived)
+    report.archived = sum(1 for b in created if b.archived)
+
+    report.first_day, report.last_day, report.untimed = seed_traffic(
+        rng, fleet, entries, years=years, progress=progress)
+    report.entries = entries
+
+    if sqlite:
+        search.install(TrafficEntry, using, rebuild=True)
+        search.install(Boat, using, rebuild=True)
+        with connections[using].cursor() as cursor:
+            cursor.execute("ANALYZE")
+    DailyTrafficSummary.rebuild()   # also starts a new version of the cached traffic lists
+    listcache.bump(Boat)
+    return report
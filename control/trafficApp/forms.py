@@ -1,7 +1,7 @@
 from django import forms
 from django.forms.widgets import DateInput, TimeInput
 import datetime
-from .models import Boat, TrafficEntry
+from .models import Boat, State, TrafficEntry
 
 class NewTrafficForm(forms.ModelForm):
     trDate = forms.DateField(
@@ -43,6 +43,22 @@ class NewTrafficForm(forms.ModelForm):
             'edr', 'etr', 'trComments', 'berth'
         ]
 
+class BatchTrafficForm(forms.ModelForm):
+    """The fields a movement of several boats shares (utils/traffic_batch.py); the rest comes from each boat."""
+    trDate = forms.DateField(
+        widget=DateInput(attrs={'type': 'date'}),
+        label="Date"
+    )
+    trTime = forms.TimeField(
+        required=False,
+        widget=TimeInput(attrs={'type': 'time', 'step': '60'}),
+        label="Time",
+    )
+
+    class Meta:
+        model  = TrafficEntry
+        fields = ['trDate', 'trTime', 'direction', 'purpose']
+
 class NewBoatForm(forms.ModelForm):
     # 1) Single declaration of booking_type with hardcoded tuples
     BOOKING_CHOICES = [
@@ -111,3 +127,66 @@ class NewBoatForm(forms.ModelForm):
         return cleaned
 
 
+
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('traffic', 'Traffic log'),
+        ('boats',   'Boat registry'),
+    ]
+    kind    = forms.ChoiceField(choices=KIND_CHOICES, label="Import")
+    file    = forms.FileField(label="File (.xlsx or .csv)")
+    dry_run = forms.BooleanField(required=False, label="Only check, don't import")
+
+    def clean_file(self):
+        f = self.cleaned_data['file']
+        if not f.name.lower().endswith(('.xlsx', '.xlsm', '.csv')):
+            raise forms.ValidationError("Please upload an .xlsx or .csv file.")
+        return f
+
+class OccupancyForm(forms.Form):
+    at = forms.DateTimeField(
+        required=False,
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'step': '60'}, format='%Y-%m-%dT%H:%M'),
+        label="As of",
+    )
+    state = forms.ChoiceField(
+        required=False,
+        choices=[('', 'All')] + list(State.choices),
+        label="State",
+    )
+
+class OccupancyReportForm(forms.Form):
+    # Caps on the size of one report, not on what the matrix code can do: a
+    # year by hour over ~700 berths is ~6M cells, about a second to build and
+    # 25 MB as CSV or JSON. Longer ranges go by day.
+    MAX_DAYS = {'day': 731, 'hour': 366}
+
+    start = forms.DateField(widget=DateInput(attrs={'type': 'date'}), label="From")
+    end = forms.DateField(widget=DateInput(attrs={'type': 'date'}), label="To")
+    by = forms.ChoiceField(choices=[('berth', 'Berth'), ('boatType', 'Type')], label="Per")
+    resolution = forms.ChoiceField(choices=[('day', 'Day'), ('hour', 'Hour')], label="By")
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start'), cleaned.get('end')
+        resolution = cleaned.get('resolution')
+        if start and end:
+            if end < start:
+                raise forms.ValidationError("The end date is before the start date.")
+            limit = self.MAX_DAYS.get(resolution)
+            if limit and (end - start).days + 1 > limit:
+                raise forms.ValidationError(f"At most {limit} days by {resolution}.")
+        return cleaned
+
+class HistoryForm(forms.Form):
+    q = forms.CharField(required=False, max_length=100, label="Boat or berth")
+    start = forms.DateField(required=False, widget=DateInput(attrs={'type': 'date'}), label="From")
+    end = forms.DateField(required=False, widget=DateInput(attrs={'type': 'date'}), label="To")
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get('start'), cleaned.get('end')
+        if start and end and end < start:
+            raise forms.ValidationError("The end date is before the start date.")
+        return cleaned
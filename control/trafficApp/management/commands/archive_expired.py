@@ -0,0 +1,16 @@
+# trafficApp/management/commands/archive_expired.py
+from django.core.management.base import BaseCommand
+from trafficApp.models import Boat, pending_deletion_retention
+from trafficApp.utils import writes
+
+
+class Command(BaseCommand):
+    help = "Archive every pending deletion older than PENDING_DELETION_RETENTION_HOURS\n" \
+           "(default 48) in one UPDATE. Run it from cron, or enable the in-process\n" \
+           "scheduler with AUTO_ARCHIVE_INTERVAL_SECONDS."
+
+    def handle(self, *args, **options):
+        archived = writes.run(Boat.objects.archive_expired)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} boat(s) deleted more than {pending_deletion_retention()} ago."
+        ))
@@ -0,0 +1,54 @@
+# trafficApp/management/commands/backfill.py
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.utils import backfill
+
+
+class Command(BaseCommand):
+    help = "Fill a derived column on existing rows, in primary-key chunks of one\n" \
+           "transaction each, as one UPDATE per chunk where the database can compute\n" \
+           "the value. Progress is checkpointed, so rerunning resumes an interrupted\n" \
+           "run. Known backfills: " + ", ".join(backfill.BACKFILLS) + "."
+
+    backfill_name = None    # set by commands that run one fixed backfill
+
+    def add_arguments(self, parser):
+        if self.backfill_name is None:
+            parser.add_argument("name", help="The backfill to run (" + ", ".join(backfill.BACKFILLS) + ").")
+        parser.add_argument("--dry-run", action="store_true", help="Count and show a sample of what would be filled.")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run.")
+        parser.add_argument("--chunk-size", type=int, default=backfill.CHUNK_SIZE,
+                            help=f"Rows per transaction (default {backfill.CHUNK_SIZE}).")
+        parser.add_argument("--pause", type=float, default=backfill.PAUSE_SECONDS,
+                            help=f"Seconds to sleep between chunks (default {backfill.PAUSE_SECONDS}).")
+
+    def handle(self, *args, **options):
+        name = self.backfill_name or options["name"]
+        if name not in backfill.BACKFILLS:
+            raise CommandError(f"Unknown backfill {name!r}; one of {', '.join(backfill.BACKFILLS)}.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if options["pause"] < 0:
+            raise CommandError("--pause must not be negative.")
+        job = backfill.BACKFILLS[name]()
+
+        def progress(p):
+            eta = f"{p.eta:.0f}s" if p.eta is not None else "?"
+            self.stdout.write(f"  {p.done}/{p.total} rows, {p.rate:.0f} rows/s, ETA {eta}")
+
+        result = backfill.run(job, chunk_size=options["chunk_size"], pause=options["pause"],
+                              dry_run=options["dry_run"], restart=options["restart"], progress=progress)
+        if result.resumed_after:
+            self.stdout.write(f"Resumed after id {result.resumed_after}.")
+        if result.unfillable:
+            self.stdout.write(self.style.WARNING(f"{result.unfillable} row(s) can't be filled and were left alone."))
+        if result.dry_run:
+            self.stdout.write(f"Would fill {result.total} row(s) of {job.description}, {result.method}.")
+            for pk, value in result.sample:
+                self.stdout.write(f"  id={pk}: {value}")
+            return
+        if not result.total:
+            self.stdout.write(self.style.SUCCESS("No rows to update."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Filled {result.filled} row(s) in {result.chunks} chunk(s), {result.method}, in {result.elapsed:.1f}s."
+        ))
@@ -0,0 +1,58 @@
+# trafficApp/management/commands/benchmark_servers.py
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.benchmarks import harness, load
+
+
+class Command(BaseCommand):
+    help = "Compare the WSGI and ASGI profiles under concurrent load: start each with\n" \
+           "`manage.py serve`, keep --concurrency requests in flight for --duration\n" \
+           "seconds (list pages, boat search, soft-delete / cancel-delete) and report\n" \
+           "requests/second and p50 / p95 latency. Runs against the current database,\n" \
+           "usually one filled by seed_benchmark."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per profile.")
+        parser.add_argument("--port", type=int, default=8765, help="First port; one per profile.")
+        parser.add_argument("--workers", type=int, help="Worker processes per server (default: serve's).")
+        parser.add_argument("--profile", action="append", choices=load.PROFILES,
+                            help="Only this profile (repeatable; default: both).")
+        parser.add_argument("--mix", action="append", metavar="KIND=WEIGHT",
+                            help=f"Request mix weight (repeatable; kinds: {', '.join(load.MIX)}). "
+                                 f"Kinds not given get 0; default {load.MIX}.")
+        parser.add_argument("--output", metavar="JSON", help="Write the results here.")
+
+    def handle(self, *args, **options):
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            raise CommandError("aiohttp is not installed (pip install -r requirements.txt).")
+
+        mix = load.MIX
+        if options["mix"]:
+            mix = dict.fromkeys(load.MIX, 0)
+            for item in options["mix"]:
+                kind, _, weight = item.partition("=")
+                if kind not in mix or not weight.isdigit():
+                    raise CommandError(f"Bad --mix {item!r}: use KIND=WEIGHT, KIND one of {', '.join(mix)}.")
+                mix[kind] = int(weight)
+
+        def progress(profile, result):
+            self.stdout.write(f"{profile:5} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:9.2f} ms  "
+                              f"p95 {result['p95_ms']:9.2f} ms  {result['requests']:6} requests  "
+                              f"{result['errors']:4} errors")
+            for kind, row in result["by_kind"].items():
+                if row["requests"]:
+                    self.stdout.write(f"  {kind:8} p50 {row['p50_ms']:9.2f} ms  p95 {row['p95_ms']:9.2f} ms  "
+                                      f"{row['requests']:6} requests  {row['errors']:4} errors")
+
+        try:
+            results = load.run(concurrency=options["concurrency"], duration=options["duration"],
+                               port=options["port"], workers=options["workers"],
+                               profiles=options["profile"] or load.PROFILES, mix=mix, progress=progress)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        if options["output"]:
+            harness.dump({"environment": harness.environment(), **results}, options["output"])
+            self.stdout.write(f"Results written to {options['output']}.")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,37 @@
+# trafficApp/management/commands/copy_from_sqlite.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.utils import dbcopy
+
+
+class Command(BaseCommand):
+    help = "Copy users, boats, traffic entries and the change log from the SQLite\n" \
+           "database into the default one (PostgreSQL: TRAFFIC_DB_ENGINE=postgres), in\n" \
+           "primary-key chunks with one transaction each. Run `manage.py migrate` on\n" \
+           "the target first. Rerunning resumes after the rows already copied.\n" \
+           "Daily summaries, occupancy snapshots and search indexes are rebuilt\n" \
+           "on the target at the end."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default="sqlite",
+                            help="Database alias to copy from (default %(default)s).")
+        parser.add_argument("--chunk-size", type=int, default=dbcopy.CHUNK_SIZE,
+                            help="Rows per query / insert transaction (default %(default)s).")
+        parser.add_argument("--no-rebuild", action="store_true",
+                            help="Skip rebuilding the derived tables.")
+
+    def handle(self, *args, **options):
+        if options["source"] not in settings.DATABASES:
+            raise CommandError(f"No database alias {options['source']!r} (set TRAFFIC_DB_ENGINE=postgres).")
+
+        def progress(label, copied):
+            self.stdout.write(f"  {label}: {copied} row(s)")
+
+        try:
+            report = dbcopy.copy_database(options["source"], chunk_size=options["chunk_size"],
+                                          rebuild=not options["no_rebuild"], progress=progress)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        for label, copied in report.rows.items():
+            self.stdout.write(f"{label}: copied {copied}, {report.skipped[label]} already there.")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,32 @@
+# trafficApp/management/commands/export_analytics.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Export the traffic log, hot and cold tiers, into NumPy columns per month\n" \
+           "under ANALYTICS_DIR for trafficApp.analytics.query. Only months that changed\n" \
+           "since the last export are rewritten (plus the current and previous one);\n" \
+           "--full rewrites all of them. Run it from cron, e.g. nightly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help=f"Snapshot directory (default ANALYTICS_DIR, {settings.ANALYTICS_DIR}).")
+        parser.add_argument("--full", action="store_true", help="Rewrite every month.")
+
+    def handle(self, *args, **options):
+        try:
+            from trafficApp.analytics import snapshot
+        except ImportError:
+            raise CommandError("numpy is not installed (pip install -r requirements.txt).")
+
+        def progress(month, rows):
+            self.stdout.write(f"  {month}: {rows} row(s)")
+
+        report = snapshot.export(options["dir"], full=options["full"], progress=progress)
+        if report.unchanged:
+            self.stdout.write(self.style.SUCCESS("No traffic changed since the last export."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(report.written)} month(s), {report.rows} row(s); removed {len(report.removed)} "
+            f"month(s) without traffic."
+        ))
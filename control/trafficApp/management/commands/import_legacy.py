@@ -0,0 +1,55 @@
+# trafficApp/management/commands/import_legacy.py
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.utils import importer
+
+
+class Command(BaseCommand):
+    help = "Import a legacy traffic log or boat registry from .xlsx or .csv.\n" \
+           "The first row must hold the column headers (e.g. Type, Name, Date,\n" \
+           "Time, Direction, Berth ... as in the traffic export). Rows are\n" \
+           "validated like the web forms; invalid rows are skipped and reported."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["traffic", "boats"])
+        parser.add_argument("path")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Validate and report without inserting anything.")
+        parser.add_argument("--chunk-size", type=int, default=importer.CHUNK_SIZE,
+                            help="Rows per insert transaction (default %(default)s).")
+        parser.add_argument("--errors", metavar="CSV",
+                            help="Write the per-row error report to this file ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+
+        run = importer.import_traffic if options["kind"] == "traffic" else importer.import_boats
+        with path.open("rb") as fh:
+            report = run(fh, path.name, dry_run=options["dry_run"],
+                         chunk_size=options["chunk_size"])
+
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(f"{verb} {report.created} of {report.total} row(s); {report.failed} rejected.")
+        if options["kind"] == "traffic":
+            self.stdout.write(f"Matched {report.matched_boats} row(s) to existing boats.")
+
+        if report.errors:
+            target = options["errors"]
+            if target == "-":
+                report.write_csv(sys.stdout)
+            elif target:
+                with open(target, "w", newline="", encoding="utf-8") as out:
+                    report.write_csv(out)
+                self.stdout.write(f"Error report written to {target}.")
+            else:
+                for row_number, errors in report.errors[:20]:
+                    detail = "; ".join(f"{f}: {', '.join(m)}" for f, m in errors.items())
+                    self.stdout.write(f"  row {row_number}: {detail}")
+                if report.failed > 20:
+                    self.stdout.write("  ... (use --errors FILE for the full report)")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,35 @@
+# trafficApp/management/commands/move_to_cold.py
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.utils import tiering
+
+
+class Command(BaseCommand):
+    help = "Move traffic older than TIERING_HOT_DAYS (default 730) and archived boats\n" \
+           "without hot traffic into the cold tables, one transaction per chunk. The\n" \
+           "list pages stop seeing them; /history/, the admin, occupancy and reports\n" \
+           "still do. Rerunning resumes an interrupted move."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Keep this many days of traffic hot (default TIERING_HOT_DAYS).")
+        parser.add_argument("--chunk-size", type=int, help="Rows per transaction (default TIERING_CHUNK_SIZE).")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would move.")
+
+    def handle(self, *args, **options):
+        if options["days"] is not None and options["days"] < 0:
+            raise CommandError("--days must not be negative.")
+        if options["dry_run"]:
+            cutoff = tiering.horizon(options["days"])
+            traffic = tiering.due_traffic(cutoff).count()
+            self.stdout.write(f"Would move {traffic} traffic entr{'y' if traffic == 1 else 'ies'} from before "
+                              f"{cutoff:%Y-%m-%d} and {tiering.due_boats().count()} archived boat(s) "
+                              f"(more boats once their traffic has moved).")
+            return
+
+        def progress(label, moved):
+            self.stdout.write(f"  {label}: {moved} moved")
+
+        report = tiering.move(days=options["days"], chunk_size=options["chunk_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {report.traffic} traffic entr{'y' if report.traffic == 1 else 'ies'} from before "
+            f"{report.horizon:%Y-%m-%d} and {report.boats} archived boat(s) to the cold tables."
+        ))
@@ -0,0 +1,13 @@
+# trafficApp/management/commands/rebuild_daily_summary.py
+from django.core.management.base import BaseCommand
+from trafficApp.models import DailyTrafficSummary
+
+
+class Command(BaseCommand):
+    help = "Recompute the DailyTrafficSummary table from all TrafficEntry rows.\n" \
+           "The table is normally kept up to date by signals; run this after\n" \
+           "bulk imports, raw SQL edits or if the numbers ever look off."
+
+    def handle(self, *args, **options):
+        written = DailyTrafficSummary.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt summary for {written} day(s)."))
@@ -0,0 +1,34 @@
+# trafficApp/management/commands/rebuild_occupancy.py
+from django.core.management.base import BaseCommand
+from trafficApp.models import Boat
+from trafficApp.utils import occupancy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the occupancy snapshots (every boat's state each OCCUPANCY_SNAPSHOT_DAYS,\n" \
+           "default 7) from the traffic log, then set Boat.state to the direction of each\n" \
+           "boat's last movement where the two disagree. Run it with --extend from cron\n" \
+           "to add the snapshots since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--extend", action="store_true",
+                            help="Only add snapshots after the latest one instead of rebuilding all.")
+        parser.add_argument("--check", action="store_true",
+                            help="Report boats whose state disagrees with the log, don't change them.")
+        parser.add_argument("--no-reconcile", action="store_true", help="Only build the snapshots.")
+
+    def handle(self, *args, **options):
+        written = occupancy.build(extend=options["extend"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} occupancy snapshot(s)."))
+        if options["no_reconcile"]:
+            return
+
+        mismatched = occupancy.reconcile(fix=not options["check"])
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS("Every boat's state matches the log."))
+            return
+        names = dict(Boat.all_objects.filter(pk__in=list(mismatched)).values_list("pk", "name"))
+        for pk, (recorded, logged) in sorted(mismatched.items()):
+            self.stdout.write(f"  {names.get(pk, pk)} (id={pk}): state {recorded}, log says {logged}")
+        verb = "disagree with" if options["check"] else "updated from"
+        self.stdout.write(self.style.WARNING(f"{len(mismatched)} boat state(s) {verb} the log."))
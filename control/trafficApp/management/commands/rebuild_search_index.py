@@ -0,0 +1,21 @@
+# trafficApp/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from trafficApp.models import Boat, TrafficEntry
+from trafficApp.utils import search
+
+
+class Command(BaseCommand):
+    help = "Create (if missing) and rebuild the search index (SQLite FTS5, or pg_trgm\n" \
+           "indexes on PostgreSQL) for traffic entries and boats. Normally done\n" \
+           "automatically by migrate."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        for model in (TrafficEntry, Boat):
+            if search.install(model, using=options["database"], rebuild=True):
+                self.stdout.write(self.style.SUCCESS(f"Rebuilt the {model.__name__} search index."))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"No search index on this backend; {model.__name__} search uses icontains."))
@@ -0,0 +1,54 @@
+# trafficApp/management/commands/run_benchmark.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.benchmarks import harness
+
+
+class Command(BaseCommand):
+    help = "Time every list mode and write endpoint (latency percentiles, query count,\n" \
+           "peak memory) against the current database, usually one filled by\n" \
+           "seed_benchmark. Results are written as JSON and can be compared with a\n" \
+           "baseline; the command fails if any scenario regressed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per scenario.")
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--only", action="append", metavar="TEXT",
+                            help="Only scenarios whose name contains TEXT (repeatable).")
+        parser.add_argument("--sort", action="append", metavar="KEY",
+                            help="Sort keys to cover in per/cursor mode (default: all).")
+        parser.add_argument("--no-writes", action="store_true", help="Skip the POST scenarios.")
+        parser.add_argument("--output", metavar="JSON", help="Write the results here.")
+        parser.add_argument("--baseline", metavar="JSON", help="Compare with these results.")
+        parser.add_argument("--ratio", type=float, default=harness.REGRESSION_RATIO,
+                            help="Slowdown that counts as a regression (default %(default)s).")
+
+    def handle(self, *args, **options):
+        def progress(name, result):
+            self.stdout.write(f"{name:45} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+                              f"{result['queries']:3} queries  {result['peak_kb']:9.1f} KiB")
+
+        results = harness.run(repeat=options["repeat"], warmup=options["warmup"],
+                              include=options["only"], sort_keys=options["sort"],
+                              writes=not options["no_writes"], progress=progress)
+        if options["output"]:
+            harness.dump(results, options["output"])
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if options["baseline"]:
+            try:
+                baseline = harness.load(options["baseline"])
+            except (OSError, json.JSONDecodeError) as exc:
+                raise CommandError(f"Can't read baseline: {exc}")
+            rows = harness.compare(results, baseline, ratio=options["ratio"])
+            regressed = [row for row in rows if row["status"] == "regressed"]
+            for row in regressed:
+                self.stdout.write(self.style.ERROR(
+                    f"REGRESSED {row['scenario']}: p50 x{row['p50_ratio']}, p95 x{row['p95_ratio']}, "
+                    f"queries {row['queries'][0]} -> {row['queries'][1]}"))
+            if regressed:
+                raise CommandError(f"{len(regressed)} scenario(s) regressed against {options['baseline']}.")
+            self.stdout.write(f"No regressions against {options['baseline']}.")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
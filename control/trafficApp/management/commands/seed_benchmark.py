@@ -0,0 +1,34 @@
+# trafficApp/management/commands/seed_benchmark.py
+from django.core.management.base import BaseCommand, CommandError
+from trafficApp.benchmarks import seed
+from trafficApp.models import Boat, TrafficEntry
+
+
+class Command(BaseCommand):
+    help = "Fill an EMPTY database with synthetic boats and traffic for run_benchmark.\n" \
+           "Use a scratch database: TRAFFIC_DB_PATH=/tmp/bench.sqlite3 manage.py migrate\n" \
+           "first, then run this command with the same TRAFFIC_DB_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--boats", type=int, default=3000)
+        parser.add_argument("--entries", type=int, default=2_000_000)
+        parser.add_argument("--years", type=float, default=5)
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default %(default)s).")
+
+    def handle(self, *args, **options):
+        if Boat.all_objects.exists() or TrafficEntry.objects.exists():
+            raise CommandError("The database already has boats or traffic; seed an empty one "
+                               "(see TRAFFIC_DB_PATH).")
+
+        def progress(done, total):
+            self.stdout.write(f"\r  traffic {done}/{total}", ending="")
+            self.stdout.flush()
+
+        report = seed.seed(boats=options["boats"], entries=options["entries"],
+                           years=options["years"], random_seed=options["seed"], progress=progress)
+        self.stdout.write("")
+        self.stdout.write(f"Boats: {report.boats} ({report.pending} pending deletion, "
+                          f"{report.archived} archived)")
+        self.stdout.write(f"Traffic: {report.entries} ({report.untimed} untimed), "
+                          f"{report.first_day} .. {report.last_day}")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,57 @@
+# trafficApp/management/commands/serve.py
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Serve the project with uvicorn, tuned from the ASGI_* settings (see \"Serving\"\n" \
+           "in settings.py). The default ASGI profile routes to the async views; --wsgi\n" \
+           "serves control.wsgi with the sync ones instead (uvicorn runs it in a pool of\n" \
+           "10 threads), for comparison. The command replaces itself with the uvicorn\n" \
+           "process, so the profile is chosen before settings are loaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8000)
+        parser.add_argument("--workers", type=int,
+                            help="Worker processes (default: ASGI_WORKERS, or one per CPU).")
+        parser.add_argument("--wsgi", action="store_true", help="Serve the sync views over WSGI.")
+        parser.add_argument("--access-log", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("uvicorn is not installed (pip install -r requirements.txt).")
+
+        workers = options["workers"] or settings.ASGI_WORKERS or os.cpu_count() or 1
+        if options["wsgi"]:
+            app, interface = "control.wsgi:application", "wsgi"
+        else:
+            app, interface = "control.asgi:application", "asgi3"
+        argv = [
+            sys.executable, "-m", "uvicorn", app,
+            "--app-dir", str(settings.BASE_DIR),
+            "--interface", interface,
+            "--host", options["host"],
+            "--port", str(options["port"]),
+            "--workers", str(workers),
+            "--limit-concurrency", str(settings.ASGI_LIMIT_CONCURRENCY),
+            "--backlog", str(settings.ASGI_BACKLOG),
+            "--timeout-keep-alive", str(settings.ASGI_KEEPALIVE_SECONDS),
+            "--lifespan", "off",            # Django has no lifespan handlers
+            "--no-server-header",
+            # --loop / --http stay "auto": uvloop and httptools when installed (uvicorn[standard])
+            "--access-log" if options["access_log"] else "--no-access-log",
+        ]
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "control.settings"),
+                   TRAFFIC_ASYNC_VIEWS="0" if options["wsgi"] else "1",
+                   TRAFFIC_LIVE_EVENTS="0" if options["wsgi"] else "1")
+        self.stdout.write(f"Serving {app} ({interface}, {workers} worker(s)) on "
+                          f"http://{options['host']}:{options['port']}/")
+        sys.stdout.flush()
+        os.execvpe(argv[0], argv, env)
@@ -0,0 +1,101 @@
+# trafficApp/middleware.py
+import logging
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .utils import perf
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Times every request: total, SQL (time and count, via execute_wrapper on
+    each connection), template rendering and the slowest queries. Adds a
+    Server-Timing header (visible in the browser's network panel) with DEBUG
+    on or for staff users only, since it tells anyone who can see it how
+    much database work a URL costs, and feeds the per-URL-name histograms
+    served by the `metrics` view.
+
+    With PERF_METRICS_ENABLED = False the middleware removes itself from the
+    chain at startup (MiddlewareNotUsed), so it costs nothing.
+
+    Under ASGI it runs in the event loop, while the queries run in each
+    request's sync thread, on that thread's connections. request_started is
+    sent in that thread, so its receiver gives those connections a wrapper
+    that records into the request's metrics (a context variable, which
+    sync_to_async carries over).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERF_METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", None)
+        perf.install_template_timer()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            request_started.connect(_wrap_connections, dispatch_uid="perf_wrap_connections")
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = perf.RequestMetrics()
+        token = perf.activate(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    if perf.record_query not in connection.execute_wrappers:  # already recording
+                        stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            perf.deactivate(token)
+        show_timing = settings.DEBUG or _is_staff(getattr(request, "user", None))
+        return self.finish(request, response, metrics, show_timing)
+
+    async def __acall__(self, request):
+        metrics = perf.RequestMetrics()
+        token = perf.activate(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.deactivate(token)
+        # request.user would load the user synchronously, in the event loop
+        show_timing = settings.DEBUG or (hasattr(request, "auser") and _is_staff(await request.auser()))
+        return self.finish(request, response, metrics, show_timing)
+
+    def finish(self, request, response, metrics, show_timing):
+        metrics.finish()
+
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        perf.REGISTRY.record(view, metrics)
+        if show_timing:
+            response["Server-Timing"] = metrics.server_timing()
+
+        if self.slow_ms is not None and metrics.total * 1000 >= self.slow_ms:
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, templates %.0f ms; slowest: %s",
+                request.method, request.path, view, metrics.total * 1000, metrics.sql_count,
+                metrics.sql_time * 1000, metrics.template_time * 1000,
+                " | ".join(f"{s * 1000:.1f} ms {sql}" for s, sql in metrics.slowest[:3]),
+            )
+        return response
+
+
+def _is_staff(user):
+    return user is not None and user.is_active and user.is_staff
+
+
+def _wrap_connections(sender, **kwargs):
+    for connection in connections.all():
+        if perf.record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(perf.record_query)
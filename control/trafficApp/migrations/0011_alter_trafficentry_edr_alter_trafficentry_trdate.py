@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2025-08-14 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0010_alter_trafficentry_edr_alter_trafficentry_trtime'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='edr',
+            field=models.DateField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='trDate',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2025-08-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0011_alter_trafficentry_edr_alter_trafficentry_trdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trafficentry',
+            name='occurred_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
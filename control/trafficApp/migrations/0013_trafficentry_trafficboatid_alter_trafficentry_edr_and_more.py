@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2025-08-19 11:15
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0012_trafficentry_occurred_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trafficentry',
+            name='trafficBoatId',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='traffic_entries', to='trafficApp.boat'),
+        ),
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='edr',
+            field=models.DateField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='etr',
+            field=models.TimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='passengers',
+            field=models.IntegerField(blank=True, default=None, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2025-08-21 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0013_trafficentry_trafficboatid_alter_trafficentry_edr_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boat',
+            name='archived',
+            field=models.BooleanField(default=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='boat',
+            name='deleted',
+            field=models.BooleanField(default=False),
+            preserve_default=False,
+        ),
+    ]
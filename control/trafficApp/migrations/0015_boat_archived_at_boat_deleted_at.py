@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2025-08-21 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0014_boat_archived_boat_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boat',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='boat',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
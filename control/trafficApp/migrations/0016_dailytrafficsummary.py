@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:36
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+# the column each direction / boat type is counted in, as of this migration
+DIRECTION_COLUMNS = {'in': 'in_count', 'out': 'out_count', 'repair': 'repair_count'}
+TYPE_COLUMNS = {'M/Y': 'my_count', 'S/Y': 'sy_count', 'CAT.': 'cat_count', 'JETSKI': 'jetski_count',
+                'TENDER': 'tender_count'}
+
+
+def populate_summary(apps, schema_editor):
+    TrafficEntry = apps.get_model('trafficApp', 'TrafficEntry')
+    DailyTrafficSummary = apps.get_model('trafficApp', 'DailyTrafficSummary')
+    aggregates = {'movements': Count('id'), 'passengers': Coalesce(Sum('passengers'), 0)}
+    for value, column in DIRECTION_COLUMNS.items():
+        aggregates[column] = Count('id', filter=Q(direction=value))
+    for value, column in TYPE_COLUMNS.items():
+        aggregates[column] = Count('id', filter=Q(boatType=value))
+    rows = (
+        TrafficEntry.objects
+        .annotate(summary_day=Coalesce(TruncDate('occurred_at'), F('trDate')))
+        .exclude(summary_day__isnull=True)
+        .values('summary_day')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    DailyTrafficSummary.objects.bulk_create(
+        [DailyTrafficSummary(day=row.pop('summary_day'), **row) for row in rows], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0015_boat_archived_at_boat_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTrafficSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('movements', models.PositiveIntegerField(default=0)),
+                ('in_count', models.PositiveIntegerField(default=0)),
+                ('out_count', models.PositiveIntegerField(default=0)),
+                ('repair_count', models.PositiveIntegerField(default=0)),
+                ('passengers', models.PositiveIntegerField(default=0)),
+                ('my_count', models.PositiveIntegerField(default=0)),
+                ('sy_count', models.PositiveIntegerField(default=0)),
+                ('cat_count', models.PositiveIntegerField(default=0)),
+                ('jetski_count', models.PositiveIntegerField(default=0)),
+                ('tender_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0016_dailytrafficsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trafficentry',
+            name='occurred_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='boat',
+            index=models.Index(condition=models.Q(('archived', False), ('deleted', False)), fields=['name', 'berth'], name='boat_visible_name_berth'),
+        ),
+        migrations.AddIndex(
+            model_name='boat',
+            index=models.Index(condition=models.Q(('archived', False), ('deleted', True)), fields=['deleted_at', 'created'], name='boat_pending_deleted_at'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['occurred_at', 'id'], name='traffic_occurred_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['created', 'id'], name='traffic_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['boatType', 'id'], name='traffic_boattype_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['name', 'id'], name='traffic_name_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['berth', 'id'], name='traffic_berth_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['trDate', 'id'], name='traffic_trdate_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['trTime', 'id'], name='traffic_trtime_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['direction', 'id'], name='traffic_direction_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['passengers', 'id'], name='traffic_passengers_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['purpose', 'id'], name='traffic_purpose_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['edr', 'id'], name='traffic_edr_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['etr', 'id'], name='traffic_etr_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['trComments', 'id'], name='traffic_trcomments_id'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(fields=['trafficBoatId', 'occurred_at'], name='traffic_boat_occurred_at'),
+        ),
+    ]
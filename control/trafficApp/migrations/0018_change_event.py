@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0017_sort_and_subset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('topic', models.CharField(max_length=20)),
+                ('action', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0018_change_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(unique=True)),
+                ('states', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+            },
+        ),
+    ]
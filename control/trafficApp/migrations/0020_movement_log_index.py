@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0019_occupancy_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trafficentry',
+            index=models.Index(condition=models.Q(('occurred_at__isnull', False), ('trafficBoatId__isnull', False)), fields=['occurred_at', 'id', 'trafficBoatId', 'direction', 'berth', 'boatType'], name='traffic_movement_log'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:54
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trafficApp', '0021_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColdBoat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('boatType', models.CharField(choices=[('M/Y', 'M/Y'), ('S/Y', 'S/Y'), ('CAT.', 'CAT.'), ('JETSKI', 'JETSKI'), ('TENDER', 'TENDER')], default='M/Y', max_length=30)),
+                ('name', models.CharField(max_length=100)),
+                ('berth', models.CharField(max_length=20)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('state', models.CharField(choices=[('in', 'In'), ('out', 'Out'), ('repair', 'Repair')], default='in', max_length=20)),
+                ('cid', models.CharField(blank=True, default='', max_length=50)),
+                ('ecod', models.CharField(blank=True, default='', max_length=50)),
+                ('deleted', models.BooleanField()),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('archived', models.BooleanField()),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+                ('moved_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'berth'], name='coldboat_name_berth')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ColdTrafficEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('boatType', models.CharField(choices=[('M/Y', 'M/Y'), ('S/Y', 'S/Y'), ('CAT.', 'CAT.'), ('JETSKI', 'JETSKI'), ('TENDER', 'TENDER')], default='M/Y', max_length=30)),
+                ('name', models.CharField(max_length=100)),
+                ('trDate', models.DateField(blank=True, null=True)),
+                ('trTime', models.TimeField(blank=True, null=True)),
+                ('direction', models.CharField(choices=[('in', 'In'), ('out', 'Out'), ('repair', 'Repair')], default='in', max_length=20)),
+                ('passengers', models.IntegerField(blank=True, default=None, null=True, validators=[django.core.validators.MinValueValidator(1)])),
+                ('purpose', models.CharField(blank=True, default='', max_length=100, null=True)),
+                ('edr', models.DateField(blank=True, default=None, null=True)),
+                ('etr', models.TimeField(blank=True, default=None, null=True)),
+                ('trComments', models.CharField(blank=True, default='', max_length=200, null=True)),
+                ('berth', models.CharField(max_length=20)),
+                ('occurred_at', models.DateTimeField(blank=True, null=True)),
+                ('trafficBoatId', models.BigIntegerField(blank=True, null=True)),
+                ('moved_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['occurred_at', 'id'], name='coldtraffic_occurred_at_id'), models.Index(fields=['trDate', 'id'], name='coldtraffic_trdate_id'), models.Index(fields=['name', 'id'], name='coldtraffic_name_id'), models.Index(fields=['trafficBoatId', 'occurred_at'], name='coldtraffic_boat_occurred_at')],
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.conf import settings
 
 class State(models.TextChoices):  # Enumeration of allowed values
@@ -23,6 +25,10 @@ class BoatType(models.TextChoices):  # Enumeration of allowed values
     jetski          = 'JETSKI', 'JETSKI'
     tender          = 'TENDER', 'TENDER'
 
+def pending_deletion_retention():
+    """How long a soft-deleted boat stays in Pending Deletions before it is archived."""
+    return timedelta(hours=getattr(settings, "PENDING_DELETION_RETENTION_HOURS", 48))
+
 class BoatQuerySet(models.QuerySet):
     def visible(self):
         # All pages should show boats that are not deleted and not archived
@@ -32,6 +38,19 @@ class BoatQuerySet(models.QuerySet):
         # Pending deletions are marked deleted but not archived
         return self.filter(deleted=True, archived=False)
 
+    def archive_expired(self, now=None):
+        # One set-based UPDATE for every pending deletion past its retention;
+        # returns how many boats were archived
+        now = now or timezone.now()
+        archived = self.pending_deletions().filter(
+            deleted_at__lte=now - pending_deletion_retention()
+        ).update(archived=True, archived_at=now)
+        if archived:
+            from .utils import listcache, live  # utils import the models
+            listcache.bump(Boat)
+            live.publish("boat", "archived", count=archived)
+        return archived
+
 class BoatManager(models.Manager):
     def get_queryset(self):
         return BoatQuerySet(self.model, using=self._db)
@@ -42,7 +61,11 @@ class BoatManager(models.Manager):
     def pending_deletions(self):
         return self.get_queryset().pending_deletions()
 
-class Boat(models.Model):
+    def archive_expired(self, now=None):
+        return self.get_queryset().archive_expired(now)
+
+class BoatRecord(models.Model):
+    """The columns of a registered boat, shared by Boat and its cold copy ColdBoat."""
 
     boatType    = models.CharField(
                                     max_length=30,
@@ -63,9 +86,28 @@ class Boat(models.Model):
     archived    = models.BooleanField()
     archived_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.boatType} {self.name}"
+
+class Boat(BoatRecord):
+
     objects     = BoatManager()     # supports .visible() and .pending_deletions()
     all_objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            # partial indexes: each covers only its own subset of boats
+            models.Index(fields=["name", "berth"], condition=Q(deleted=False, archived=False),
+                         name="boat_visible_name_berth"),
+            # PendingDeletionsView order (-deleted_at, -created) and the
+            # archive_expired() cutoff
+            models.Index(fields=["deleted_at", "created"], condition=Q(deleted=True, archived=False),
+                         name="boat_pending_deleted_at"),
+        ]
+
     def save(self, *args, **kwargs):
         self.deleted = False
         self.archived = False
@@ -90,10 +132,15 @@ class Boat(models.Model):
         #     self.archived_by_id = user.pk
         self.save(update_fields=['archived', 'archived_at']) # , 'archived_by'])
 
-    def __str__(self):
-        return f"{self.boatType} {self.name}"
+    @property
+    def archive_deadline(self):
+        # When the sweeper (archive_expired) will archive this pending deletion
+        if not self.deleted_at:
+            return None
+        return self.deleted_at + pending_deletion_retention()
 
-class TrafficEntry(models.Model):
+class TrafficRecord(models.Model):
+    """The columns of a traffic log entry, shared by TrafficEntry and its cold copy ColdTrafficEntry."""
 
     created = models.DateTimeField(auto_now_add=True)
     boatType = models.CharField(
@@ -120,21 +167,335 @@ class TrafficEntry(models.Model):
     etr = models.TimeField(default=None, null=True, blank=True)
     trComments = models.CharField(max_length=200, default="", null=True, blank=True)
     berth = models.CharField(max_length=20)
-    occurred_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    occurred_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def day(self):
+        # Same rule as the day pager: local date of occurred_at, else trDate
+        if self.occurred_at:
+            return timezone.localtime(self.occurred_at).date()
+        return self.trDate
+
+    def timed_at(self, default_time=None, tz=None):
+        """
+        trDate at trTime (or `default_time` if untimed), aware in `tz` (the
+        current time zone by default; bulk callers look it up once); None
+        without both.
+        """
+        at = self.trTime or default_time
+        if not self.trDate or at is None:
+            return None
+        return timezone.make_aware(datetime.combine(self.trDate, at), tz or timezone.get_current_timezone())
+
+    def __str__(self):
+        return f"{self.boatType} {self.name} going {self.direction}, at {self.trTime}, on {self.trDate}."
+
+class TrafficEntry(TrafficRecord):
+
     trafficBoatId = models.ForeignKey(Boat,
                                 null=True,
                                 blank=True,
                                 on_delete=models.SET_NULL,
                                 related_name="traffic_entries",)
 
+    class Meta:
+        # One (field, id) index per TrafficListView sort key: pages are read
+        # straight off the index in either direction (the id tiebreaker
+        # follows the sort direction) and seek pagination can SEARCH it.
+        indexes = [
+            models.Index(fields=["occurred_at", "id"], name="traffic_occurred_at_id"),
+            models.Index(fields=["created", "id"], name="traffic_created_id"),
+            models.Index(fields=["boatType", "id"], name="traffic_boattype_id"),
+            models.Index(fields=["name", "id"], name="traffic_name_id"),
+            models.Index(fields=["berth", "id"], name="traffic_berth_id"),
+            models.Index(fields=["trDate", "id"], name="traffic_trdate_id"),
+            models.Index(fields=["trTime", "id"], name="traffic_trtime_id"),
+            models.Index(fields=["direction", "id"], name="traffic_direction_id"),
+            models.Index(fields=["passengers", "id"], name="traffic_passengers_id"),
+            models.Index(fields=["purpose", "id"], name="traffic_purpose_id"),
+            models.Index(fields=["edr", "id"], name="traffic_edr_id"),
+            models.Index(fields=["etr", "id"], name="traffic_etr_id"),
+            models.Index(fields=["trComments", "id"], name="traffic_trcomments_id"),
+            # a boat's movements in time order
+            models.Index(fields=["trafficBoatId", "occurred_at"], name="traffic_boat_occurred_at"),
+            # the timed movement log of every boat (utils/occupancy.py, utils/reports.py),
+            # covering what reports read so a year is one index range scan
+            models.Index(fields=["occurred_at", "id", "trafficBoatId", "direction", "berth", "boatType"],
+                         condition=Q(trafficBoatId__isnull=False, occurred_at__isnull=False),
+                         name="traffic_movement_log"),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.trDate and self.trTime:
-            dt = datetime.combine(self.trDate, self.trTime)
-            # if you use USE_TZ=True, make it aware:
-            self.occurred_at = timezone.make_aware(dt, timezone.get_current_timezone())
+        self.occurred_at = self.timed_at()
+        # atomic so the DailyTrafficSummary update (post_save) commits with the
+        # row; inside a caller's transaction it just joins it (no savepoint)
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def movement(self):
+        """(boat id, occurred_at, direction) if this entry is part of its boat's timed log, else None."""
+        if self.trafficBoatId_id is None or self.occurred_at is None:
+            return None
+        return self.trafficBoatId_id, self.occurred_at, self.direction
+
+    def summary_contribution(self):
+        """What this entry adds to its DailyTrafficSummary row, or None if it has no day."""
+        day = self.day
+        if day is None:
+            return None
+        return day, self.direction, self.boatType, self.passengers or 0
+
+class ColdBoat(BoatRecord):
+    """
+    An archived boat moved out of Boat by `manage.py move_to_cold`
+    (utils/tiering.py), with its id and timestamps unchanged. Only the
+    history view, occupancy and reports read it; nothing writes it but the move.
+    """
+    moved_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "berth"], name="coldboat_name_berth"),
+        ]
+
+class ColdTrafficEntry(TrafficRecord):
+    """
+    A traffic entry older than TIERING_HOT_DAYS, moved out of TrafficEntry
+    (utils/tiering.py) with its id and timestamps unchanged. The boat is a
+    plain id: it may be in Boat or in ColdBoat.
+    """
+    trafficBoatId = models.BigIntegerField(null=True, blank=True)
+    moved_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # the history view's order, and the timed log (utils/occupancy.py)
+            models.Index(fields=["occurred_at", "id"], name="coldtraffic_occurred_at_id"),
+            models.Index(fields=["trDate", "id"], name="coldtraffic_trdate_id"),
+            models.Index(fields=["name", "id"], name="coldtraffic_name_id"),
+            models.Index(fields=["trafficBoatId", "occurred_at"], name="coldtraffic_boat_occurred_at"),
+        ]
+
+class DailyTrafficSummary(models.Model):
+    """
+    One row per calendar day that has traffic, maintained incrementally by the
+    TrafficEntry signals (see signals.py) and rebuilt with `rebuild_daily_summary`.
+    Days without traffic have no row.
+    """
+    DIRECTION_COLUMNS = {
+        State.IN:     "in_count",
+        State.OUT:    "out_count",
+        State.REPAIR: "repair_count",
+    }
+    TYPE_COLUMNS = {
+        BoatType.motorYacht:   "my_count",
+        BoatType.sailingYacht: "sy_count",
+        BoatType.catamaran:    "cat_count",
+        BoatType.jetski:       "jetski_count",
+        BoatType.tender:       "tender_count",
+    }
+
+    day          = models.DateField(unique=True)
+    movements    = models.PositiveIntegerField(default=0)
+    in_count     = models.PositiveIntegerField(default=0)
+    out_count    = models.PositiveIntegerField(default=0)
+    repair_count = models.PositiveIntegerField(default=0)
+    passengers   = models.PositiveIntegerField(default=0)
+    my_count     = models.PositiveIntegerField(default=0)
+    sy_count     = models.PositiveIntegerField(default=0)
+    cat_count    = models.PositiveIntegerField(default=0)
+    jetski_count = models.PositiveIntegerField(default=0)
+    tender_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day"]
+
+    @classmethod
+    def apply(cls, contribution, sign):
+        """
+        Add (sign=1) or remove (sign=-1) one entry's contribution to its day:
+        one upsert, or an UPDATE plus the DELETE of an emptied day.
+        """
+        cls.apply_many([contribution], sign)
+
+    @classmethod
+    def apply_many(cls, contributions, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) many entries at once (bulk imports,
+        moves to the cold tier): the per-day totals are summed in Python and
+        written with one executemany: an upsert (INSERT ... ON CONFLICT (day)
+        DO UPDATE) adding to the stored counts, or for removals an UPDATE
+        that stops at zero. Nothing is read back. Call inside the transaction
+        that writes the entries.
+        """
+        counters = [f.name for f in cls._meta.fields if f.name not in ("id", "day")]
+        per_day = {}
+        for contribution in contributions:
+            if contribution is None:
+                continue
+            day, direction, boat_type, passengers = contribution
+            totals = per_day.setdefault(day, dict.fromkeys(counters, 0))
+            totals["movements"] += 1
+            totals["passengers"] += passengers
+            for column in (cls.DIRECTION_COLUMNS.get(direction), cls.TYPE_COLUMNS.get(boat_type)):
+                if column:
+                    totals[column] += 1
+        if not per_day:
+            return
+
+        qn = connection.ops.quote_name
+        table = qn(cls._meta.db_table)
+        adapt_day = connection.ops.adapt_datefield_value
+        if sign > 0:
+            sql = "INSERT INTO {} ({}, {}) VALUES (%s, {}) ON CONFLICT ({}) DO UPDATE SET {}".format(
+                table, qn("day"), ", ".join(qn(c) for c in counters),
+                ", ".join(["%s"] * len(counters)), qn("day"),
+                ", ".join(f"{qn(c)} = {table}.{qn(c)} + excluded.{qn(c)}" for c in counters),
+            )
+            rows = [[adapt_day(day), *(totals[c] for c in counters)] for day, totals in per_day.items()]
         else:
-            self.occurred_at = None
-        super().save(*args, **kwargs)
+            # a summary behind the table must not go negative (PositiveIntegerField)
+            greatest = "GREATEST" if connection.vendor == "postgresql" else "MAX"
+            sql = "UPDATE {} SET {} WHERE {} = %s".format(
+                table, ", ".join(f"{qn(c)} = {greatest}(0, {qn(c)} - %s)" for c in counters), qn("day"),
+            )
+            rows = [[*(totals[c] for c in counters), adapt_day(day)] for day, totals in per_day.items()]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        if sign < 0:
+            # keep "a row exists" == "the day has traffic"
+            cls.objects.filter(day__in=list(per_day), movements__lte=0).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Replace every row with a fresh aggregate of TrafficEntry, in one
+        grouped query. Returns the number of days written.
+        """
+        from .utils import listcache  # utils import the models
+
+        def count(**lookup):
+            return Count("id", filter=Q(**lookup))
+
+        aggregates = {
+            "movements":  Count("id"),
+            "passengers": Coalesce(Sum("passengers"), 0),
+        }
+        for value, column in cls.DIRECTION_COLUMNS.items():
+            aggregates[column] = count(direction=value)
+        for value, column in cls.TYPE_COLUMNS.items():
+            aggregates[column] = count(boatType=value)
+
+        rows = (
+            TrafficEntry.objects
+            .annotate(summary_day=Coalesce(TruncDate("occurred_at"), F("trDate")))
+            .exclude(summary_day__isnull=True)
+            .values("summary_day")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        summaries = [cls(day=row.pop("summary_day"), **row) for row in rows]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(summaries, batch_size=500)
+            listcache.bump(TrafficEntry)  # the traffic list's day pages read the summary
+        return len(summaries)
+
+    def __str__(self):
+        return f"{self.day}: {self.movements} movements"
+
+
+class ChangeEvent(models.Model):
+    """
+    Append-only log of the changes pushed to open list pages (utils/live.py).
+
+    Written in the same transaction as the change itself; every process
+    streams it to its own SSE clients, so no broker is needed between
+    workers. The id doubles as the SSE event id, which lets a reconnecting
+    client resume from Last-Event-ID. Old rows are pruned as new ones arrive
+    (LIVE_EVENTS_RETAIN).
+    """
+    created = models.DateTimeField(auto_now_add=True)
+    topic   = models.CharField(max_length=20)   # "traffic" / "boat"
+    action  = models.CharField(max_length=20)   # created, updated, deleted, state, archived, restored, imported
+    data    = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"#{self.pk} {self.topic}.{self.action}"
+
+
+class BackfillCheckpoint(models.Model):
+    """
+    How far a backfill of a derived column got (utils/backfill.py): the last
+    primary key it has processed, written in the transaction of each chunk,
+    so an interrupted run resumes right after it.
+    """
+    name        = models.CharField(max_length=100, primary_key=True)   # e.g. "traffic.occurred_at"
+    last_pk     = models.BigIntegerField(default=0)
+    rows        = models.PositiveBigIntegerField(default=0)   # rows filled by the current run so far
+    started_at  = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)   # None while a run is unfinished
+
+    def __str__(self):
+        state = "finished" if self.finished_at else f"at id {self.last_pk}"
+        return f"{self.name}: {self.rows} rows, {state}"
+
+
+class OccupancySnapshot(models.Model):
+    """
+    Every boat's state (the direction of its last timed movement) at one
+    moment, so an as-of query only replays the traffic logged since
+    (utils/occupancy.py). Built by `rebuild_occupancy`; a change to the log
+    at or before `taken_at` deletes the snapshot.
+    """
+    taken_at = models.DateTimeField(unique=True)
+    states   = models.JSONField(default=dict)   # {"in": [boat pks], "out": [...], "repair": [...]}
+
+    class Meta:
+        ordering = ["-taken_at"]
+
+    def __str__(self):
+        return f"Occupancy at {self.taken_at}"
+
+
+class CacheVersion(models.Model):
+    """
+    A change counter per model, bumped in the transaction of every write
+    that changes the model's rows (utils/listcache.py). Cached list results
+    are keyed on the counters they were built under, so every process stops
+    using them as soon as the write commits.
+    """
+    name    = models.CharField(max_length=100, primary_key=True)   # model label, e.g. "trafficApp.boat"
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ImportJob(models.Model):
+    """
+    An upload too large to import inside the request (IMPORT_INLINE_MAX_BYTES),
+    run by a thread of the process that received it (utils/importer.py).
+    The counts are written after every chunk, so any worker can show the
+    progress at /import/<pk>/.
+    """
+    KIND_CHOICES = [("traffic", "Traffic log"), ("boats", "Boat registry")]
+
+    kind          = models.CharField(max_length=10, choices=KIND_CHOICES)
+    filename      = models.CharField(max_length=255)
+    dry_run       = models.BooleanField(default=False)
+    total         = models.PositiveIntegerField(default=0)
+    created       = models.PositiveIntegerField(default=0)
+    failed        = models.PositiveIntegerField(default=0)
+    matched_boats = models.PositiveIntegerField(default=0)
+    errors        = models.JSONField(default=list)   # [[row number, {field: [messages]}], ...], set at the end
+    error         = models.TextField(blank=True)     # why the import stopped, if it did
+    started_at    = models.DateTimeField(auto_now_add=True)
+    finished_at   = models.DateTimeField(null=True, blank=True)   # None while running
 
     def __str__(self):
-        return f"{self.boatType} {self.name} going {self.direction}, at {self.trTime}, on {self.trDate}."
\ No newline at end of file
+        state = "finished" if self.finished_at else "running"
+        return f"Import of {self.filename}: {self.created} of {self.total} rows, {state}"
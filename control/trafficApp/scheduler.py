@@ -0,0 +1,60 @@
+# trafficApp/scheduler.py
+"""
+In-process sweeper thread for pending deletions.
+
+control/wsgi.py and control/asgi.py call start_for_serving(), so it runs in
+the processes that serve requests (runserver's serving child, each uvicorn
+or gunicorn worker) every AUTO_ARCHIVE_INTERVAL_SECONDS, and not in
+management commands. With the interval set to 0, run
+`manage.py archive_expired` from cron instead. Running it in several
+processes is harmless: the archive UPDATE only touches rows that are still
+pending.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_stop = threading.Event()
+_thread = None
+
+
+def _run(interval):
+    from .models import Boat
+    from .utils import writes
+
+    while not _stop.wait(interval):
+        try:
+            archived = writes.run(Boat.objects.archive_expired)
+            if archived:
+                logger.info("Auto-archived %d pending deletion(s)", archived)
+        except DatabaseError:
+            # still locked after writes.run's retries: try again on the next tick
+            logger.exception("Auto-archive sweep failed")
+        finally:
+            close_old_connections()
+
+
+def start(interval):
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return _thread
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(interval,), name="auto-archive", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def start_for_serving():
+    """Start the sweeper if AUTO_ARCHIVE_INTERVAL_SECONDS is set; returns the thread or None."""
+    interval = getattr(settings, "AUTO_ARCHIVE_INTERVAL_SECONDS", None)
+    if not interval:
+        return None
+    return start(interval)
+
+
+def stop():
+    _stop.set()
@@ -0,0 +1,106 @@
+# trafficApp/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Boat, DailyTrafficSummary, TrafficEntry
+from .utils import listcache, live, occupancy, search, typeahead
+
+
+@receiver(pre_save, sender=TrafficEntry)
+def remember_summary_contribution(sender, instance, raw=False, **kwargs):
+    # Read what the stored row currently counts for, so an edit (including
+    # one that moves the entry to another day) can be applied as old -> new.
+    # The old movement is kept for the occupancy snapshots the same way.
+    instance._summary_before = None
+    instance._movement_before = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    old = sender.objects.filter(pk=instance.pk).first()
+    if old is not None:
+        instance._summary_before = old.summary_contribution()
+        instance._movement_before = old.movement()
+
+
+@receiver(post_save, sender=TrafficEntry)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, "_summary_before", None)
+    after = instance.summary_contribution()
+    if before == after:
+        return
+    DailyTrafficSummary.apply(before, -1)
+    DailyTrafficSummary.apply(after, +1)
+
+
+@receiver(post_delete, sender=TrafficEntry)
+def update_summary_on_delete(sender, instance, **kwargs):
+    # post_delete runs inside the deletion's transaction, also for queryset deletes
+    DailyTrafficSummary.apply(instance.summary_contribution(), -1)
+
+
+# ---- occupancy snapshots (utils/occupancy.py) ----
+@receiver(post_save, sender=TrafficEntry)
+def invalidate_occupancy_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, "_movement_before", None)
+    after = instance.movement()
+    if before != after:
+        occupancy.invalidate(before, after)
+
+
+@receiver(post_delete, sender=TrafficEntry)
+def invalidate_occupancy_on_delete(sender, instance, **kwargs):
+    occupancy.invalidate(instance.movement())
+
+
+# ---- live updates for open list pages (utils/live.py) ----
+@receiver(post_save, sender=TrafficEntry)
+def publish_traffic_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    day = instance.day
+    data = {"pk": instance.pk, "day": day.isoformat() if day else None}
+    moved = getattr(instance, "moved_boats", None)
+    if moved:
+        # the boats the entry moved (TrafficCreateView), in the same event
+        data.update(boats=moved, state=instance.direction)
+    live.publish("traffic", "created" if created else "updated", **data)
+
+
+@receiver(post_delete, sender=TrafficEntry)
+def publish_traffic_delete(sender, instance, **kwargs):
+    day = instance.day
+    live.publish("traffic", "deleted", pk=instance.pk, day=day.isoformat() if day else None)
+
+
+@receiver(post_save, sender=Boat)
+def publish_boat_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    live.publish("boat", "created" if created else "updated", pks=[instance.pk], state=instance.state)
+
+
+# ---- list result cache (utils/listcache.py) ----
+@receiver(post_save, sender=Boat)
+@receiver(post_delete, sender=Boat)
+@receiver(post_save, sender=TrafficEntry)
+@receiver(post_delete, sender=TrafficEntry)
+def bump_list_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        listcache.bump(sender, *([Boat] if getattr(instance, "moved_boats", None) else []))
+
+
+# ---- typeahead prefix index (utils/typeahead.py) ----
+@receiver(post_save, sender=Boat)
+@receiver(post_delete, sender=Boat)
+def invalidate_typeahead(sender, raw=False, **kwargs):
+    if not raw:
+        typeahead.invalidate()
+
+
+def install_search_index(sender, using="default", **kwargs):
+    # Connected to post_migrate in apps.py; (re)creates FTS tables and triggers
+    for model in (TrafficEntry, Boat):
+        search.install(model, using=using)
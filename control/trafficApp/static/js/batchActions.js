@@ -0,0 +1,152 @@
+// static/js/batchActions.js
+// Multi-select for list pages with batch_actions: row checkboxes feed the
+// batch endpoints, which answer with an outcome per id. An action with a
+// dialog (data-dialog) sends the dialog's fields along with the ids.
+(function () {
+  const bar = document.getElementById('batchActions');
+  if (!bar) return;
+  const countLabel = document.getElementById('batchCount');
+  const buttons = bar.querySelectorAll('.js-batch-action');
+
+  function getCookie(name) {
+    const row = document.cookie.split('; ').find(r => r.startsWith(name + '='));
+    return row ? decodeURIComponent(row.split('=')[1]) : null;
+  }
+  const csrftoken = getCookie('csrftoken');
+
+  function rowBoxes() {
+    return Array.from(document.querySelectorAll('.js-select-row'));
+  }
+
+  function selectedIds() {
+    return rowBoxes().filter(cb => cb.checked).map(cb => cb.value);
+  }
+
+  function refresh() {
+    const n = selectedIds().length;
+    countLabel.textContent = `${n} selected`;
+    buttons.forEach(b => { b.disabled = (n === 0); });
+    const all = document.querySelector('.js-select-all');
+    if (all) {
+      const boxes = rowBoxes();
+      all.checked = boxes.length > 0 && n === boxes.length;
+      all.indeterminate = n > 0 && n < boxes.length;
+    }
+  }
+
+  document.addEventListener('change', function (ev) {
+    if (ev.target.classList.contains('js-select-all')) {
+      rowBoxes().forEach(cb => { cb.checked = ev.target.checked; });
+    }
+    if (ev.target.classList.contains('js-select-all') || ev.target.classList.contains('js-select-row')) {
+      refresh();
+    }
+  });
+
+  function setState(row, state) {
+    const cell = row.querySelector('td[class^="state-"]');
+    if (cell) {
+      cell.className = `state-${state}`;
+      cell.textContent = state;
+    }
+    const link = row.querySelector('.js-traffic');
+    if (link) link.dataset.state = state;
+  }
+
+  // POST the ids (plus any dialog fields); true when the server took it
+  async function send(btn, ids, fields) {
+    buttons.forEach(b => { b.disabled = true; });
+    try {
+      const resp = await fetch(btn.dataset.url, {
+        method: 'POST',
+        headers: {
+          'X-CSRFToken': csrftoken,
+          'Content-Type': 'application/json',
+          'Accept': 'application/json',
+        },
+        credentials: 'same-origin',
+        body: JSON.stringify({ ...fields, ids: ids }),
+      });
+      const data = await resp.json();
+      if (!resp.ok || !data.ok) {
+        if (data.errors) return data.errors;
+        alert(data.error || 'Batch action failed');
+        return false;
+      }
+      // done -> the row has left this list, or (movements) shows its new state;
+      // anything else stays, with a summary
+      const skipped = {};
+      Object.entries(data.results).forEach(([pk, outcome]) => {
+        const cb = rowBoxes().find(c => c.value === pk);
+        if (outcome === 'done') {
+          if (cb && data.state) {
+            setState(cb.closest('tr'), data.state);
+            cb.checked = false;
+          } else if (cb) {
+            cb.closest('tr').remove();
+          }
+        } else {
+          skipped[outcome] = (skipped[outcome] || 0) + 1;
+        }
+      });
+      const notes = Object.entries(skipped).map(([outcome, n]) => `${n} ${outcome.replace('_', ' ')}`);
+      if (notes.length) alert(`${data.done} done; skipped: ${notes.join(', ')}`);
+      return true;
+    } catch (err) {
+      console.error(err);
+      alert('Network error');
+      return false;
+    } finally {
+      refresh();
+    }
+  }
+
+  // actions with data-dialog ask for their fields first; the dialog's form submits them
+  let pending = null;
+  document.querySelectorAll('.js-batch-dialog-form').forEach(form => {
+    const dlg = form.closest('dialog');
+    const errors = form.querySelector('.js-batch-dialog-errors');
+    form.querySelector('.js-batch-dialog-cancel')?.addEventListener('click', () => dlg.close());
+    form.addEventListener('submit', async function (ev) {
+      ev.preventDefault();
+      if (!pending) return;
+      const fields = Object.fromEntries(new FormData(form));
+      delete fields.csrfmiddlewaretoken;
+      const outcome = await send(pending, selectedIds(), fields);
+      if (outcome === true) {
+        dlg.close();
+      } else if (outcome && errors) {
+        errors.innerHTML = Object.entries(outcome)
+          .map(([f, msgs]) => `${f}: ${msgs.join(', ')}`).join('<br>');
+      }
+    });
+  });
+
+  buttons.forEach(btn => btn.addEventListener('click', async function () {
+    const ids = selectedIds();
+    if (!ids.length) return;
+    if (btn.dataset.dialog) {
+      const dlg = document.getElementById(btn.dataset.dialog);
+      if (!dlg) return;
+      pending = btn;
+      dlg.querySelectorAll('.js-batch-dialog-count').forEach(el => { el.textContent = ids.length; });
+      dlg.querySelectorAll('.js-batch-dialog-errors').forEach(el => { el.textContent = ''; });
+      // date and time default to now, as in the single-boat dialog
+      const d = new Date();
+      const pad = n => String(n).padStart(2, '0');
+      const inDate = dlg.querySelector('[name="trDate"]');
+      const inTime = dlg.querySelector('[name="trTime"]');
+      if (inDate && !inDate.value) inDate.value = `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+      if (inTime && !inTime.value) inTime.value = `${pad(d.getHours())}:${pad(d.getMinutes())}`;
+      dlg.showModal();
+      return;
+    }
+    if (btn.dataset.confirm && !confirm(`${btn.dataset.confirm} (${ids.length})`)) return;
+    await send(btn, ids, {});
+  }));
+
+  // a refreshed list brings new, unchecked rows
+  document.body.addEventListener('htmx:afterSwap', refresh);
+
+  refresh();
+})();
@@ -1,6 +1,5 @@
 document.addEventListener('DOMContentLoaded', () => {
   const STORAGE_KEY = 'visibleColumns';
-  const table       = document.querySelector('table.boats');
   const checkboxes  = document.querySelectorAll('.col-toggle');
   const applyBtn    = document.getElementById('apply-columns');
   const clearBtn    = document.getElementById('clearBtn');
@@ -12,6 +11,13 @@ document.addEventListener('DOMContentLoaded', () => {
   const initialCols = Array.isArray(saved) ? saved : defaultCols;
   applyVisibility(initialCols);
 
+  // the table is replaced when the list refreshes in place: re-apply
+  document.body.addEventListener('htmx:afterSwap', () => {
+    applyVisibility(Array.from(checkboxes)
+                         .filter(cb => cb.checked)
+                         .map(cb => Number(cb.dataset.colIndex)));
+  });
+
   // On Apply click: compute visible indices, apply & persist
   applyBtn.addEventListener('click', () => {
     const visible = Array.from(checkboxes)
@@ -32,6 +38,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
   // The function from above
   function applyVisibility(indices) {
+    const table = document.querySelector('table.boats');
+    if (!table) return;  // e.g. a day without traffic
     checkboxes.forEach(cb => {
       const idx  = Number(cb.dataset.colIndex);
       const show = indices.includes(idx);
@@ -1,26 +1,30 @@
 (function(){
-const trigger = document.getElementById('js-day-jump');
-const dialog  = document.getElementById('dayPickerDialog');
-if (!trigger || !dialog) return;
+// The heading and the dialog are part of the list region, which is replaced
+// on every in-place refresh: listen on the document.
+function dialog() { return document.getElementById('dayPickerDialog'); }
 
 function openPicker() {
-  if (typeof dialog.showModal === 'function') dialog.showModal();
-  else dialog.setAttribute('open', 'open'); // very old fallback
+  const dlg = dialog();
+  if (!dlg) return;
+  if (typeof dlg.showModal === 'function') dlg.showModal();
+  else dlg.setAttribute('open', 'open'); // very old fallback
   // Focus the date input when opened
-  const input = dialog.querySelector('#dayPickerInput');
+  const input = dlg.querySelector('#dayPickerInput');
   if (input) setTimeout(() => input.focus(), 0);
 }
 function closePicker() {
-  if (typeof dialog.close === 'function') dialog.close();
-  else dialog.removeAttribute('open');
+  const dlg = dialog();
+  if (!dlg) return;
+  if (typeof dlg.close === 'function') dlg.close();
+  else dlg.removeAttribute('open');
 }
 
-trigger.addEventListener('click', openPicker);
-trigger.addEventListener('keydown', (e) => {
+document.addEventListener('click', (e) => {
+  if (e.target.closest('#js-day-jump')) openPicker();
+  else if (e.target.closest('#dayPickerCancel')) closePicker();
+});
+document.addEventListener('keydown', (e) => {
+  if (!e.target.closest || !e.target.closest('#js-day-jump')) return;
   if (e.key === 'Enter' || e.key === ' ') { e.preventDefault(); openPicker(); }
 });
-
-dialog.addEventListener('cancel', (e) => { e.preventDefault(); closePicker(); });
-const cancelBtn = dialog.querySelector('#dayPickerCancel');
-if (cancelBtn) cancelBtn.addEventListener('click', closePicker);
 })();
@@ -0,0 +1,93 @@
+// static/js/liveUpdates.js
+// Keeps an open list page current: listens to /live/ (server-sent events,
+// see utils/live.py) and patches the table in place. Rows that only change
+// state or leave the list are edited directly; anything else reloads the
+// list region through its htmx fragment (debounced), like the pager does.
+(function () {
+  const region = document.getElementById('list-region');
+  if (!region || !region.dataset.liveUrl || !window.EventSource || !window.htmx) return;
+  const list = region.dataset.liveList;   // traffic | boats | pending
+  const REFRESH_DELAY_MS = 400;
+  let timer = null;
+  let source = null;
+
+  function busy() {
+    // don't pull the table from under a selection or an open dialog
+    return document.querySelector('.js-select-row:checked, dialog[open]');
+  }
+
+  function refresh() {
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      if (busy()) { refresh(); return; }
+      htmx.ajax('GET', location.pathname + location.search, { target: '#list-region', swap: 'innerHTML' });
+    }, REFRESH_DELAY_MS);
+  }
+
+  function boatRows(pks) {
+    // boat list rows carry the id on their links, pending rows on the <tr>
+    return pks.map(pk => {
+      const link = region.querySelector(`.js-traffic[data-boat-id="${pk}"]`);
+      return link ? link.closest('tr') : region.querySelector(`tr[data-pk="${pk}"]`);
+    }).filter(Boolean);
+  }
+
+  function setState(row, state) {
+    const cell = row.querySelector('td[class^="state-"]');
+    if (cell) {
+      cell.className = `state-${state}`;
+      cell.textContent = state;
+    }
+    const link = row.querySelector('.js-traffic');
+    if (link) link.dataset.state = state;
+  }
+
+  function onTraffic(ev) {
+    const data = JSON.parse(ev.data);
+    if (list === 'boats' && data.boats) {
+      // the movement also moved these boats
+      boatRows(data.boats.map(String)).forEach(row => setState(row, data.state));
+      return;
+    }
+    if (list !== 'traffic') return;
+    // day view of another day: nothing to show
+    const shown = region.querySelector('[data-day]');
+    if (shown && data.day && shown.dataset.day && data.day !== shown.dataset.day) return;
+    refresh();
+  }
+
+  function onBoat(ev) {
+    const data = JSON.parse(ev.data);
+    const pks = (data.pks || []).map(String);
+    if (list === 'boats') {
+      if (data.action === 'state') {
+        boatRows(pks).forEach(row => setState(row, data.state));
+      } else if (data.action === 'deleted' || data.action === 'archived') {
+        boatRows(pks).forEach(row => row.remove());
+      } else {
+        refresh();  // created / updated / restored / imported
+      }
+    } else if (list === 'pending') {
+      if (data.action === 'deleted' || (data.action === 'archived' && !data.pks)) {
+        refresh();  // new pending rows, or the sweeper archived some by cutoff
+      } else if (['archived', 'restored', 'updated'].includes(data.action)) {
+        // saving a boat also takes it out of pending deletion (Boat.save)
+        boatRows(pks).forEach(row => row.remove());
+      }
+    }
+  }
+
+  function connect() {
+    source = new EventSource(region.dataset.liveUrl);
+    source.addEventListener('traffic', onTraffic);
+    source.addEventListener('boat', onBoat);
+    source.addEventListener('reset', () => {
+      // missed events: start over from now and reload the list once
+      source.close();
+      refresh();
+      connect();
+    });
+  }
+
+  connect();
+})();
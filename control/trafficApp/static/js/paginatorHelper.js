@@ -1,35 +1,36 @@
+  // The controls form is replaced on every list refresh (out-of-band swap,
+  // see lists/traffic/_fragment.html), so listen on the document.
   (function () {
-    const form = document.getElementById('traffic-controls');
-    if (!form) return;
+    if (!document.getElementById('traffic-controls')) return;
 
-    const modeRadios = form.querySelectorAll('input[name="mode"]');
-    const perInput   = form.querySelector('input[name="per"]');
-    const invertBtn  = document.getElementById('invert-btn');
-    const dirInput   = document.getElementById('dir');
-    const sortSelect = document.getElementById('sort');
+    function controls(target) {
+      return target.closest && target.closest('#traffic-controls');
+    }
 
-    function updatePerDisabled() {
-      const mode = [...modeRadios].find(r => r.checked)?.value;
-      perInput.disabled = (mode !== 'per');
+    function resubmit(form, dropParams) {
+      // Reset to page 1 by removing any ?page= / ?cursor= from the URL on submit.
+      form.querySelectorAll(dropParams).forEach(x => x.remove());
+      form.requestSubmit();  // unlike submit(), lets htmx refresh the list in place
     }
-    modeRadios.forEach(r => r.addEventListener('change', () => {
-      updatePerDisabled();
-      // When changing mode, reset to page 1 by removing any ?page= from URL on submit.
-      form.querySelectorAll('input[name="page"]').forEach(x => x.remove());
-      form.submit();
-    }));
-    updatePerDisabled();
 
-    invertBtn?.addEventListener('click', () => {
-      dirInput.value = (dirInput.value === 'asc') ? 'desc' : 'asc';
-      // Reset to page 1 on sort change
-      form.querySelectorAll('input[name="page"]').forEach(x => x.remove());
-      form.submit();
+    document.addEventListener('change', (e) => {
+      const form = controls(e.target);
+      if (!form) return;
+      if (e.target.name === 'mode') {
+        form.querySelector('input[name="per"]').disabled = (e.target.value === 'day');
+        resubmit(form, 'input[name="page"], input[name="cursor"]');
+      } else if (e.target.id === 'sort') {
+        // Reset to page 1 when sort key changes
+        resubmit(form, 'input[name="page"]');
+      }
     });
 
-    sortSelect?.addEventListener('change', () => {
-      // Reset to page 1 when sort key changes
-      form.querySelectorAll('input[name="page"]').forEach(x => x.remove());
-      form.submit();
+    document.addEventListener('click', (e) => {
+      if (e.target.id !== 'invert-btn') return;
+      const form = controls(e.target);
+      const dirInput = form.querySelector('#dir');
+      dirInput.value = (dirInput.value === 'asc') ? 'desc' : 'asc';
+      // Reset to page 1 on sort change
+      resubmit(form, 'input[name="page"]');
     });
-  })();
\ No newline at end of file
+  })();
@@ -0,0 +1,41 @@
+// static/js/pendingDeletionsCountdown.js
+// Archiving happens on the server (manage.py archive_expired / the sweeper
+// thread); this only shows the time left until each row's data-archive-at.
+(function () {
+  const TICK_MS = 1000;
+
+  function parseISO(s) {
+    // new Date('2025-08-21T12:34:56+00:00') works in modern browsers
+    const d = s ? new Date(s) : null;
+    return (d && !isNaN(d.getTime())) ? d : null;
+  }
+
+  function formatHHMMSS(totalMs) {
+    if (totalMs <= 0) return '00:00:00';
+    const totalSec = Math.floor(totalMs / 1000);
+    const hh = String(Math.floor(totalSec / 3600)).padStart(2, '0');
+    const mm = String(Math.floor((totalSec % 3600) / 60)).padStart(2, '0');
+    const ss = String(totalSec % 60).padStart(2, '0');
+    return `${hh}:${mm}:${ss}`;
+  }
+
+  function updateCountdowns() {
+    const now = new Date();
+    document.querySelectorAll('tr[data-pk][data-archive-at]').forEach(row => {
+      const cell = row.querySelector('.remaining-time');
+      if (!cell) return;
+      const archiveAt = parseISO(row.getAttribute('data-archive-at'));
+      if (!archiveAt) {
+        cell.textContent = '--:--:--';
+        return;
+      }
+      const remainingMs = archiveAt - now;
+      cell.textContent = remainingMs > 0 ? formatHHMMSS(remainingMs) : 'Archiving…';
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    updateCountdowns();
+    setInterval(updateCountdowns, TICK_MS);
+  });
+})();
@@ -5,7 +5,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
   clearBtn.addEventListener('click', () => {
     input.value = '';      // 1) Clear the text box
-    form.submit();         // 2) Submit the form (runs the GET without any q parameter)
+    form.requestSubmit();  // 2) Submit the form (runs the GET without any q parameter)
   });
 });
 
@@ -42,4 +42,9 @@ if (document.readyState === 'loading') {
   document.addEventListener('DOMContentLoaded', initSortable);
 } else {
   initSortable();  // DOM already parsed
-}
\ No newline at end of file
+}
+
+// tables swapped in by htmx (list refreshed in place)
+document.addEventListener('htmx:afterSwap', (ev) => {
+  ev.detail.target.querySelectorAll('table.sortable').forEach(makeTableSortable);
+});
\ No newline at end of file
@@ -9,6 +9,8 @@
 // - Prefill date/time to now (format YYYY-MM-DD and HH:MM).
 // - Prefill direction: if current state === 'in' => default 'out', else 'in'.
 // - Submit with fetch() + FormData and X-CSRFToken header; show validation errors from server.
+// - "New entry" (.js-traffic-new) opens the dialog empty and unlocked; picking a boat
+//   from the name typeahead (typeahead.js) fills it in as if its row had been clicked.
 
 (function () {
   // ---- CSRF helper (Django docs pattern) ----
@@ -66,6 +68,73 @@
     return {boatId, boatType, name, berth, state };
   }
 
+  // Helper: undo the row locks so the boat fields can be typed into
+  function unlockBoatFields() {
+    const selBoatType = form.querySelector('[name="boatType"]');
+    selBoatType?.classList.remove('is-locked-pe');
+    selBoatType?.removeAttribute('tabindex');
+    selBoatType?.removeAttribute('aria-disabled');
+    for (const name of ['name', 'berth']) {
+      const el = form.querySelector(`[name="${name}"]`);
+      if (el) {
+        el.readOnly = false;
+        el.classList.remove('is-locked-text');
+      }
+    }
+  }
+
+  // Helper: blank the per-entry fields and default date/time to now
+  function resetEntryFields() {
+    const now = nowForInputs();
+    const inDate = form.querySelector('[name="trDate"]');
+    const inTime = form.querySelector('[name="trTime"]');
+    if (inDate) inDate.value = now.date;
+    if (inTime) inTime.value = now.time;
+    for (const id of ['id_passengers', 'id_purpose', 'id_edr', 'id_etr', 'id_trComments']) {
+      const el = document.getElementById(id);
+      if (el) el.value = '';
+    }
+  }
+
+  // "New entry": empty, unlocked dialog; the name field suggests registered boats
+  document.addEventListener('click', (e) => {
+    const btn = e.target.closest('.js-traffic-new');
+    if (!btn || !form) return;
+    e.preventDefault();
+    unlockBoatFields();
+    for (const name of ['boat_id', 'boatType', 'name', 'berth']) {
+      const el = form.querySelector(`[name="${name}"]`);
+      if (el) el.value = '';
+    }
+    resetEntryFields();
+    if (err) err.textContent = '';
+    dlg?.showModal();
+    form.querySelector('[name="name"]')?.focus();
+  });
+
+  // A boat picked from the name typeahead: fill the boat fields, link the entry to it
+  form?.addEventListener('typeahead:select', (e) => {
+    e.preventDefault();   // keep typeahead.js from submitting
+    const boat = e.detail;
+    const set = (name, value) => {
+      const el = form.querySelector(`[name="${name}"]`);
+      if (el) el.value = value || '';
+    };
+    set('boat_id', boat.id);
+    set('boatType', boat.boatType);
+    set('name', boat.name);
+    set('berth', boat.berth);
+    set('direction', boat.state === 'in' ? 'out' : 'in');
+  });
+
+  // Typing a different name drops the link to the boat picked before
+  form?.querySelector('[name="name"]')?.addEventListener('input', (e) => {
+    if (!e.target.readOnly) {
+      const hid = form.querySelector('[name="boat_id"]');
+      if (hid) hid.value = '';
+    }
+  });
+
   // Main: open/prefill dialog when Traffic link clicked
   document.addEventListener('click', (e) => {
     const link = e.target.closest('.js-traffic');
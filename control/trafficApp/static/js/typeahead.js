@@ -0,0 +1,115 @@
+// static/js/typeahead.js
+// Boat suggestions under a text input, from /typeahead/ (utils/typeahead.py).
+//
+// Markup: a wrapper with data-typeahead="<endpoint url>" around the input.
+// Key behaviours:
+// - Ask after a short pause in typing; a newer keystroke aborts the request
+//   still in flight (AbortController), and answers for an older `q` are dropped.
+// - Up/Down move through the list, Enter picks, Escape closes.
+// - Picking fires a bubbling "typeahead:select" event on the wrapper with the
+//   boat in event.detail ({id, name, berth, boatType, state}). Without a
+//   listener, the input gets the boat's name and its form is submitted.
+
+(function () {
+  const DELAY_MS = 120;
+
+  function attach(wrapper) {
+    const input = wrapper.querySelector('input[type="text"], input:not([type])');
+    if (!input || wrapper.dataset.typeaheadReady) return;
+    wrapper.dataset.typeaheadReady = '1';
+    wrapper.classList.add('typeahead');
+    input.setAttribute('autocomplete', 'off');
+
+    const menu = document.createElement('ul');
+    menu.className = 'typeahead-menu';
+    menu.setAttribute('role', 'listbox');
+    menu.hidden = true;
+    wrapper.appendChild(menu);
+
+    let timer = null;
+    let inflight = null;       // AbortController of the request in flight
+    let boats = [];
+    let active = -1;
+
+    function close() {
+      menu.hidden = true;
+      active = -1;
+    }
+
+    function highlight(i) {
+      active = i;
+      menu.querySelectorAll('li').forEach((li, k) => li.classList.toggle('is-active', k === i));
+    }
+
+    function render(data) {
+      boats = data.boats || [];
+      const last = {};
+      for (const t of data.traffic || []) {
+        if (!(t.boat in last)) last[t.boat] = t;   // newest first
+      }
+      menu.innerHTML = '';
+      boats.forEach((b, i) => {
+        const li = document.createElement('li');
+        li.setAttribute('role', 'option');
+        const seen = last[b.id];
+        li.textContent = `${b.name} · ${b.berth || '—'} · ${b.boatType} · ${b.state}`
+          + (seen ? ` (last ${seen.direction} ${seen.occurred_at.slice(0, 16).replace('T', ' ')})` : '');
+        li.addEventListener('mousedown', (e) => { e.preventDefault(); pick(i); });
+        menu.appendChild(li);
+      });
+      menu.hidden = boats.length === 0;
+      highlight(boats.length ? 0 : -1);
+    }
+
+    async function lookup(q) {
+      inflight?.abort();
+      if (!q.trim()) { close(); return; }
+      const controller = inflight = new AbortController();
+      try {
+        const url = `${wrapper.dataset.typeahead}?q=${encodeURIComponent(q)}`;
+        const res = await fetch(url, { signal: controller.signal, credentials: 'same-origin' });
+        if (!res.ok) return;
+        const data = await res.json();
+        if (data.q === input.value) render(data);   // stale answers are dropped
+      } catch (e) {
+        if (e.name !== 'AbortError') close();
+      } finally {
+        if (inflight === controller) inflight = null;
+      }
+    }
+
+    function pick(i) {
+      const boat = boats[i];
+      if (!boat) return;
+      close();
+      const event = new CustomEvent('typeahead:select', { bubbles: true, cancelable: true, detail: boat });
+      if (wrapper.dispatchEvent(event)) {
+        input.value = boat.name;
+        input.form?.requestSubmit();
+      }
+    }
+
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      if (input.readOnly) return;
+      timer = setTimeout(() => lookup(input.value), DELAY_MS);
+    });
+
+    input.addEventListener('keydown', (e) => {
+      if (menu.hidden) return;
+      if (e.key === 'ArrowDown') { e.preventDefault(); highlight((active + 1) % boats.length); }
+      else if (e.key === 'ArrowUp') { e.preventDefault(); highlight((active - 1 + boats.length) % boats.length); }
+      else if (e.key === 'Enter' && active >= 0) { e.preventDefault(); pick(active); }
+      else if (e.key === 'Escape') { e.preventDefault(); close(); }
+    });
+
+    input.addEventListener('blur', close);
+  }
+
+  function attachAll(root) {
+    root.querySelectorAll('[data-typeahead]').forEach(attach);
+  }
+
+  document.addEventListener('DOMContentLoaded', () => attachAll(document));
+  document.body?.addEventListener('htmx:afterSwap', (e) => attachAll(e.target));
+})();
@@ -0,0 +1,26 @@
+# trafficApp/templatetags/list_rows.py
+from django import template
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from ..utils import rows
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_rows(context, objects, row_partial):
+    """
+    The <tr>s of a list table: through the compiled renderer for row_partial
+    when there is one (utils/rows.py), otherwise by rendering the partial once
+    per object with `obj` set, as {% include row_partial with obj=obj %} did.
+    """
+    renderer = rows.renderer_for(row_partial, context) if settings.FAST_ROW_RENDERING else None
+    if renderer is not None:
+        return mark_safe(renderer.render(objects))
+    partial = context.template.engine.get_template(row_partial)
+    parts = []
+    for obj in objects:
+        with context.push(obj=obj):
+            parts.append(f"{rows.ROW_PREFIX}{partial.render(context)}{rows.ROW_SUFFIX}")
+    return mark_safe("".join(parts))
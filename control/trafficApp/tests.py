@@ -1,3 +1,1814 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import zipfile
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import InvalidPage
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import scheduler, urls, views
+from .benchmarks import harness, load as bench_load, seed as bench_seed
+from .forms import NewTrafficForm
+from .middleware import PerformanceMiddleware
+from .models import (BackfillCheckpoint, Boat, ChangeEvent, ColdBoat, ColdTrafficEntry, DailyTrafficSummary, ImportJob,
+                     OccupancySnapshot, TrafficEntry)
+from .utils import (backfill, boat_batch, dbcopy, importer, listcache, live, occupancy, perf, reports, rows, search,
+                    tiering, traffic_batch, typeahead, writes)
+from .utils.export import iter_xlsx
+from .utils.paginators import DayPaginator, KeysetPaginator
+
+try:
+    import numpy
+    from .analytics import query as analytics_query, snapshot as analytics_snapshot
+except ImportError:  # optional: analytics tests are skipped
+    numpy = None
+
+
+def make_entry(**kwargs):
+    fields = {
+        "boatType": "M/Y", "name": "ALPHA", "berth": "A1",
+        "trDate": date(2025, 7, 1), "trTime": time(10, 0),
+        "direction": "in", "passengers": 2,
+    }
+    fields.update(kwargs)
+    entry = TrafficEntry(**fields)
+    entry.save()
+    return entry
+
+
+def summary_rows():
+    return list(
+        DailyTrafficSummary.objects.order_by("day").values(
+            "day", "movements", "in_count", "out_count", "repair_count", "passengers",
+            "my_count", "sy_count", "cat_count", "jetski_count", "tender_count",
+        )
+    )
+
+
+class DailyTrafficSummaryTests(TestCase):
+    def test_create_counts_entry(self):
+        make_entry()
+        make_entry(direction="out", boatType="S/Y", passengers=None)
+        row = DailyTrafficSummary.objects.get(day=date(2025, 7, 1))
+        self.assertEqual(row.movements, 2)
+        self.assertEqual((row.in_count, row.out_count), (1, 1))
+        self.assertEqual((row.my_count, row.sy_count), (1, 1))
+        self.assertEqual(row.passengers, 2)
+
+    def test_edit_moving_entry_to_another_day(self):
+        entry = make_entry()
+        entry.trDate = date(2025, 7, 3)
+        entry.direction = "repair"
+        entry.save()
+        self.assertFalse(DailyTrafficSummary.objects.filter(day=date(2025, 7, 1)).exists())
+        row = DailyTrafficSummary.objects.get(day=date(2025, 7, 3))
+        self.assertEqual((row.movements, row.in_count, row.repair_count), (1, 0, 1))
+
+    def test_untimed_entry_uses_trdate(self):
+        make_entry(trTime=None)
+        self.assertTrue(DailyTrafficSummary.objects.filter(day=date(2025, 7, 1)).exists())
+
+    def test_delete_removes_empty_day(self):
+        keep = make_entry()
+        gone = make_entry(trDate=date(2025, 7, 2))
+        gone.delete()
+        TrafficEntry.objects.filter(pk=keep.pk).delete()
+        self.assertEqual(DailyTrafficSummary.objects.count(), 0)
+
+    def test_rebuild_matches_incremental(self):
+        make_entry()
+        make_entry(trDate=date(2025, 7, 2), boatType="TENDER", direction="out")
+        edited = make_entry(trDate=date(2025, 6, 30), trTime=None)
+        edited.passengers = 5
+        edited.save()
+        incremental = summary_rows()
+        DailyTrafficSummary.rebuild()
+        self.assertEqual(summary_rows(), incremental)
+
+
+class SearchIndexTests(TestCase):
+    fields = ("name", "berth", "trDate")
+
+    def search(self, text):
+        return search.filter_queryset(TrafficEntry.objects.all(), self.fields, text)
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        if not search.is_available(TrafficEntry):
+            self.skipTest("no search index on this database")
+        entry = make_entry(name="ZEBRAFISH")
+        self.assertEqual(list(self.search("zebra")), [entry])
+        TrafficEntry.objects.filter(pk=entry.pk).update(name="YAK")
+        self.assertFalse(self.search("zebra").exists())
+        self.assertTrue(self.search("yak").exists())
+        entry.delete()
+        self.assertFalse(self.search("yak").exists())
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 tokenization")
+    def test_date_words_match_any_separator(self):
+        make_entry(trDate=date(2025, 7, 14))
+        self.assertEqual(self.search("2025/07/14").count(), 1)
+
+    def test_unindexed_fields_or_empty_words_fall_back(self):
+        self.assertIsNone(search.filter_queryset(TrafficEntry.objects.all(), ("created",), "x"))
+        self.assertIsNone(self.search("//"))
+
+    def test_boat_list_applies_search(self):
+        Boat(name="alpha", berth="A1", deleted=False, archived=False).save()
+        Boat(name="bravo", berth="B2", deleted=False, archived=False).save()
+        resp = self.client.get(reverse("boats"), {"q": "alp"})
+        self.assertEqual([b.name for b in resp.context["object_list"]], ["ALPHA"])
+
+
+class TrafficExportTests(TestCase):
+    def setUp(self):
+        make_entry(name="ALPHA", trDate=date(2025, 7, 1))
+        make_entry(name="BRAVO", trDate=date(2025, 7, 2))
+        make_entry(name="CHARLIE", trDate=date(2025, 7, 2), trTime=None)
+
+    def export(self, **params):
+        resp = self.client.get(reverse("traffic-export"), params)
+        return resp, b"".join(resp.streaming_content)
+
+    def test_csv_exports_current_day(self):
+        _, body = self.export(format="csv", day="2025-07-02", sort="name", dir="asc")
+        rows = list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))
+        self.assertEqual([r[1] for r in rows[1:]], ["BRAVO", "CHARLIE"])
+
+    def test_xlsx_exports_all_search_results(self):
+        resp, body = self.export(format="xlsx", scope="all", q="alpha")
+        self.assertIn(".xlsx", resp["Content-Disposition"])
+        sheet = zipfile.ZipFile(io.BytesIO(body)).read("xl/worksheets/sheet1.xml")
+        self.assertEqual(sheet.count(b"<row "), 2)  # header + ALPHA
+
+
+class LegacyImportTests(TestCase):
+    TRAFFIC_CSV = (
+        "Type,Name,Date,Time,Direction,Passengers,Berth\n"
+        "M/Y,alpha,2025/07/01,09:30,Arrival,3,A1\n"
+        "S/Y,ghost,2025/07/01,,out,,Z9\n"
+        "M/Y,broken,2025/13/01,10:00,sideways,0,\n"
+    )
+
+    def test_traffic_rows_are_validated_matched_and_summarised(self):
+        boat = Boat(name="ALPHA", berth="A1", deleted=False, archived=False)
+        boat.save()
+        report = importer.import_traffic(io.BytesIO(self.TRAFFIC_CSV.encode()), "log.csv")
+        self.assertEqual((report.total, report.created, report.failed), (3, 2, 1))
+        self.assertEqual(report.matched_boats, 1)
+        row_number, errors = report.errors[0]
+        self.assertEqual(row_number, 4)
+        self.assertEqual(set(errors), {"trDate", "direction", "passengers", "berth"})
+
+        alpha = TrafficEntry.objects.get(name="ALPHA")
+        self.assertEqual(alpha.trafficBoatId_id, boat.pk)
+        self.assertEqual(alpha.direction, "in")
+        self.assertIsNotNone(alpha.occurred_at)
+        self.assertIsNone(TrafficEntry.objects.get(name="GHOST").occurred_at)
+        self.assertEqual(DailyTrafficSummary.objects.get(day=date(2025, 7, 1)).movements, 2)
+
+    def test_dry_run_inserts_nothing(self):
+        report = importer.import_traffic(io.BytesIO(self.TRAFFIC_CSV.encode()), "log.csv", dry_run=True)
+        self.assertEqual(report.created, 2)
+        self.assertFalse(TrafficEntry.objects.exists())
+
+    def test_xlsx_round_trip(self):
+        header = ["Type", "Name", "Date", "Time", "Direction", "Berth"]
+        rows = [["CAT.", "delta", date(2025, 7, 2), time(14, 15), "out", "D4"]]
+        workbook = b"".join(iter_xlsx(header, rows))
+        report = importer.import_traffic(io.BytesIO(workbook), "log.xlsx")
+        self.assertEqual(report.created, 1)
+        entry = TrafficEntry.objects.get()
+        self.assertEqual((entry.trDate, entry.trTime), (date(2025, 7, 2), time(14, 15)))
+
+    def test_spreadsheet_values_are_prepared_for_the_form_fields(self):
+        fields = importer.traffic_fields(NewTrafficForm.base_fields)
+        cleaned, errors = importer.clean_traffic_row(
+            {"boatType": " M/Y ", "name": " alpha ", "trDate": "14.07.2025", "trTime": "9.05",
+             "direction": "Departure", "passengers": " 3 ", "purpose": "  ", "berth": "a1",
+             "edr": datetime(2025, 7, 20, 8, 0), "trComments": 12}, fields)
+        self.assertEqual(errors, {})
+        self.assertEqual(set(cleaned), set(NewTrafficForm.base_fields))
+        self.assertEqual((cleaned["name"], cleaned["berth"], cleaned["direction"]), ("ALPHA", "A1", "out"))
+        self.assertEqual((cleaned["trDate"], cleaned["trTime"]), (date(2025, 7, 14), time(9, 5)))
+        self.assertEqual((cleaned["edr"], cleaned["passengers"], cleaned["trComments"]), (date(2025, 7, 20), 3, "12"))
+
+        cleaned, errors = importer.clean_traffic_row(
+            {"boatType": "YACHT", "name": "x" * 101, "trDate": "2025/02/30", "passengers": "-1", "berth": "A1",
+             "direction": "in"}, fields)
+        self.assertEqual(set(errors), {"boatType", "name", "trDate", "passengers"})
+        self.assertIn("Ensure this value has at most 100 characters (it has 101).", errors["name"])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 insert trigger")
+    def test_imported_rows_are_searchable(self):
+        importer.import_traffic(io.BytesIO(self.TRAFFIC_CSV.encode()), "log.csv", chunk_size=1)
+        found = search.filter_queryset(TrafficEntry.objects.all(), ("name", "berth"), "ghost")
+        self.assertEqual([e.name for e in found], ["GHOST"])
+
+    def test_boat_registry_uses_boat_form_rules(self):
+        registry = (
+            "Type,Name,Berth,State,Check-In,Check-Out\n"
+            "M/Y,alpha,a1,In,Yearly,Yearly\n"
+            "S/Y,bravo,b2,out,2025/07/10,2025/07/01\n"
+        )
+        upload = SimpleUploadedFile("boats.csv", registry.encode(), content_type="text/csv")
+        resp = self.client.post(reverse("import"), {"kind": "boats", "file": upload})
+        report = resp.context["report"]
+        self.assertEqual((report.created, report.failed), (1, 1))
+        boat = Boat.objects.visible().get()
+        self.assertEqual((boat.name, boat.berth, boat.cid), ("ALPHA", "A1", "Yearly"))
+
+
+@override_settings(IMPORT_INLINE_MAX_BYTES=0)
+class BackgroundImportTests(TransactionTestCase):
+    # the import thread needs to see the committed job row
+    def wait_for(self, job_pk):
+        for thread in threading.enumerate():
+            if thread.name == f"import-{job_pk}":
+                thread.join(30)
+
+    def test_large_upload_is_imported_in_the_background(self):
+        upload = SimpleUploadedFile("log.csv", LegacyImportTests.TRAFFIC_CSV.encode(), content_type="text/csv")
+        resp = self.client.post(reverse("import"), {"kind": "traffic", "file": upload})
+        job = ImportJob.objects.get()
+        self.assertRedirects(resp, reverse("import-status", args=[job.pk]))
+        self.wait_for(job.pk)
+
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual((job.total, job.created, job.failed, job.error), (3, 2, 1, ""))
+        self.assertEqual(job.errors[0][0], 4)
+        self.assertEqual(TrafficEntry.objects.count(), 2)
+        resp = self.client.get(reverse("import-status", args=[job.pk]))
+        self.assertContains(resp, "Imported\n            2 of 3 row(s)")
+        self.assertNotContains(resp, 'http-equiv="refresh"')
+
+    def test_failure_is_recorded_on_the_job(self):
+        upload = SimpleUploadedFile("log.xlsx", b"not a zip file")
+        with self.assertLogs("trafficApp.utils.importer", "ERROR"):
+            self.client.post(reverse("import"), {"kind": "traffic", "file": upload})
+            job = ImportJob.objects.get()
+            self.wait_for(job.pk)
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn("BadZipFile", job.error)
+
+
+@override_settings(PENDING_DELETION_RETENTION_HOURS=48)
+class AutoArchiveTests(TestCase):
+    def pending(self, name, hours_ago):
+        boat = Boat(name=name, berth="A1", deleted=False, archived=False)
+        boat.save()  # save() always clears the flags, so mark it pending directly
+        Boat.all_objects.filter(pk=boat.pk).update(
+            deleted=True, deleted_at=timezone.now() - timedelta(hours=hours_ago)
+        )
+        return Boat.all_objects.get(pk=boat.pk)
+
+    def test_only_expired_pending_deletions_are_archived(self):
+        old = self.pending("old", 49)
+        fresh = self.pending("fresh", 1)
+        live = Boat(name="live", berth="B2", deleted=False, archived=False)
+        live.save()
+        out = io.StringIO()
+        call_command("archive_expired", stdout=out)
+        self.assertIn("Archived 1 boat(s)", out.getvalue())
+        self.assertEqual(list(Boat.all_objects.filter(archived=True)), [old])
+        self.assertIsNotNone(Boat.all_objects.get(pk=old.pk).archived_at)
+        self.assertEqual(Boat.objects.archive_expired(), 0)
+        self.assertEqual(list(Boat.objects.pending_deletions()), [fresh])
+
+    def test_pending_page_exposes_deadline(self):
+        boat = self.pending("fresh", 1)
+        resp = self.client.get(reverse("pending-deletions"))
+        self.assertContains(resp, f'data-archive-at="{boat.archive_deadline.isoformat()}"')
+
+    def test_sweeper_starts_with_the_serving_entry_points_only(self):
+        self.assertEqual(settings.AUTO_ARCHIVE_INTERVAL_SECONDS, 300)
+        with mock.patch.object(scheduler, "start") as start:
+            apps.get_app_config("trafficApp").ready()
+            start.assert_not_called()
+            with mock.patch.dict(os.environ):  # control.asgi sets TRAFFIC_ASYNC_VIEWS / TRAFFIC_LIVE_EVENTS
+                for module in ("control.wsgi", "control.asgi"):
+                    sys.modules.pop(module, None)
+                    importlib.import_module(module)
+            self.assertEqual(start.call_args_list, [mock.call(300), mock.call(300)])
+            with override_settings(AUTO_ARCHIVE_INTERVAL_SECONDS=0):
+                self.assertIsNone(scheduler.start_for_serving())
+            self.assertEqual(start.call_count, 2)
+
+
+class BoatBatchTests(TestCase):
+    def setUp(self):
+        self.boats = []
+        for name in ("alpha", "bravo", "charlie"):
+            boat = Boat(name=name, berth="A1", deleted=False, archived=False)
+            boat.save()
+            self.boats.append(boat.pk)
+
+    def post(self, name, ids):
+        return self.client.post(reverse(name), {"ids": ids}, content_type="application/json").json()
+
+    def test_soft_delete_reports_outcome_per_id(self):
+        a, b, c = self.boats
+        self.post("boat-batch-soft-delete", [a])
+        data = self.post("boat-batch-soft-delete", [a, b, 999999])
+        self.assertEqual(data["results"], {str(a): "already_deleted", str(b): "done", "999999": "not_found"})
+        self.assertEqual(data["done"], 1)
+        self.assertEqual(list(Boat.objects.visible().values_list("pk", flat=True)), [c])
+
+    def test_archive_and_cancel_require_pending_deletion(self):
+        a, b, c = self.boats
+        self.post("boat-batch-soft-delete", [a, b])
+        data = self.post("boat-batch-archive", [a, c])
+        self.assertEqual(data["results"], {str(a): "done", str(c): "not_deleted"})
+        data = self.post("boat-batch-cancel-delete", [b, c])
+        self.assertEqual(data["results"], {str(b): "done", str(c): "not_deleted"})
+        self.assertEqual(set(Boat.objects.visible().values_list("pk", flat=True)), {b, c})
+        self.assertTrue(Boat.all_objects.get(pk=a).archived)
+
+    def test_chunks_use_one_update_each(self):
+        with CaptureQueriesContext(connection) as ctx:
+            boat_batch.soft_delete(self.boats, chunk_size=2)
+        table = Boat._meta.db_table
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(Boat.objects.visible().exists())
+
+    def test_bad_ids_rejected(self):
+        resp = self.client.post(reverse("boat-batch-archive"), {"ids": ["x"]}, content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+
+
+class TrafficBatchTests(TestCase):
+    def setUp(self):
+        self.alpha = Boat.objects.create(name="ALPHA", berth="A1", boatType="M/Y")
+        self.bravo = Boat.objects.create(name="BRAVO", berth="B2", boatType="S/Y")
+        self.gone = Boat.objects.create(name="GONE", berth="C3")
+        Boat.all_objects.filter(pk=self.gone.pk).update(deleted=True, deleted_at=timezone.now())
+
+    def post(self, ids, **fields):
+        data = {"trDate": "2025-07-01", "trTime": "10:00", "direction": "out", "purpose": "regatta", **fields}
+        return self.client.post(reverse("traffic-batch-create"), {"ids": ids, **data}, content_type="application/json")
+
+    def test_create_links_the_boat_in_the_insert(self):
+        listcache.bump(TrafficEntry, Boat)  # the counters exist after the first write
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(reverse("traffic-create"), {
+                "boatType": "M/Y", "name": "ALPHA", "berth": "A1", "trDate": "2025-07-01", "trTime": "10:00",
+                "direction": "out", "boat_id": self.alpha.pk,
+            }, headers={"X-Requested-With": "XMLHttpRequest"})
+        self.assertEqual(resp.json()["boat_updated"], True)
+        table = TrafficEntry._meta.db_table
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith(f'UPDATE "{table}"')])
+        # boat UPDATE, entry INSERT, summary upsert, snapshot DELETE, one cache version UPDATE
+        # (plus the test transaction's savepoint)
+        self.assertEqual(len([q for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]), 5)
+        entry = TrafficEntry.objects.get(pk=resp.json()["id"])
+        self.assertEqual(entry.trafficBoatId_id, self.alpha.pk)
+        self.assertEqual(Boat.objects.get(pk=self.alpha.pk).state, "out")
+
+        # an unknown boat: the entry is saved unlinked
+        resp = self.client.post(reverse("traffic-create"), {
+            "boatType": "M/Y", "name": "ZULU", "berth": "Z9", "trDate": "2025-07-01", "direction": "in",
+            "boat_id": 999999,
+        }, headers={"X-Requested-With": "XMLHttpRequest"})
+        self.assertEqual(resp.json()["boat_updated"], False)
+        self.assertIsNone(TrafficEntry.objects.get(pk=resp.json()["id"]).trafficBoatId_id)
+
+    @override_settings(LIVE_EVENTS_ENABLED=True)
+    def test_records_one_entry_per_boat_in_one_insert_and_one_update(self):
+        ids = [self.alpha.pk, self.bravo.pk, self.gone.pk, 999999, self.alpha.pk]
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.post(ids).json()
+        self.assertEqual(data["results"], {str(self.alpha.pk): "done", str(self.bravo.pk): "done",
+                                           str(self.gone.pk): "deleted", "999999": "not_found"})
+        self.assertEqual((data["done"], data["state"]), (2, "out"))
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sqls if q.startswith(f'INSERT INTO "{TrafficEntry._meta.db_table}"')]), 1)
+        self.assertEqual(len([q for q in sqls if q.startswith(f'UPDATE "{Boat._meta.db_table}"')]), 1)
+
+        entries = TrafficEntry.objects.order_by("pk")
+        self.assertEqual([(e.name, e.berth, e.boatType, e.trafficBoatId_id, e.purpose) for e in entries],
+                         [("ALPHA", "A1", "M/Y", self.alpha.pk, "regatta"),
+                          ("BRAVO", "B2", "S/Y", self.bravo.pk, "regatta")])
+        self.assertEqual(data["entries"], {str(e.trafficBoatId_id): e.pk for e in entries})
+        at = timezone.make_aware(datetime(2025, 7, 1, 10))
+        self.assertEqual({e.occurred_at for e in entries}, {at})
+        self.assertEqual(dict(Boat.all_objects.values_list("name", "state")), {"ALPHA": "out", "BRAVO": "out",
+                                                                               "GONE": "in"})
+        self.assertEqual(occupancy.state_of(self.bravo, at), "out")
+        summary = summary_rows()
+        self.assertEqual([(r["day"], r["movements"], r["out_count"], r["my_count"], r["sy_count"]) for r in summary],
+                         [(date(2025, 7, 1), 2, 2, 1, 1)])
+        events = [(e.topic, e.action, e.data) for e in ChangeEvent.objects.order_by("pk")]
+        self.assertEqual(events[-1], ("traffic", "created", {
+            "pks": [e.pk for e in entries], "day": "2025-07-01", "boats": [self.alpha.pk, self.bravo.pk], "state": "out",
+        }))
+
+    def test_drops_stale_snapshots(self):
+        make_entry(trafficBoatId=self.alpha, trDate=date(2025, 6, 1), direction="in")
+        occupancy.build(now=timezone.make_aware(datetime(2025, 7, 10)))
+        self.post([self.alpha.pk], trDate="2025-07-05")
+        self.assertFalse(OccupancySnapshot.objects.filter(
+            taken_at__gte=timezone.make_aware(datetime(2025, 7, 5, 10))).exists())
+        self.assertEqual(occupancy.state_of(self.alpha, timezone.make_aware(datetime(2025, 7, 8))), "out")
+
+    def test_rejects_bad_requests(self):
+        resp = self.post([self.alpha.pk], trDate="")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("trDate", resp.json()["errors"])
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(["x"]).status_code, 400)
+        self.assertEqual(self.post(list(range(1, traffic_batch.MAX_IDS + 2))).status_code, 400)
+        self.assertFalse(TrafficEntry.objects.exists())
+
+    def test_boat_list_offers_the_movement(self):
+        resp = self.client.get(reverse("boats"))
+        self.assertContains(resp, 'data-dialog="batchTrafficDialog"')
+        self.assertContains(resp, 'id="id_batch_trDate"')
+
+
+class WriteCoordinationTests(TransactionTestCase):
+    def setUp(self):
+        writes.reset_stats()
+
+    def flaky(self, failures, error="database is locked"):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return "saved"
+        return write, calls
+
+    def test_lock_errors_are_retried_and_counted(self):
+        write, calls = self.flaky(2)
+        with mock.patch.object(writes.time, "sleep") as sleep:
+            self.assertEqual(writes.run(write), "saved")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual((writes.stats()["retries"], writes.stats()["writes"]), (2, 1))
+
+    def test_backoff_sleeps_without_the_writer_lock(self):
+        free = []
+
+        def take_lock():
+            acquired = writes._writer.acquire(timeout=1)
+            if acquired:
+                writes._writer.release()
+            free.append(acquired)
+
+        def sleep(seconds):
+            # another thread must be able to write while this one backs off
+            other = threading.Thread(target=take_lock)
+            other.start()
+            other.join()
+
+        write, calls = self.flaky(2)
+        with mock.patch.object(writes.time, "sleep", side_effect=sleep):
+            self.assertEqual(writes.run(write), "saved")
+        self.assertEqual(free, [True, True])
+
+    def test_other_errors_and_exhausted_retries_propagate(self):
+        with mock.patch.object(writes.time, "sleep"):
+            write, calls = self.flaky(1, error="no such table: x")
+            self.assertRaises(OperationalError, writes.run, write)
+            self.assertEqual(len(calls), 1)
+            write, calls = self.flaky(writes.MAX_ATTEMPTS)
+            self.assertRaises(OperationalError, writes.run, write)
+        self.assertEqual(writes.stats()["failures"], 1)
+
+    def test_nested_write_runs_once(self):
+        write, calls = self.flaky(1)
+        with transaction.atomic():
+            self.assertRaises(OperationalError, writes.run, write)
+        self.assertEqual(len(calls), 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = {writes.backoff(10) for _ in range(20)}
+        self.assertGreater(len(delays), 1)
+        self.assertTrue(all(0 <= d <= writes.MAX_DELAY for d in delays))
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # ties on passengers (3 x 3) and two NULLs, which sort last
+        for n, passengers in enumerate([3, 1, 3, None, 2, 3, None]):
+            make_entry(name=f"K{n}", passengers=passengers)
+
+    def expected(self, direction):
+        rows = list(TrafficEntry.objects.all())
+        with_value = sorted((e for e in rows if e.passengers is not None),
+                            key=lambda e: (e.passengers, e.pk), reverse=direction == "desc")
+        nulls = sorted((e for e in rows if e.passengers is None), key=lambda e: e.pk,
+                       reverse=direction == "desc")
+        return [e.pk for e in with_value + nulls]
+
+    def paginator(self, direction="desc", field="passengers"):
+        return KeysetPaginator(TrafficEntry.objects.all(), per=2, field=field, direction=direction)
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        entry = TrafficEntry.objects.get(name="K0")
+        cursor = paginator.encode_cursor(entry, paginator.NEXT)
+        self.assertEqual(paginator.decode_cursor(cursor), (paginator.NEXT, 3, entry.pk))
+        null_entry = TrafficEntry.objects.get(name="K3")
+        cursor = paginator.encode_cursor(null_entry, paginator.PREVIOUS)
+        self.assertEqual(paginator.decode_cursor(cursor), (paginator.PREVIOUS, None, null_entry.pk))
+
+        # datetimes keep their microseconds, or the seek would skip or repeat rows
+        at = timezone.make_aware(datetime(2025, 7, 1, 10, 0, 0, 123456))
+        TrafficEntry.objects.filter(pk=entry.pk).update(occurred_at=at)
+        entry.refresh_from_db()
+        paginator = self.paginator(field="occurred_at")
+        cursor = paginator.encode_cursor(entry, paginator.NEXT)
+        self.assertEqual(paginator.decode_cursor(cursor), (paginator.NEXT, at, entry.pk))
+
+    def test_walks_forward_and_back_through_ties_and_nulls(self):
+        for direction in ("desc", "asc"):
+            paginator = self.paginator(direction)
+            pages = [paginator.page()]
+            self.assertFalse(pages[0].has_previous())
+            while pages[-1].has_next():
+                pages.append(paginator.page(pages[-1].next_cursor))
+            ids = [e.pk for page in pages for e in page]
+            self.assertEqual(ids, self.expected(direction), direction)
+            self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+            self.assertTrue(all(page.has_previous() for page in pages[1:]))
+
+            back = [pages[-1]]
+            while back[-1].has_previous():
+                back.append(paginator.page(back[-1].previous_cursor))
+            self.assertEqual([[e.pk for e in page] for page in back[::-1]],
+                             [[e.pk for e in page] for page in pages], direction)
+            self.assertTrue(all(page.has_next() for page in back[1:]))
+
+    def test_tampered_or_foreign_cursors_fall_back_to_the_first_page(self):
+        paginator = self.paginator()
+        entry = TrafficEntry.objects.get(name="K0")
+        good = paginator.encode_cursor(entry, paginator.NEXT)
+
+        def forge(**changes):
+            payload = json.loads(urlsafe_b64decode(good + "=" * (-len(good) % 4)))
+            payload.update(changes)
+            return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        bad = [
+            "!!!", "not-a-cursor", urlsafe_b64encode(b"[1, 2]").decode(), good[:-3],
+            forge(s="name"), forge(o="asc"), forge(t="x"), forge(v="three"), forge(id="x"),
+        ]
+        first = [e.pk for e in paginator.page()]
+        for cursor in bad:
+            self.assertIsNone(paginator.decode_cursor(cursor), cursor)
+            page = paginator.page(cursor)
+            self.assertEqual([e.pk for e in page], first, cursor)
+            self.assertFalse(page.has_previous())
+        # a cursor for another sort is ignored by that sort's paginator
+        self.assertIsNone(self.paginator("asc").decode_cursor(good))
+
+    def test_empty_queryset(self):
+        page = KeysetPaginator(TrafficEntry.objects.none(), per=2, field="passengers").page()
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_other_pages())
+        self.assertIsNone(page.next_cursor)
+
+
+class DayPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.untimed = make_entry(name="UNTIMED", trDate=date(2025, 6, 29), trTime=None)
+        cls.morning = make_entry(name="MORNING", trDate=date(2025, 7, 1), trTime=time(10, 0))
+        cls.late = make_entry(name="LATE", trDate=date(2025, 7, 3), trTime=time(23, 59, 59, 999999))
+        cls.midnight = make_entry(name="MIDNIGHT", trDate=date(2025, 7, 4), trTime=time(0, 0))
+
+    def paginators(self):
+        qs = TrafficEntry.objects.order_by("occurred_at", "id")
+        return [DayPaginator(qs), DayPaginator(qs, summaries=DailyTrafficSummary.objects.all())]
+
+    def names(self, page):
+        return [e.name for e in page.object_list]
+
+    def test_bounds_include_untimed_rows_and_empty_days(self):
+        for paginator in self.paginators():
+            self.assertEqual((paginator.min_day, paginator.max_day), (date(2025, 6, 29), date(2025, 7, 4)))
+            self.assertEqual(paginator.count, 6)
+            self.assertEqual(list(paginator.page_range), [1, 2, 3, 4, 5, 6])
+            first, last = paginator.page(1), paginator.page(paginator.num_pages)
+            self.assertEqual((first.day, self.names(first)), (date(2025, 7, 4), ["MIDNIGHT"]))
+            self.assertEqual((last.day, self.names(last)), (date(2025, 6, 29), ["UNTIMED"]))
+            self.assertFalse(first.has_previous())
+            self.assertFalse(last.has_next())
+            self.assertRaises(InvalidPage, first.previous_page_number)
+            self.assertRaises(InvalidPage, last.next_page_number)
+
+            empty = paginator.page(paginator.page_for_day(date(2025, 6, 30)))
+            self.assertEqual((empty.day, self.names(empty)), (date(2025, 6, 30), []))
+
+    def test_day_for_page_and_page_for_day(self):
+        paginator = self.paginators()[0]
+        for number in paginator.page_range:
+            self.assertEqual(paginator.page_for_day(paginator.day_for_page(number)), number)
+        self.assertEqual(paginator.day_for_page(3), date(2025, 7, 2))
+        # days outside the range clamp to the first / last page
+        self.assertEqual(paginator.page_for_day(date(2025, 8, 1)), 1)
+        self.assertEqual(paginator.page_for_day(date(2025, 1, 1)), paginator.num_pages)
+
+    def test_out_of_range_or_invalid_pages(self):
+        paginator = self.paginators()[0]
+        for number in (0, -1, paginator.num_pages + 1, "x", "", None):
+            self.assertRaises(InvalidPage, paginator.page, number)
+        self.assertEqual(paginator.page("2").day, date(2025, 7, 3))
+
+    def test_day_filter_is_half_open_at_midnight(self):
+        paginator = self.paginators()[0]
+        on_3rd = paginator.page(paginator.page_for_day(date(2025, 7, 3)))
+        self.assertEqual(self.names(on_3rd), ["LATE"])
+        self.assertEqual(self.names(paginator.page(1)), ["MIDNIGHT"])
+        day = TrafficEntry.objects.filter(paginator.day_filter(date(2025, 6, 29)))
+        self.assertEqual([e.name for e in day], ["UNTIMED"])
+
+    def test_day_filter_uses_the_local_day(self):
+        # 00:30 in Athens on the 4th is still the 3rd in UTC, and so is LATE
+        with timezone.override("Europe/Athens"):
+            entry = make_entry(name="ATHENS", trDate=date(2025, 7, 4), trTime=time(0, 30))
+            self.assertEqual(entry.occurred_at.astimezone(dt_timezone.utc).date(), date(2025, 7, 3))
+            paginator = DayPaginator(TrafficEntry.objects.order_by("occurred_at", "id"))
+            self.assertEqual(self.names(paginator.page(1)), ["ATHENS", "LATE", "MIDNIGHT"])
+
+    def test_no_rows(self):
+        paginator = DayPaginator(TrafficEntry.objects.none())
+        self.assertEqual((paginator.count, paginator.num_pages), (0, 1))
+        page = paginator.page(1)
+        self.assertIsNone(page.day)
+        self.assertEqual(list(page.object_list), [])
+        self.assertFalse(page.has_other_pages())
+        self.assertRaises(InvalidPage, paginator.page, 2)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN for the queries the list views run. None may read a
+    whole table (SCAN without an index) or sort through a temp B-tree.
+
+    Two query shapes may sort, because what they sort is bounded: a day page
+    (one day's rows, found through the occurred_at / trDate indexes) and a
+    search (the FTS match set). They still must not scan.
+
+    Keyset pages and day pages must do better than an index walk: every step
+    on the traffic table is a SEARCH, i.e. a range on an index, never a
+    "SCAN ... USING INDEX" that reads the index from one end.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        boat = Boat(name="alpha", berth="A1", deleted=False, archived=False)
+        boat.save()
+        cls.boat = boat
+        for n in range(6):
+            make_entry(name=f"N{n}", trDate=date(2025, 7, 1 + n % 3),
+                       trTime=None if n % 2 else time(10, n), passengers=None if n % 3 else n)
+        pending = Boat(name="bravo", berth="B2", deleted=False, archived=False)
+        pending.save()
+        Boat.all_objects.filter(pk=pending.pk).update(deleted=True, deleted_at=timezone.now())
+
+    def plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def assert_plans(self, url, params=None, allow_sort=False, search_only=False):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, params or {})
+        self.assertEqual(resp.status_code, 200)
+        traffic_steps = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or '"trafficApp_' not in sql:
+                continue
+            for step in self.plan(sql):
+                table_scan = step.startswith("SCAN trafficApp_") and " INDEX" not in step
+                self.assertFalse(table_scan, f"{url} {params}: {step}\n{sql}")
+                if not allow_sort:
+                    self.assertNotIn("TEMP B-TREE", step, f"{url} {params}\n{sql}")
+                words = step.split()
+                if words[0] in ("SCAN", "SEARCH") and words[1] == "trafficApp_trafficentry":
+                    traffic_steps.append((step, sql))
+        if search_only:
+            self.assertTrue(traffic_steps, f"{url} {params}: no traffic query")
+            for step, sql in traffic_steps:
+                self.assertTrue(step.startswith("SEARCH "), f"{url} {params}: {step}\n{sql}")
+
+    def test_boat_lists(self):
+        self.assert_plans(reverse("boats"))
+        self.assert_plans(reverse("pending-deletions"))
+
+    def test_traffic_pages_for_every_sort(self):
+        for key in views.SORT_MAP:
+            for direction in ("asc", "desc"):
+                params = {"sort": key, "dir": direction, "per": 2}
+                self.assert_plans(reverse("traffic"), {**params, "mode": "per", "page": 2})
+                resp = self.client.get(reverse("traffic"), {**params, "mode": "cursor"})
+                cursor = resp.context["page_obj"].next_cursor
+                self.assert_plans(reverse("traffic"), {**params, "mode": "cursor", "cursor": cursor},
+                                  search_only=True)
+                resp = self.client.get(reverse("traffic"), {**params, "mode": "cursor", "cursor": cursor})
+                cursor = resp.context["page_obj"].previous_cursor
+                self.assert_plans(reverse("traffic"), {**params, "mode": "cursor", "cursor": cursor},
+                                  search_only=True)
+
+    def test_day_pages_and_search_only_sort_bounded_sets(self):
+        self.assert_plans(reverse("traffic"), {"day": "2025-07-02"}, allow_sort=True, search_only=True)
+        self.assert_plans(reverse("traffic"), allow_sort=True, search_only=True)
+        self.assert_plans(reverse("traffic"), {"mode": "per", "q": "N1"}, allow_sort=True)
+        self.assert_plans(reverse("boats"), {"q": "alp"}, allow_sort=True)
+
+    def test_boat_movements_use_boat_time_index(self):
+        qs = TrafficEntry.objects.filter(trafficBoatId=self.boat).order_by("-occurred_at")
+        sql, params = qs.query.sql_with_params()
+        self.assertIn("USING INDEX traffic_boat_occurred_at", " ".join(self.plan(sql, params)))
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_harness_on_a_small_dataset(self):
+        report = bench_seed.seed(boats=40, entries=300, years=1)
+        self.assertEqual(Boat.all_objects.count(), 40)
+        self.assertEqual(TrafficEntry.objects.count(), 300)
+        self.assertEqual(TrafficEntry.objects.filter(occurred_at__isnull=True).count(), report.untimed)
+        self.assertEqual(DailyTrafficSummary.objects.aggregate(n=Sum("movements"))["n"], 300)
+        if connection.vendor == "sqlite":
+            self.assertTrue(search.filter_queryset(TrafficEntry.objects.all(), ("name",), "a") is not None)
+
+        results = harness.run(repeat=2, warmup=0, sort_keys=["name"])
+        scenarios = results["scenarios"]
+        self.assertIn("traffic_cursor_name_desc_deep", scenarios)
+        self.assertIn("boat_archive", scenarios)
+        self.assertTrue(all(r["status"] == [200] for r in scenarios.values()))
+        # write scenarios put everything back
+        self.assertEqual(TrafficEntry.objects.count(), 300)
+        self.assertEqual(Boat.objects.visible().count(), report.boats - report.pending - report.archived)
+
+    def test_compare_flags_slower_or_chattier_scenarios(self):
+        base = {"scenarios": {"a": {"p50_ms": 10, "p95_ms": 20, "queries": 2},
+                              "b": {"p50_ms": 10, "p95_ms": 20, "queries": 2}}}
+        now = {"scenarios": {"a": {"p50_ms": 11, "p95_ms": 21, "queries": 3},
+                             "b": {"p50_ms": 11, "p95_ms": 21, "queries": 2},
+                             "c": {"p50_ms": 1, "p95_ms": 1, "queries": 1}}}
+        status = {row["scenario"]: row["status"] for row in harness.compare(now, base)}
+        self.assertEqual(status, {"a": "regressed", "b": "ok", "c": "new"})
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        perf.REGISTRY.reset()
+
+    def test_server_timing_header_counts_sql_and_templates(self):
+        make_entry()
+        self.client.force_login(User.objects.create_user("ops", password="x", is_staff=True))
+        resp = self.client.get(reverse("traffic"), {"mode": "per"})
+        timing = dict(part.split(";", 1) for part in resp["Server-Timing"].split(", "))
+        self.assertEqual(set(timing), {"total", "db", "tpl", "app"})
+        self.assertRegex(timing["db"], r'desc="[1-9]\d* queries"')
+        self.assertNotEqual(timing["tpl"], "dur=0.0")
+
+    def test_server_timing_only_for_staff_or_debug(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("boats")))
+        with override_settings(DEBUG=True):
+            self.assertIn("Server-Timing", self.client.get(reverse("boats")))
+        self.client.force_login(User.objects.create_user("clerk", password="x"))
+        self.assertNotIn("Server-Timing", self.client.get(reverse("boats")))
+        # still measured, just not shown
+        self.assertIn('traffic_request_duration_seconds_count{view="boats"} 3', perf.REGISTRY.prometheus())
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse("boats"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        staff = User.objects.create_user("ops", password="x", is_staff=True)
+        self.client.force_login(staff)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('traffic_request_duration_seconds_count{view="boats"} 1', body)
+        self.assertRegex(body, r'traffic_slow_query_seconds\{view="boats",rank="1"\} [\d.]+\n')
+        self.assertNotIn("SELECT", body)
+        self.assertIn("traffic_write_retries_total 0", body)
+        slow = self.client.get(reverse("slow-queries")).content.decode()
+        self.assertRegex(slow, r"^boats\n  1\. +[\d.]+ ms  SELECT ")
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("slow-queries")).status_code, 403)
+
+    def test_histograms_only_cover_the_window(self):
+        metrics = perf.RequestMetrics().finish()
+        with override_settings(PERF_METRICS_WINDOW_SECONDS=3 * perf.SLOT_SECONDS):
+            perf.REGISTRY.record("traffic", metrics, now=1000.0)
+            perf.REGISTRY.record("traffic", metrics, now=1100.0)
+            self.assertIn('_count{view="traffic"} 2', perf.REGISTRY.prometheus(now=1100.0))
+            # two slots later the first request has left the window
+            self.assertIn('_count{view="traffic"} 1', perf.REGISTRY.prometheus(now=1150.0))
+
+    @override_settings(PERF_METRICS_ENABLED=False)
+    def test_disabled_middleware_leaves_the_chain(self):
+        self.assertRaises(MiddlewareNotUsed, PerformanceMiddleware, lambda request: None)
+        self.assertNotIn("Server-Timing", self.client.get(reverse("boats")))
+
+
+class RowRenderingTests(TestCase):
+    """The compiled row renderers must produce exactly what the _row.html partials do."""
+
+    def render_both(self, url, params=None):
+        pages = []
+        for fast in (False, True):
+            with override_settings(FAST_ROW_RENDERING=fast):
+                html = self.client.get(url, params or {}).content.decode()
+            pages.append(re.search(r"<tbody>.*?</tbody>", html, re.S).group(0))
+        return pages
+
+    def test_traffic_rows_match_the_template(self):
+        boat = Boat.objects.create(boatType="S/Y", name='<b>"O\'Hara" & co</b>', berth="A1", state="in")
+        make_entry(name=boat.name, trafficBoatId=boat, purpose="<fuel>", trComments="a & b",
+                   edr=date(2025, 7, 3), etr=time(18, 5))
+        make_entry(trTime=None, passengers=None, purpose=None, trComments=None)
+        make_entry(trDate=None, trTime=None)
+        template, compiled = self.render_both(reverse("traffic"), {"mode": "per"})
+        self.assertEqual(compiled, template)
+        self.assertIn("&lt;B&gt;&quot;O&#x27;HARA&quot; &amp; CO&lt;/B&gt;", compiled)
+
+    def test_boat_and_pending_rows_match_the_template(self):
+        Boat.objects.create(boatType="M/Y", name="A <i>", berth="B2", state="out", cid="Yearly")
+        pending = Boat.objects.create(boatType="CAT", name="Pending & co", berth="C3", state="in")
+        Boat.objects.filter(pk=pending.pk).update(deleted=True, deleted_at=timezone.now())
+        for url in (reverse("boats"), reverse("pending-deletions")):
+            template, compiled = self.render_both(url)
+            self.assertEqual(compiled, template)
+            self.assertIn("js-select-row", compiled)
+
+    def test_empty_table(self):
+        template, compiled = self.render_both(reverse("traffic"), {"mode": "per"})
+        self.assertEqual(compiled, template)
+        self.assertIn("No entries found.", compiled)
+
+    def test_compiled_formats_fall_back_to_dateformat(self):
+        moment = datetime(2025, 7, 1, 9, 5, 7, tzinfo=dt_timezone.utc)
+        self.assertEqual(rows.compile_format("Y/m/d H:i:s")(moment), "2025/07/01 09:05:07")
+        self.assertEqual(rows.compile_format("c")(moment), moment.isoformat())
+        for arg in ("D d M", r"\Y", "<d>", "/"):
+            self.assertIsNone(rows.compile_format(arg))
+
+
+class ListFragmentTests(TestCase):
+    HTMX = {"HX-Request": "true"}
+    JSON = {"Accept": "application/json"}
+
+    def setUp(self):
+        self.boat = Boat.objects.create(boatType="S/Y", name="ALPHA", berth="A1", state="in")
+        for hour in range(1, 4):
+            make_entry(trafficBoatId=self.boat, trTime=time(hour, 0))
+
+    def test_htmx_request_gets_only_the_list_region(self):
+        resp = self.client.get(reverse("traffic"), {"mode": "per", "per": 2}, headers=self.HTMX)
+        html = resp.content.decode()
+        self.assertIn("<tbody>", html)
+        self.assertIn('id="traffic-controls"', html)
+        self.assertIn('hx-swap-oob="true"', html)
+        self.assertNotIn("<html", html)
+        self.assertNotIn("trafficDialog", html)
+        self.assertIn("HX-Request", resp["Vary"])
+
+        full = self.client.get(reverse("traffic"), {"mode": "per", "per": 2})
+        self.assertIn('id="list-region"', full.content.decode())
+        restore = self.client.get(reverse("traffic"), headers={**self.HTMX, "HX-History-Restore-Request": "true"})
+        self.assertIn("<html", restore.content.decode())
+
+    def test_json_traffic_page(self):
+        resp = self.client.get(reverse("traffic"), {"mode": "per", "per": 2, "sort": "trTime", "dir": "asc"},
+                               headers=self.JSON)
+        self.assertEqual(resp["Content-Type"], "application/json")
+        data = resp.json()
+        at = data["columns"].index("trTime")
+        self.assertEqual([row[at] for row in data["rows"]], ["01:00:00", "02:00:00"])
+        self.assertEqual(data["rows"][0][data["columns"].index("trafficBoatId")], self.boat.pk)
+        self.assertEqual(data["pager"], {"mode": "per", "per": 2, "sort": "trTime", "dir": "asc",
+                                         "has_previous": False, "has_next": True, "page": 1, "num_pages": 2})
+
+    def test_json_cursor_and_day_pages(self):
+        data = self.client.get(reverse("traffic"), {"mode": "cursor", "per": 2}, headers=self.JSON).json()
+        self.assertEqual(len(data["rows"]), 2)
+        self.assertTrue(data["pager"]["has_next"])
+        nxt = self.client.get(reverse("traffic"), {"mode": "cursor", "per": 2, "cursor": data["pager"]["next_cursor"]},
+                              headers=self.JSON).json()
+        self.assertEqual(len(nxt["rows"]), 1)
+
+        day = self.client.get(reverse("traffic"), headers=self.JSON).json()
+        self.assertEqual(day["pager"]["day"], "2025-07-01")
+        self.assertFalse(day["pager"]["empty"])
+        self.assertEqual(len(day["rows"]), 3)
+
+    def test_json_boat_lists(self):
+        pending = Boat.objects.create(boatType="CAT", name="BETA", berth="B2", state="in")
+        Boat.objects.filter(pk=pending.pk).update(deleted=True, deleted_at=timezone.now())
+        boats = self.client.get(reverse("boats"), headers=self.JSON).json()
+        self.assertEqual(boats["rows"], [[self.boat.pk, "S/Y", "ALPHA", "A1", "in", "", ""]])
+        data = self.client.get(reverse("pending-deletions"), headers=self.JSON).json()
+        self.assertEqual(data["columns"][-1], "archive_deadline")
+        self.assertEqual(data["rows"][0][0], pending.pk)
+        self.assertEqual(data["pager"]["count"], 1)
+
+
+@override_settings(LIVE_EVENTS_ENABLED=True)
+class LiveEventsTests(TestCase):
+    def events(self):
+        return [(e.topic, e.action, e.data) for e in ChangeEvent.objects.order_by("pk")]
+
+    def test_writes_publish_events(self):
+        boat = Boat(name="alpha", berth="A1", deleted=False, archived=False)
+        boat.save()
+        other = Boat(name="bravo", berth="B2", deleted=False, archived=False)
+        other.save()
+        ChangeEvent.objects.all().delete()
+
+        resp = self.client.post(reverse("traffic-create"), {
+            "boatType": boat.boatType, "name": boat.name, "berth": boat.berth,
+            "trDate": "2025-07-01", "trTime": "10:00", "direction": "out", "boat_id": boat.pk,
+        }, headers={"X-Requested-With": "XMLHttpRequest"})
+        entry = resp.json()["id"]
+        self.client.post(reverse("boat-soft-delete", args=[other.pk]))
+        self.client.post(reverse("boat-batch-archive"), {"ids": [other.pk]}, content_type="application/json")
+
+        self.assertEqual(self.events(), [
+            ("traffic", "created", {"pk": entry, "day": "2025-07-01", "boats": [boat.pk], "state": "out"}),
+            ("boat", "deleted", {"pks": [other.pk]}),
+            ("boat", "archived", {"pks": [other.pk]}),
+        ])
+
+    def test_sweeper_publishes_count(self):
+        boat = Boat(name="old", berth="A1", deleted=False, archived=False)
+        boat.save()
+        Boat.all_objects.filter(pk=boat.pk).update(deleted=True, deleted_at=timezone.now() - timedelta(hours=49))
+        Boat.objects.archive_expired()
+        self.assertEqual(self.events()[-1], ("boat", "archived", {"count": 1}))
+
+    @override_settings(LIVE_EVENTS_ENABLED=False)
+    def test_disabled(self):
+        self.assertIsNone(live.publish("boat", "updated", pks=[1]))
+        Boat(name="alpha", berth="A1", deleted=False, archived=False).save()
+        self.assertFalse(ChangeEvent.objects.exists())
+
+    def test_wsgi_request_gets_no_stream(self):
+        self.assertEqual(self.client.get(reverse("live-events")).status_code, 204)
+
+    def test_cursor_reads_ids_that_commit_late(self):
+        # PostgreSQL hands out ids at insert time: 102 can commit before 101
+        cursor = live.Cursor(100)
+        ChangeEvent.objects.create(pk=102, topic="boat", action="updated")
+        self.assertEqual([e.pk for e in cursor.read()], [102])
+        self.assertEqual(set(cursor.gaps), {101})
+        ChangeEvent.objects.create(pk=101, topic="boat", action="updated")
+        ChangeEvent.objects.create(pk=103, topic="boat", action="updated")
+        self.assertEqual([e.pk for e in cursor.read()], [101, 103])
+        self.assertEqual((cursor.last, cursor.gaps), (103, {}))
+        self.assertEqual(cursor.advance(ChangeEvent.objects.filter(pk__in=[101, 103])), [])
+
+        ChangeEvent.objects.create(pk=105, topic="boat", action="updated")
+        with override_settings(LIVE_EVENTS_GAP_SECONDS=0):  # 104 was rolled back: stop looking
+            self.assertEqual([e.pk for e in cursor.read()], [105])
+        self.assertEqual(cursor.gaps, {})
+
+    def test_backlog_resets_when_pruned(self):
+        first = live.publish("boat", "updated", pks=[1])
+        second = live.publish("boat", "updated", pks=[2])
+        self.assertEqual(live.backlog(first.pk), [second])
+        self.assertEqual(live.backlog(second.pk), [])
+        pruned = first.pk
+        first.delete()
+        self.assertIsNone(live.backlog(pruned))
+        self.assertEqual(live.format_event(second),
+                         f'id: {second.pk}\nevent: boat\ndata: {{"action":"updated","pks":[2]}}\n\n')
+
+
+@override_settings(LIVE_EVENTS_ENABLED=True, LIVE_EVENTS_POLL_SECONDS=0.05)
+class LiveStreamTests(TransactionTestCase):
+    async def read(self, chunks):
+        return await asyncio.wait_for(anext(chunks), 5)
+
+    async def test_stream_delivers_and_resumes(self):
+        resp = await self.async_client.get(reverse("live-events"))
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        chunks = aiter(resp.streaming_content)
+        self.assertEqual(await self.read(chunks), b"retry: 3000\n\n")
+
+        event = await sync_to_async(live.publish)("boat", "state", pks=[7], state="out")
+        self.assertEqual(await self.read(chunks), live.format_event(event).encode())
+        await chunks.aclose()
+
+        later = await sync_to_async(live.publish)("boat", "deleted", pks=[7])
+        resp = await self.async_client.get(reverse("live-events"), headers={"Last-Event-ID": str(event.pk)})
+        chunks = aiter(resp.streaming_content)
+        await self.read(chunks)
+        self.assertEqual(await self.read(chunks), live.format_event(later).encode())
+        await chunks.aclose()
+
+    async def test_unknown_resume_point_resets(self):
+        resp = await self.async_client.get(reverse("live-events"), {"since": 12345})
+        chunks = aiter(resp.streaming_content)
+        await self.read(chunks)
+        self.assertEqual(await self.read(chunks), live.RESET.encode())
+
+
+@override_settings(OCCUPANCY_SNAPSHOT_DAYS=1)
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.alpha = Boat.objects.create(name="ALPHA", berth="A1", state="in", deleted=False, archived=False)
+        self.bravo = Boat.objects.create(name="BRAVO", berth="B2", state="in", deleted=False, archived=False)
+        self.move(self.alpha, date(2025, 7, 1), "in")
+        self.move(self.bravo, date(2025, 7, 2), "repair")
+        self.move(self.alpha, date(2025, 7, 3), "out")
+        self.move(self.bravo, date(2025, 7, 3), "in", at=None)  # untimed: not part of the log
+
+    def move(self, boat, day, direction, at=time(10, 0)):
+        return TrafficEntry.objects.create(name=boat.name, berth=boat.berth, trafficBoatId=boat,
+                                           trDate=day, trTime=at, direction=direction)
+
+    def at(self, day, hour=12):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_as_of_replays_the_log(self):
+        alpha, bravo = self.alpha.pk, self.bravo.pk
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 6, 30))).states, {})
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 7, 2), 9)).states, {alpha: "in"})
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 7, 2))).states, {alpha: "in", bravo: "repair"})
+        later = occupancy.as_of(self.at(date(2025, 7, 4)))
+        self.assertEqual(later.states, {alpha: "out", bravo: "repair"})
+        self.assertEqual(later.boats("out"), [alpha])
+        self.assertEqual(occupancy.state_of(self.alpha, self.at(date(2025, 7, 2))), "in")
+        self.assertIsNone(occupancy.state_of(self.bravo, self.at(date(2025, 7, 1))))
+
+    def test_snapshots_bound_the_replay(self):
+        when = self.at(date(2025, 7, 4))
+        expected = occupancy.as_of(when).states
+        written = occupancy.build(now=self.at(date(2025, 7, 5)))
+        self.assertEqual(written, 4)  # midnights of 07-02 .. 07-05
+        result = occupancy.as_of(when)
+        self.assertEqual(result.states, expected)
+        self.assertEqual(result.snapshot, self.at(date(2025, 7, 4), 0))
+        self.assertEqual(result.replayed, 0)
+        self.assertEqual(occupancy.build(extend=True, now=self.at(date(2025, 7, 6), 1)), 1)
+
+    def test_log_changes_drop_later_snapshots(self):
+        occupancy.build(now=self.at(date(2025, 7, 5)))
+        backdated = self.move(self.bravo, date(2025, 7, 2), "out", at=time(20, 0))
+        self.assertEqual(list(OccupancySnapshot.objects.order_by("taken_at").values_list("taken_at", flat=True)),
+                         [self.at(date(2025, 7, 2), 0)])
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 7, 4))).states[self.bravo.pk], "out")
+
+        occupancy.build(now=self.at(date(2025, 7, 5)))
+        backdated.trDate = date(2025, 7, 4)
+        backdated.save()  # stale from where it was (07-02 20:00) on
+        self.assertEqual(OccupancySnapshot.objects.count(), 1)
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 7, 3))).states[self.bravo.pk], "repair")
+
+        occupancy.build(now=self.at(date(2025, 7, 5)))
+        backdated.delete()
+        self.assertEqual(OccupancySnapshot.objects.count(), 3)
+
+    def test_reconcile_sets_state_from_log(self):
+        mismatched = occupancy.reconcile(now=self.at(date(2025, 7, 4)))
+        self.assertEqual(mismatched, {self.alpha.pk: ("in", "out"), self.bravo.pk: ("in", "repair")})
+        self.assertEqual(Boat.objects.get(pk=self.alpha.pk).state, "in")
+        out = io.StringIO()
+        call_command("rebuild_occupancy", stdout=out)
+        self.assertIn("2 boat state(s) updated from the log", out.getvalue())
+        self.assertEqual(Boat.objects.get(pk=self.alpha.pk).state, "out")
+        self.assertEqual(Boat.objects.get(pk=self.bravo.pk).state, "repair")
+        self.assertEqual(occupancy.reconcile(), {})
+
+    def test_page_and_json(self):
+        url = reverse("occupancy")
+        resp = self.client.get(url, {"at": "2025-07-02T12:00", "state": "in"})
+        self.assertContains(resp, "ALPHA")
+        self.assertNotContains(resp, "BRAVO")
+        data = self.client.get(url, {"at": "2025-07-02T12:00"}, headers={"Accept": "application/json"}).json()
+        self.assertEqual(data["counts"], {"in": 1, "out": 0, "repair": 1})
+        self.assertEqual(data["states"], {str(self.alpha.pk): "in", str(self.bravo.pk): "repair"})
+        self.assertEqual(data["unknown"], 0)
+
+        Boat.all_objects.filter(pk=self.bravo.pk).update(
+            deleted=True, archived=True, archived_at=self.at(date(2025, 7, 1)))
+        data = self.client.get(url, {"at": "2025-07-02T12:00"}, headers={"Accept": "application/json"}).json()
+        self.assertEqual(data["states"], {str(self.alpha.pk): "in"})
+
+
+class OccupancyReportTests(TestCase):
+    def setUp(self):
+        cache.clear()  # keys carry the ChangeEvent id, which repeats between rolled-back tests
+        self.boats = {}
+        for name, berth, kind in (("ALPHA", "A1", "M/Y"), ("BRAVO", "B2", "S/Y"), ("CHARLIE", "C3", "S/Y"),
+                                  ("DELTA", "D4", "CAT.")):
+            self.boats[name] = Boat.objects.create(name=name, berth=berth, boatType=kind,
+                                                   deleted=False, archived=False)
+        self.move("DELTA", date(2025, 6, 20), time(9), "in")         # in before the range starts
+        self.move("ALPHA", date(2025, 7, 1), time(12), "in")
+        self.move("ALPHA", date(2025, 7, 2), time(6), "out")
+        self.move("BRAVO", date(2025, 7, 1), time(0, 30), "in")
+        self.move("BRAVO", date(2025, 7, 2), time(12), "in")          # already in
+        self.move("CHARLIE", date(2025, 7, 2), time(8), "out")        # never came in
+        self.now = timezone.make_aware(datetime(2025, 8, 1))
+
+    def move(self, name, day, at, direction):
+        boat = self.boats[name]
+        TrafficEntry.objects.create(name=boat.name, berth=boat.berth, boatType=boat.boatType,
+                                    trafficBoatId=boat, trDate=day, trTime=at, direction=direction)
+
+    def test_daily_matrix_per_berth(self):
+        report = reports.occupancy_report(date(2025, 7, 1), date(2025, 7, 3), now=self.now)
+        self.assertEqual(report.keys, ["A1", "B2", "D4"])
+        self.assertEqual(report.rows, [[0.5, 0.25, 0.0], [0.979, 1.0, 1.0], [1.0, 1.0, 1.0]])
+        self.assertEqual((report.movements, report.intervals, report.carried_in, report.still_in),
+                         (5, 3, 1, 2))
+        self.assertEqual((report.unmatched_in, report.unmatched_out), (1, 1))
+        self.assertEqual(report.summary()[0], ("A1", 0.25, 0.5, 67))
+
+    def test_hourly_matrix_per_type_stops_at_now(self):
+        now = timezone.make_aware(datetime(2025, 7, 1, 18, 30))
+        report = reports.occupancy_report(date(2025, 7, 1), date(2025, 7, 1), by="boatType",
+                                          resolution="hour", now=now)
+        self.assertEqual(report.keys, ["CAT.", "M/Y", "S/Y"])
+        alpha = report.rows[1]
+        self.assertEqual(alpha[:12], [0.0] * 12)
+        self.assertEqual(alpha[12:18], [1.0] * 6)
+        self.assertEqual(alpha[18:], [0.5] + [0.0] * 5)
+        self.assertEqual(report.rows[2][0], 0.5)
+
+    @skipUnless(numpy, "numpy is not installed")
+    def test_numpy_matrix_matches_the_list_version(self):
+        edges = reports.bucket_edges(date(2025, 7, 1), date(2025, 7, 3), "hour")
+        bounds = [edge.timestamp() for edge in edges]
+        first, last, hour = bounds[0], bounds[-1], 3600.0
+        intervals = reports.Intervals()
+        stays = [
+            (first - 5 * hour, first + 0.5 * hour),         # carried in, ends inside the first bucket
+            (first + 0.25 * hour, first + 0.75 * hour),     # inside one bucket
+            (first + 2 * hour, first + 5 * hour),           # exactly on bucket edges
+            (first + 7.1 * hour, first + 30.6 * hour),      # partial buckets at both ends
+            (first + 40.5 * hour, last),                    # still in at the end
+            (first - 3 * hour, first - hour),               # before the range
+            (last, last + hour),                            # after it
+            (first + 3 * hour, first + 3 * hour),           # empty
+        ]
+        for n, (start, end) in enumerate(stays * 3):
+            intervals.start.append(start)
+            intervals.end.append(end)
+            intervals.berth.append(f"B{n % 4}")
+            intervals.boat_type.append("M/Y" if n % 2 else "S/Y")
+        for by in ("berth", "boatType"):
+            self.assertEqual(reports.matrix(intervals, edges, by), reports._matrix_lists(intervals, edges, by))
+        self.assertEqual(reports.matrix(reports.Intervals(), edges, "berth"), ([], []))
+
+    @override_settings(LIVE_EVENTS_ENABLED=True)  # the cache is keyed on the latest event
+    def test_cached_per_range_until_something_changes(self):
+        report = reports.cached_occupancy_report(date(2025, 7, 1), date(2025, 7, 3))
+        with self.assertNumQueries(1):  # the data version
+            self.assertEqual(reports.cached_occupancy_report(date(2025, 7, 1), date(2025, 7, 3)).rows, report.rows)
+        self.move("ALPHA", date(2025, 7, 3), time(0), "in")
+        self.assertEqual(reports.cached_occupancy_report(date(2025, 7, 1), date(2025, 7, 3)).rows[0],
+                         [0.5, 0.25, 1.0])
+
+    def test_views(self):
+        url = reverse("occupancy-report")
+        params = {"start": "2025-07-01", "end": "2025-07-02", "by": "boatType"}
+        resp = self.client.get(url, {**params, "format": "csv"})
+        lines = b"".join(resp.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(lines[0], "Type,2025-07-01,2025-07-02")
+        self.assertEqual(lines[1], "CAT.,1.0,1.0")
+        data = self.client.get(url, params, headers={"Accept": "application/json"}).json()
+        self.assertEqual(data["series"]["M/Y"], [0.5, 0.25])
+        self.assertEqual(data["stats"]["unmatched_out"], 1)
+        self.assertContains(self.client.get(url, params), "S/Y")
+        resp = self.client.get(url, {"start": "2025-01-01", "end": "2025-12-31", "resolution": "hour"})
+        self.assertEqual(len(resp.context["report"].buckets), 365 * 24)  # a leap year fits too, not a day more
+        resp = self.client.get(url, {"start": "2024-01-01", "end": "2025-01-01", "resolution": "hour"})
+        self.assertContains(resp, "At most 366 days by hour.", status_code=400)
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        typeahead._index = None  # cache versions repeat between rolled-back tests
+        for name, berth in (("SEA BREEZE", "A1"), ("SEAHORSE", "B2"), ("SEA", "C3"),
+                            ("BLUE SEAL", "D4"), ("ALPHA", "SEA2")):
+            Boat.objects.create(name=name, berth=berth, boatType="M/Y", deleted=False, archived=False)
+        hidden = Boat.objects.create(name="SEAWOLF", berth="E5", boatType="M/Y", deleted=False, archived=False)
+        Boat.objects.filter(pk=hidden.pk).update(deleted=True)  # save() always clears the flags
+
+    def names(self, text, limit=10):
+        return [boat.name for boat in typeahead.search_boats(text, limit)]
+
+    def test_ranking(self):
+        # exact name, name prefixes (by name), later word, then berth; hidden boats left out
+        self.assertEqual(self.names("sea"), ["SEA", "SEA BREEZE", "SEAHORSE", "BLUE SEAL", "ALPHA"])
+        self.assertEqual(self.names("sea b"), ["SEA BREEZE"])
+        self.assertEqual(self.names("  sea", limit=2), ["SEA", "SEA BREEZE"])
+        self.assertEqual(self.names("zz"), [])
+        self.assertEqual(self.names(" "), [])
+
+    def test_rebuilt_after_boat_changes(self):
+        self.assertNotIn("SEAGULL", self.names("sea"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Boat.objects.create(name="SEAGULL", berth="F6", boatType="S/Y", deleted=False, archived=False)
+        self.assertIn("SEAGULL", self.names("sea"))
+
+        # a queryset update has no signal; its list cache bump is what the index notices
+        boat = Boat.objects.get(name="SEAHORSE")
+        Boat.objects.filter(pk=boat.pk).update(deleted=True)
+        listcache.bump(Boat)
+        self.assertNotIn("SEAHORSE", self.names("sea"))
+
+    @override_settings(LIVE_EVENTS_ENABLED=False)
+    def test_rebuilt_after_updates_without_live_events(self):
+        self.assertIn("SEA BREEZE", self.names("sea"))
+        events = ChangeEvent.objects.count()
+        boat = Boat.objects.get(name="SEA BREEZE")
+        self.client.post(reverse("boat-soft-delete", args=[boat.pk]))
+        self.assertNotIn("SEA BREEZE", self.names("sea"))
+        boat_batch.soft_delete([Boat.objects.get(name="SEAHORSE").pk])
+        self.assertEqual(self.names("sea"), ["SEA", "BLUE SEAL", "ALPHA"])
+        self.assertEqual(ChangeEvent.objects.count(), events)
+
+    def test_endpoint(self):
+        boat = Boat.objects.get(name="SEA")
+        TrafficEntry.objects.create(name=boat.name, berth=boat.berth, boatType=boat.boatType, trafficBoatId=boat,
+                                    trDate=date(2025, 7, 1), trTime=time(9), direction="in")
+        typeahead.get_index()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("typeahead"), {"q": "sea", "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 2)  # index version + recent movements
+        data = response.json()
+        self.assertEqual(data["q"], "sea")
+        self.assertEqual([b["name"] for b in data["boats"]], ["SEA", "SEA BREEZE"])
+        self.assertEqual(set(data["boats"][0]), {"id", "name", "berth", "boatType", "state"})
+        self.assertEqual([(t["boat"], t["direction"]) for t in data["traffic"]], [(boat.pk, "in")])
+
+        data = self.client.get(reverse("typeahead"), {"q": "sea", "limit": "x"}).json()
+        self.assertEqual(len(data["boats"]), 5)
+        self.assertEqual(self.client.get(reverse("typeahead")).json(), {"q": "", "boats": [], "traffic": []})
+
+
+class ListCacheTests(TransactionTestCase):
+    # results read inside a transaction are never cached, hence TransactionTestCase
+    def setUp(self):
+        listcache.clear()  # counters restart after every flush
+        self.boat = Boat.objects.create(name="ALPHA", berth="A1", deleted=False, archived=False)
+        TrafficEntry.objects.create(name="ALPHA", berth="A1", trafficBoatId=self.boat,
+                                    trDate=date(2025, 7, 1), trTime=time(9), direction="in")
+
+    def get(self, name, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse(name), params or {}, headers={"Accept": "application/json"})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json(), len(queries)
+
+    def test_repeat_get_is_one_query(self):
+        for name, params in (("boats", {}), ("pending-deletions", {}), ("traffic", {}),
+                             ("traffic", {"mode": "per", "per": 5, "sort": "name"})):
+            first, _ = self.get(name, params)
+            again, queries = self.get(name, params)
+            self.assertEqual(again, first)
+            self.assertEqual(queries, 1, name)  # the version counters
+        self.assertEqual(listcache.stats()["hits"], 4)
+
+    def test_writes_start_new_versions(self):
+        self.get("boats")
+        self.get("traffic")
+        # post_save
+        Boat.objects.create(name="BRAVO", berth="B2", deleted=False, archived=False)
+        rows, _ = self.get("boats")
+        self.assertEqual(len(rows["rows"]), 2)
+        # queryset .update() behind a view
+        self.client.post(reverse("boat-soft-delete", args=[self.boat.pk]))
+        rows, _ = self.get("boats")
+        self.assertEqual([row[2] for row in rows["rows"]], ["BRAVO"])
+        pending, _ = self.get("pending-deletions")
+        self.assertEqual([row[0] for row in pending["rows"]], [self.boat.pk])
+        # traffic: save through the ORM, then delete
+        entry = TrafficEntry.objects.create(name="ALPHA", berth="A1", trDate=date(2025, 7, 1), trTime=time(10),
+                                            direction="out")
+        rows, _ = self.get("traffic")
+        self.assertEqual(len(rows["rows"]), 2)
+        entry.delete()
+        rows, _ = self.get("traffic")
+        self.assertEqual(len(rows["rows"]), 1)
+
+    def test_lru_bounds(self):
+        lru = listcache.LRU(max_entries=2, max_bytes=100)
+        lru.set("a", 1, 10)
+        lru.set("b", 2, 10)
+        lru.get("a")
+        lru.set("c", 3, 10)            # b is the least recently used
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual((lru.get("a"), lru.get("c")), (1, 3))
+        lru.set("d", 4, 95)            # over the byte bound: everything older goes
+        self.assertEqual((len(lru), lru.size, lru.evictions), (1, 95, 3))
+        lru.set("e", 5, 101)           # never fits
+        self.assertIsNone(lru.get("e"))
+
+    def test_shared_file_cache(self):
+        with tempfile.TemporaryDirectory() as path, override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                    "lists": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": path}},
+            LIST_CACHE_ALIAS="lists",
+        ):
+            first, _ = self.get("boats")
+            listcache.clear()          # as seen from another worker process
+            again, queries = self.get("boats")
+            self.assertEqual((again, queries), (first, 1))
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.boat = Boat.objects.create(name="ALPHA", berth="A1", boatType="M/Y")
+        make_entry(trafficBoatId=self.boat)
+
+    async def json_list(self, view, path, params=None):
+        request = self.factory.get(path, params or {}, headers={"Accept": "application/json"})
+        resp = await view.as_view()(request)
+        self.assertEqual(resp.status_code, 200)
+        return json.loads(resp.content)
+
+    def test_async_views_are_picked_by_the_setting(self):
+        self.assertIs(urls.pick(views.BoatListView, views.AsyncBoatListView), views.BoatListView)
+        with override_settings(ASYNC_VIEWS=True):
+            self.assertIs(urls.pick(views.BoatListView, views.AsyncBoatListView), views.AsyncBoatListView)
+
+    async def test_async_lists_match_the_sync_ones(self):
+        for sync_view, async_view, name, params in (
+            (views.BoatListView, views.AsyncBoatListView, "boats", {"q": "alp"}),
+            (views.PendingDeletionsView, views.AsyncPendingDeletionsView, "pending-deletions", {}),
+            (views.TrafficListView, views.AsyncTrafficListView, "traffic", {}),
+            (views.TrafficListView, views.AsyncTrafficListView, "traffic", {"mode": "per", "sort": "name"}),
+        ):
+            expected = (await self.async_client.get(reverse(name), params, headers={"Accept": "application/json"})).json()
+            self.assertEqual(await self.json_list(async_view, reverse(name), params), expected, name)
+
+    async def test_async_boat_endpoints(self):
+        pk = self.boat.pk
+
+        async def post(view, name):
+            resp = await view(self.factory.post(reverse(name, args=[pk])), pk)
+            return resp.status_code, json.loads(resp.content)
+
+        self.assertEqual(await post(views.aboat_archive, "boat-archive"), (400, {"ok": False, "error": "not_deleted"}))
+        self.assertEqual(await post(views.aboat_soft_delete, "boat-soft-delete"), (200, {"ok": True, "id": pk}))
+        self.assertEqual((await post(views.aboat_soft_delete, "boat-soft-delete"))[0], 400)
+        self.assertEqual(await post(views.aboat_cancel_delete, "boat-cancel-delete"), (200, {"ok": True, "id": pk}))
+        await post(views.aboat_soft_delete, "boat-soft-delete")
+        self.assertEqual(await post(views.aboat_archive, "boat-archive"), (200, {"ok": True, "id": pk}))
+        boat = await Boat.all_objects.aget(pk=pk)
+        self.assertEqual((boat.deleted, boat.archived), (True, True))
+        resp = await views.aboat_soft_delete(self.factory.get("/"), pk)
+        self.assertEqual(resp.status_code, 405)
+
+    async def test_async_create_updates_the_boat(self):
+        data = {"boatType": "M/Y", "name": "ALPHA", "berth": "A1", "trDate": "2025-07-02", "trTime": "08:30",
+                "direction": "out", "passengers": 1, "boat_id": self.boat.pk}
+        request = self.factory.post(reverse("traffic-create"), data, headers={"X-Requested-With": "XMLHttpRequest"})
+        resp = await views.AsyncTrafficCreateView.as_view()(request)
+        body = json.loads(resp.content)
+        self.assertEqual((body["ok"], body["boat_updated"]), (True, True))
+        entry = await TrafficEntry.objects.aget(pk=body["id"])
+        self.assertEqual(entry.trafficBoatId_id, self.boat.pk)
+        self.assertEqual((await Boat.objects.aget(pk=self.boat.pk)).state, "out")
+
+        request = self.factory.post(reverse("traffic-create"), {"passengers": "x"})
+        resp = await views.AsyncTrafficCreateView.as_view()(request)
+        self.assertEqual(resp.status_code, 200)   # the form again, with its errors
+
+    async def test_async_batch_create(self):
+        request = self.factory.post(reverse("traffic-batch-create"), {
+            "ids": [self.boat.pk], "trDate": "2025-07-02", "trTime": "08:30", "direction": "out", "purpose": "",
+        }, content_type="application/json")
+        resp = await views.atraffic_batch_create(request)
+        body = json.loads(resp.content)
+        self.assertEqual(body["results"], {str(self.boat.pk): "done"})
+        entry = await TrafficEntry.objects.aget(pk=body["entries"][str(self.boat.pk)])
+        self.assertEqual(entry.occurred_at, timezone.make_aware(datetime(2025, 7, 2, 8, 30)))
+        self.assertEqual((await Boat.objects.aget(pk=self.boat.pk)).state, "out")
+
+    async def test_middleware_times_async_requests(self):
+        perf.REGISTRY.reset()
+        self.assertNotIn("Server-Timing", await self.async_client.get(reverse("traffic"), {"mode": "per"}))
+        staff = await sync_to_async(User.objects.create_user)("ops", password="x", is_staff=True)
+        await self.async_client.aforce_login(staff)
+        resp = await self.async_client.get(reverse("traffic"), {"mode": "per"})
+        self.assertRegex(resp["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    async def test_writes_arun(self):
+        def rename(pk):
+            return Boat.objects.filter(pk=pk).update(name="BRAVO")
+        self.assertEqual(await writes.arun(rename, self.boat.pk), 1)
+        self.assertEqual((await Boat.objects.aget(pk=self.boat.pk)).name, "BRAVO")
+
+    def test_load_summary(self):
+        samples = [("traffic", 10.0, 200), ("traffic", 30.0, 200), ("write", 20.0, 503), ("boats", 5.0, None)]
+        result = bench_load.summarize(2.0, samples)
+        self.assertEqual((result["requests"], result["errors"], result["rps"]), (4, 2, 2.0))
+        self.assertEqual(result["by_kind"]["traffic"]["p50_ms"], 20.0)
+        self.assertEqual(result["by_kind"]["pending"]["requests"], 0)
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL profile")
+class TrigramSearchTests(TestCase):
+    def setUp(self):
+        if not search.install(TrafficEntry):
+            self.skipTest("pg_trgm is not available on this server")
+
+    def test_substring_search_on_every_column_uses_the_indexes(self):
+        hit = make_entry(name="SEAWOLF", trDate=date(2025, 7, 14))
+        make_entry(name="ALPHA", trDate=date(2025, 8, 1))
+        fields = ("name", "berth", "trDate")
+        self.assertEqual(list(search.filter_queryset(TrafficEntry.objects.all(), fields, "awol")), [hit])
+        self.assertEqual(list(search.filter_queryset(TrafficEntry.objects.all(), fields, "07-14")), [hit])
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = search.filter_queryset(TrafficEntry.objects.all(), fields, "awol").explain()
+        self.assertIn(search.trigram_index(TrafficEntry, "trDate"), plan)
+
+    def test_indexed_text_ignores_the_session_date_style_and_time_zone(self):
+        hit = make_entry(name="SEAWOLF", trDate=date(2025, 7, 14), trTime=time(9, 5), passengers=112)
+        make_entry(name="ALPHA", trDate=date(2025, 8, 1), trTime=time(18), passengers=3)
+        fields = search.INDEXED_COLUMNS["trafficApp.TrafficEntry"]
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL DateStyle = 'SQL, DMY'")
+            cursor.execute("SET LOCAL TIME ZONE 'Asia/Tokyo'")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        for text in ("2025-07-14", "09:05", "2025-07-14 09:05:00+00", "112", "seaw"):
+            found = search.filter_queryset(TrafficEntry.objects.all(), fields, text)
+            self.assertEqual(list(found.values_list("pk", flat=True)), [hit.pk], text)   # psycopg reads ISO only
+        plan = search.filter_queryset(TrafficEntry.objects.all(), fields, "07-14").explain()
+        for column in ("trDate", "occurred_at", "trTime", "passengers"):
+            self.assertIn(search.trigram_index(TrafficEntry, column), plan)
+        self.assertIsNone(search.filter_queryset(TrafficEntry.objects.all(), fields, "12"))   # no trigram
+
+    def test_replaces_the_generic_function_and_its_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE OR REPLACE FUNCTION trafficapp_search_text(anyelement) RETURNS text "
+                           "LANGUAGE sql IMMUTABLE AS $$ SELECT upper($1::text) $$")
+            cursor.execute(f'DROP INDEX "{search.trigram_index(TrafficEntry, "name")}"')
+            cursor.execute(f'CREATE INDEX "{search.trigram_index(TrafficEntry, "name")}" ON '
+                           f'"{TrafficEntry._meta.db_table}" USING gin '
+                           f'(trafficapp_search_text("name"::text) gin_trgm_ops)')
+        self.assertTrue(search.install(TrafficEntry))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_get_function_identity_arguments(oid) FROM pg_proc "
+                           "WHERE proname = 'trafficapp_search_text'")
+            self.assertNotIn("anyelement", {row[0] for row in cursor.fetchall()})
+        self.assertTrue(search.is_available(TrafficEntry))
+
+
+class TieringTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alpha = Boat.objects.create(name="ALPHA", berth="A1", deleted=False, archived=False)
+        self.bravo = Boat.objects.create(name="BRAVO", berth="B2", deleted=False, archived=False)
+        self.move(self.alpha, date(2025, 7, 1), "in")
+        self.move(self.bravo, date(2025, 7, 1), "in", time(11))
+        self.move(self.bravo, date(2025, 7, 2), "out")
+        self.move(self.alpha, date(2025, 7, 8), "out")
+        make_entry(name="CHARLIE", trDate=date(2025, 7, 1), trTime=None)   # untimed: moves by trDate
+        make_entry(name="DELTA", trDate=None, trTime=None)                 # no date: stays hot
+        Boat.all_objects.filter(pk=self.bravo.pk).update(
+            deleted=True, archived=True, archived_at=self.at(date(2025, 7, 3)))
+        self.now = self.at(date(2025, 7, 10))
+
+    def move(self, boat, day, direction, at=time(10)):
+        return TrafficEntry.objects.create(name=boat.name, berth=boat.berth, trafficBoatId=boat,
+                                           trDate=day, trTime=at, direction=direction)
+
+    def at(self, day, hour=12):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_move_keeps_rows_and_derived_data(self):
+        states = occupancy.as_of(self.at(date(2025, 7, 1))).states
+        report_before = reports.occupancy_report(date(2025, 7, 1), date(2025, 7, 9), now=self.now)
+        created = dict(TrafficEntry.objects.values_list("pk", "created"))
+
+        report = tiering.move(days=5, chunk_size=2, now=self.now)
+        self.assertEqual((report.traffic, report.boats), (4, 1))
+        self.assertEqual(report.horizon, self.at(date(2025, 7, 5), 0))
+        self.assertEqual(sorted(TrafficEntry.objects.values_list("name", flat=True)), ["ALPHA", "DELTA"])
+        self.assertEqual(list(Boat.all_objects.values_list("pk", flat=True)), [self.alpha.pk])
+        cold = ColdBoat.objects.get()
+        self.assertEqual((cold.pk, cold.name, cold.archived_at), (self.bravo.pk, "BRAVO", self.at(date(2025, 7, 3))))
+        # verbatim: same ids and timestamps, the boat as a plain id
+        for pk, boat, when in ColdTrafficEntry.objects.values_list("pk", "trafficBoatId", "created"):
+            self.assertEqual(when, created[pk])
+        self.assertEqual(set(ColdTrafficEntry.objects.values_list("trafficBoatId", flat=True)),
+                         {self.alpha.pk, self.bravo.pk, None})
+        # the summary only counts the hot rows, as a rebuild would
+        moved = summary_rows()
+        DailyTrafficSummary.rebuild()
+        self.assertEqual(moved, summary_rows())
+        self.assertEqual([row["day"] for row in moved], [date(2025, 7, 8)])
+
+        self.assertEqual(occupancy.as_of(self.at(date(2025, 7, 1))).states, states)
+        self.assertEqual(occupancy.state_of(self.bravo.pk, self.at(date(2025, 7, 2))), "out")
+        report_after = reports.occupancy_report(date(2025, 7, 1), date(2025, 7, 9), now=self.now)
+        self.assertEqual((report_after.keys, report_after.rows), (report_before.keys, report_before.rows))
+
+        again = tiering.move(days=5, now=self.now)
+        self.assertEqual((again.traffic, again.boats), (0, 0))
+
+    def test_interrupted_move_resumes(self):
+        real = tiering._move_traffic
+        calls = []
+
+        def interrupted(*args):
+            if calls:
+                raise RuntimeError("killed")
+            calls.append(args)
+            return real(*args)
+
+        with mock.patch.object(tiering, "_move_traffic", interrupted), self.assertRaises(RuntimeError):
+            tiering.move(days=5, chunk_size=1, now=self.now)
+        self.assertEqual((TrafficEntry.objects.count(), ColdTrafficEntry.objects.count()), (5, 1))
+        self.assertEqual(ColdBoat.objects.count(), 0)
+
+        report = tiering.move(days=5, chunk_size=1, now=self.now)
+        self.assertEqual((report.traffic, report.boats), (3, 1))
+        self.assertEqual((TrafficEntry.objects.count(), ColdTrafficEntry.objects.count()), (2, 4))
+
+    def test_history_and_occupancy_read_both_tiers(self):
+        tiering.move(days=5, now=self.now)
+        resp = self.client.get(reverse("history"), {"q": "bravo"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["page"].paginator.count, 2)
+        self.assertEqual({row["tier"] for row in resp.context["page"]}, {"cold"})
+        self.assertEqual([boat.pk for boat in resp.context["boats"]], [self.bravo.pk])
+
+        resp = self.client.get(reverse("history"), {"start": "2025-07-02", "end": "2025-07-08"})
+        self.assertEqual([(row["name"], row["tier"]) for row in resp.context["page"]],
+                         [("ALPHA", "hot"), ("BRAVO", "cold")])
+
+        at = self.at(date(2025, 7, 1))
+        resp = self.client.get(reverse("occupancy"), {"at": timezone.localtime(at).strftime("%Y-%m-%dT%H:%M")},
+                               headers={"Accept": "application/json"})
+        self.assertEqual(json.loads(resp.content)["states"], {str(self.alpha.pk): "in", str(self.bravo.pk): "in"})
+
+    def test_admin_lists_cold_rows_read_only(self):
+        tiering.move(days=5, now=self.now)
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resp = self.client.get(reverse("admin:trafficApp_coldtrafficentry_changelist"), {"q": "BRAVO"})
+        self.assertContains(resp, "BRAVO")
+        self.assertEqual(self.client.get(reverse("admin:trafficApp_coldboat_add")).status_code, 403)
+
+    def test_command_dry_run_only_counts(self):
+        out = io.StringIO()
+        call_command("move_to_cold", "--days", "0", "--dry-run", stdout=out)
+        self.assertIn("Would move 5 traffic entries", out.getvalue())
+        self.assertEqual(ColdTrafficEntry.objects.count(), 0)
+
+
+@skipUnless(numpy, "numpy is not installed")
+class AnalyticsSnapshotTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.today = date(2025, 9, 15)
+        make_entry(name="ALPHA", trDate=date(2025, 6, 2), trTime=time(9, 30), purpose="charter", passengers=4)
+        make_entry(name="BRAVO", trDate=date(2025, 6, 3), trTime=time(9, 5), direction="out", boatType="S/Y")
+        make_entry(name="ALPHA", trDate=date(2025, 7, 1), trTime=None, purpose="charter", passengers=3)
+        make_entry(name="ALPHA", trDate=date(2025, 9, 1), trTime=time(17, 0), direction="out", purpose="fuel")
+        make_entry(name="NODATE", trDate=None, trTime=None)
+
+    def export(self, **kwargs):
+        return analytics_snapshot.export(self.dir.name, today=self.today, **kwargs)
+
+    def test_export_and_aggregate(self):
+        report = self.export()
+        self.assertEqual((report.written, report.rows), (["2025-06", "2025-07", "2025-09"], 4))
+        with self.assertNumQueries(0):
+            snap = analytics_query.Snapshot(self.dir.name)
+            self.assertEqual(len(snap), 4)
+            self.assertEqual(analytics_query.movements_per_month(snap),
+                             {"2025-06": 2, "2025-07": 1, "2025-09": 1})
+            self.assertEqual(analytics_query.passengers_by_purpose(snap), {"charter": 7, "": 2, "fuel": 2})
+            self.assertEqual(analytics_query.busiest_hours(snap), {9: 2, 17: 1})
+            self.assertEqual(snap.aggregate("weekday", direction="out"), {"Mon": 1, "Tue": 1})
+            self.assertEqual(snap.aggregate("year", measure="passengers", boat_type="S/Y"), {2025: 2})
+            self.assertEqual(snap.aggregate("berth", start="2025-07", end=date(2025, 8, 31)), {"A1": 1})
+            self.assertEqual(snap.aggregate("direction", boat_type="CAT."), {})
+            with self.assertRaises(ValueError):
+                snap.aggregate("colour")
+        day = analytics_query.Snapshot(self.dir.name).column("2025-06", "day")
+        self.assertEqual(list(day), [numpy.datetime64("2025-06-02"), numpy.datetime64("2025-06-03")])
+
+    def test_only_changed_months_are_rewritten(self):
+        self.export()
+        self.assertTrue(self.export().unchanged)
+
+        june = TrafficEntry.objects.get(name="BRAVO")
+        june.direction = "in"
+        june.save()
+        # June's counters changed; September is the current month
+        self.assertEqual(self.export().written, ["2025-06", "2025-09"])
+        snap = analytics_query.Snapshot(self.dir.name)
+        self.assertEqual(snap.aggregate("direction", end="2025-06"), {"in": 2})
+
+        TrafficEntry.objects.filter(trDate=date(2025, 7, 1)).delete()
+        report = self.export()
+        self.assertEqual((report.written, report.removed), (["2025-09"], ["2025-07"]))
+        self.assertEqual(analytics_query.Snapshot(self.dir.name).months, ["2025-06", "2025-09"])
+
+    def test_cold_tier_is_exported(self):
+        tiering.move(days=30, now=timezone.make_aware(datetime(2025, 9, 15)))
+        self.assertEqual(ColdTrafficEntry.objects.count(), 3)
+        self.export()
+        snap = analytics_query.Snapshot(self.dir.name)
+        self.assertEqual(sum(analytics_query.movements_per_month(snap).values()), 4)
+        self.assertEqual(snap.aggregate("boatType"), {"M/Y": 3, "S/Y": 1})
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("export_analytics", "--dir", self.dir.name, "--full", stdout=out)
+        self.assertIn("Wrote 3 month(s), 4 row(s)", out.getvalue())
+
+
+class Interrupted(Exception):
+    pass
+
+
+class BackfillTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.boat = Boat.objects.create(name="ALPHA", berth="A1", deleted=False, archived=False)
+        make_entry(trafficBoatId=self.boat, trTime=time(9, 30), direction="out")
+        make_entry(trafficBoatId=self.boat, trDate=date(2025, 7, 2), trTime=None)
+        make_entry(name="BRAVO", trDate=date(2025, 7, 3), trTime=time(23, 59, 59, 500000))
+        make_entry(name="CHARLIE", trDate=date(2024, 12, 31), trTime=time(0, 0))
+        make_entry(name="DELTA", trDate=None, trTime=None)
+        TrafficEntry.objects.update(occurred_at=None)
+
+    def filled(self):
+        return dict(TrafficEntry.objects.order_by("pk").values_list("pk", "occurred_at"))
+
+    def expected(self):
+        return {entry.pk: entry.timed_at(time.min) for entry in TrafficEntry.objects.order_by("pk")}
+
+    def test_set_based_and_batched_agree_with_timed_at(self):
+        expected = self.expected()
+        job = backfill.OccurredAtBackfill()
+        result = backfill.run(job, chunk_size=2, pause=0)
+        self.assertEqual(result.method, "set-based" if backfill.LocalDateTime.supports(connection) else "batched")
+        self.assertEqual((result.total, result.filled, result.chunks, result.unfillable), (4, 4, 2, 1))
+        self.assertEqual(self.filled(), expected)
+
+        TrafficEntry.objects.update(occurred_at=None)
+        with mock.patch.object(backfill.LocalDateTime, "supports", return_value=False):
+            result = backfill.run(backfill.OccurredAtBackfill(), chunk_size=3, pause=0)
+        self.assertEqual((result.method, result.filled, result.chunks), ("batched", 4, 2))
+        self.assertEqual(self.filled(), expected)
+        checkpoint = BackfillCheckpoint.objects.get(name=job.name)
+        self.assertEqual(checkpoint.rows, 4)
+        self.assertIsNotNone(checkpoint.finished_at)
+
+    def test_resumes_after_the_last_committed_chunk(self):
+        def interrupt(progress):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            backfill.run(backfill.OccurredAtBackfill(), chunk_size=2, pause=0, progress=interrupt)
+        checkpoint = BackfillCheckpoint.objects.get()
+        self.assertIsNone(checkpoint.finished_at)
+        self.assertEqual(checkpoint.rows, 2)
+        self.assertEqual(TrafficEntry.objects.filter(occurred_at__isnull=False).count(), 2)
+
+        done = []
+        result = backfill.run(backfill.OccurredAtBackfill(), chunk_size=2, pause=0, progress=done.append)
+        self.assertEqual(result.resumed_after, checkpoint.last_pk)
+        self.assertEqual((result.total, result.filled), (2, 2))
+        self.assertEqual([(p.done, p.total) for p in done], [(2, 2)])
+        self.assertEqual(done[-1].eta, 0)
+        self.assertEqual(self.filled(), self.expected())
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.rows, 4)
+        self.assertIsNotNone(checkpoint.finished_at)
+
+        # a finished checkpoint starts over: nothing left to do
+        self.assertEqual(backfill.run(backfill.OccurredAtBackfill(), pause=0).resumed_after, 0)
+
+    def test_dry_run_writes_nothing(self):
+        result = backfill.run(backfill.OccurredAtBackfill(), dry_run=True)
+        self.assertEqual((result.total, result.filled, result.unfillable), (4, 0, 1))
+        expected = self.expected()
+        self.assertEqual(result.sample, [(pk, expected[pk]) for pk in sorted(expected) if expected[pk]])
+        self.assertFalse(TrafficEntry.objects.filter(occurred_at__isnull=False).exists())
+        self.assertFalse(BackfillCheckpoint.objects.exists())
+
+    def test_drops_stale_snapshots_and_bumps_the_list_cache(self):
+        make_entry(trafficBoatId=self.boat, trDate=date(2025, 6, 1), trTime=time(8), direction="in")
+        occupancy.build(now=timezone.make_aware(datetime(2025, 7, 10)))
+        stale = OccupancySnapshot.objects.filter(taken_at__gte=timezone.make_aware(datetime(2025, 7, 1)))
+        self.assertTrue(stale.exists())
+        kept = OccupancySnapshot.objects.count() - stale.count()
+        version = listcache.versions(TrafficEntry)
+
+        backfill.run(backfill.OccurredAtBackfill(), pause=0)
+        self.assertFalse(stale.exists())
+        self.assertEqual(OccupancySnapshot.objects.count(), kept)
+        self.assertNotEqual(listcache.versions(TrafficEntry), version)
+        self.assertEqual(occupancy.state_of(self.boat, timezone.make_aware(datetime(2025, 7, 10))), "in")
+
+    def test_commands(self):
+        out = io.StringIO()
+        call_command("backfill", "traffic.occurred_at", "--dry-run", stdout=out)
+        self.assertIn("Would fill 4 row(s)", out.getvalue())
+        self.assertIn("1 row(s) can't be filled", out.getvalue())
+
+        out = io.StringIO()
+        call_command("fill_occurred_at", "--chunk-size", "3", "--pause", "0", stdout=out)
+        self.assertIn("Filled 4 row(s) in 2 chunk(s)", out.getvalue())
+        self.assertEqual(self.filled(), self.expected())
+        with self.assertRaises(CommandError):
+            call_command("backfill", "nope", stdout=io.StringIO())
+
+    @skipUnless(os.environ.get("TRAFFIC_SLOW_TESTS") == "1", "about 20 s; set TRAFFIC_SLOW_TESTS=1")
+    def test_a_million_rows(self):
+        TrafficEntry.objects.all().delete()
+        rows = 1_000_000
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                search_triggers_off(cursor)
+                cursor.execute(f"""
+                    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows})
+                    INSERT INTO trafficApp_trafficentry (created, boatType, name, trDate, trTime, direction, berth)
+                    SELECT '2025-01-01 00:00:00', 'M/Y', 'BOAT', date('2020-01-01', '+' || (i % 2000) || ' days'),
+                           CASE WHEN i % 7 = 0 THEN NULL ELSE printf('%02d:%02d:00', i % 24, i % 60) END, 'in', 'A1'
+                    FROM n""")
+            else:
+                cursor.execute(f"""
+                    INSERT INTO "trafficApp_trafficentry" (created, "boatType", name, "trDate", "trTime", direction,
+                                                          berth)
+                    SELECT now(), 'M/Y', 'BOAT', DATE '2020-01-01' + i % 2000,
+                           CASE WHEN i % 7 = 0 THEN NULL ELSE make_time(i % 24, i % 60, 0) END, 'in', 'A1'
+                    FROM generate_series(1, {rows}) AS i""")
+
+        result = backfill.run(backfill.OccurredAtBackfill(), chunk_size=100_000, pause=0)
+        self.assertEqual((result.total, result.filled, result.chunks), (rows, rows, 10))
+        self.assertFalse(TrafficEntry.objects.filter(occurred_at__isnull=True).exists())
+        for entry in TrafficEntry.objects.order_by("?")[:20]:
+            self.assertEqual(entry.occurred_at, entry.timed_at(time.min))
+
+
+def search_triggers_off(cursor):
+    for suffix in ("ai", "ad", "au"):
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{search.fts_table(TrafficEntry)}_{suffix}"')
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL profile")
+class SqliteCopyTests(TestCase):
+    databases = {"default", "sqlite"} if "sqlite" in settings.DATABASES else {"default"}
+
+    def test_chunked_copy_resumes_and_rebuilds(self):
+        boats = [Boat(name=f"B{n}", berth=f"A{n}") for n in range(5)]
+        for boat in boats:
+            boat.save(using="sqlite")
+        for n in range(7):
+            TrafficEntry(name=f"B{n % 5}", berth="A1", trafficBoatId=boats[n % 5], trDate=date(2025, 7, 1 + n),
+                         trTime=time(9), direction="in").save(using="sqlite")
+
+        report = dbcopy.copy_database("sqlite", chunk_size=3)
+        self.assertEqual((report.rows["trafficApp.Boat"], report.rows["trafficApp.TrafficEntry"]), (5, 7))
+        self.assertEqual(sorted(TrafficEntry.objects.values_list("trafficBoatId__name", flat=True)),
+                         sorted(f"B{n % 5}" for n in range(7)))
+        # auto_now_add columns keep the source's timestamps
+        self.assertEqual(list(Boat.all_objects.order_by("pk").values_list("created", flat=True)),
+                         list(Boat.all_objects.using("sqlite").order_by("pk").values_list("created", flat=True)))
+        self.assertEqual(DailyTrafficSummary.objects.aggregate(n=Sum("movements"))["n"], 7)
+        # sequences continue after the copied ids
+        self.assertGreater(Boat.objects.create(name="NEW").pk, max(boat.pk for boat in boats))
+
+        again = dbcopy.copy_database("sqlite", rebuild=False)
+        self.assertEqual(again.rows["trafficApp.TrafficEntry"], 0)
+        self.assertEqual(again.skipped["trafficApp.TrafficEntry"], 7)
@@ -1,15 +1,35 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 
+def pick(sync_view, async_view):
+    # the ASGI profile (control/asgi.py) routes to the async variants
+    return async_view if settings.ASYNC_VIEWS else sync_view
+
+
 urlpatterns = [
-    path('', views.BoatListView.as_view(), name = 'boats'),
-    path('traffic/', views.TrafficListView.as_view(), name = 'traffic'),
+    path('', pick(views.BoatListView, views.AsyncBoatListView).as_view(), name = 'boats'),
+    path('traffic/', pick(views.TrafficListView, views.AsyncTrafficListView).as_view(), name = 'traffic'),
+    path('traffic/export/', views.TrafficExportView.as_view(), name = 'traffic-export'),
+    path('import/', views.import_data, name = 'import'),
+    path('import/<int:pk>/', views.import_status, name = 'import-status'),
+    path('occupancy/', views.occupancy_view, name = 'occupancy'),
+    path('history/', views.history, name = 'history'),
+    path('reports/occupancy/', views.occupancy_report, name = 'occupancy-report'),
+    path('typeahead/', views.typeahead_view, name = 'typeahead'),
+    path('metrics/', views.metrics, name = 'metrics'),
+    path('metrics/slow/', views.slow_queries, name = 'slow-queries'),
+    path('live/', views.live_events, name = 'live-events'),
     path('update/<int:pk>', views.update, name = 'update'),
     path('delete_boat/<int:pk>', views.delete, name = 'delete'),
-    path("traffic/create/", views.TrafficCreateView.as_view(), name="traffic-create"),  # POST target
-    path("boats/<int:pk>/soft-delete/", views.boat_soft_delete, name="boat-soft-delete"),
-    path('pending_deletions/', views.PendingDeletionsView.as_view(), name='pending-deletions'),
-    path('pending_deletions/<int:pk>/archive/', views.boat_archive, name='boat-archive'),
-    path('pending_deletions/<int:pk>/cancel_delete/', views.boat_cancel_delete, name='boat-cancel-delete'),
+    path("traffic/create/", pick(views.TrafficCreateView, views.AsyncTrafficCreateView).as_view(), name="traffic-create"),  # POST target
+    path("boats/<int:pk>/soft-delete/", pick(views.boat_soft_delete, views.aboat_soft_delete), name="boat-soft-delete"),
+    path("traffic/batch/create/", pick(views.traffic_batch_create, views.atraffic_batch_create), name="traffic-batch-create"),
+    path("boats/batch/soft-delete/", views.boat_batch_soft_delete, name="boat-batch-soft-delete"),
+    path('pending_deletions/', pick(views.PendingDeletionsView, views.AsyncPendingDeletionsView).as_view(), name='pending-deletions'),
+    path('pending_deletions/<int:pk>/archive/', pick(views.boat_archive, views.aboat_archive), name='boat-archive'),
+    path('pending_deletions/<int:pk>/cancel_delete/', pick(views.boat_cancel_delete, views.aboat_cancel_delete), name='boat-cancel-delete'),
+    path('pending_deletions/batch/archive/', views.boat_batch_archive, name='boat-batch-archive'),
+    path('pending_deletions/batch/cancel_delete/', views.boat_batch_cancel_delete, name='boat-batch-cancel-delete'),
 ]
\ No newline at end of file
@@ -0,0 +1,250 @@
+# trafficApp/utils/backfill.py
+"""
+Resumable backfills of derived columns.
+
+A Backfill names a column, the rows that still need it (pending()), and
+how to compute it: as a database expression (expression()), so each chunk
+is a single UPDATE, or per row in Python (compute()) when the expression
+can't be written for this backend, in which case each chunk is one
+bulk_update.
+
+run() walks the pending rows in primary-key chunks (keyset: each chunk is
+the next `chunk_size` pending ids after the last one done). Each chunk is
+one coordinated write (writes.run) that also advances the backfill's
+BackfillCheckpoint row, so a run that is interrupted resumes after the last
+committed chunk. Between chunks it sleeps `pause` seconds outside any
+transaction, which gives other processes the SQLite write lock. dry_run
+counts and samples what would be filled and writes nothing. `progress` is
+called after every chunk with a Progress (rows, rate, ETA).
+
+    manage.py backfill traffic.occurred_at --dry-run
+    manage.py backfill traffic.occurred_at --chunk-size 20000 --pause 0.1
+
+BACKFILLS lists the backfills the command knows by name.
+"""
+import time as clock
+from dataclasses import dataclass, field
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import DateTimeField, F, Func, Min, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import BackfillCheckpoint, TrafficEntry
+from . import listcache, occupancy, writes
+
+CHUNK_SIZE = 10_000
+BATCH_SIZE = 1000           # rows per UPDATE statement of the batched path
+PAUSE_SECONDS = 0.05        # between chunks, outside the write lock
+SAMPLE_SIZE = 5
+
+
+class LocalDateTime(Func):
+    """
+    A date and a time column as the aware moment they name in the current
+    time zone, computed by the database: timed_at() in SQL. SQLite stores
+    datetimes as UTC text, so there it is only written for UTC (supports()).
+    """
+    output_field = DateTimeField()
+    arity = 2
+
+    @staticmethod
+    def supports(connection):
+        if connection.vendor == "postgresql":
+            return True
+        if connection.vendor == "sqlite":
+            tz = timezone.get_current_timezone()
+            return tz is dt_timezone.utc or getattr(tz, "key", None) in ("UTC", "Etc/UTC")
+        return False
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # 'YYYY-MM-DD' || ' ' || 'HH:MM:SS[.ffffff]' is how Django stores a UTC datetime
+        return self.as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" || ' ' || ",
+                           **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = self.as_sql(compiler, connection, template="((%(expressions)s) AT TIME ZONE %%s)",
+                                  arg_joiner=" + ", **extra_context)
+        return sql, (*params, timezone.get_current_timezone_name())
+
+
+class Backfill:
+    """One derived column to fill; subclasses set the attributes and implement pending() / compute()."""
+    name = ""                   # BackfillCheckpoint key and command argument
+    model = None
+    field = ""                  # the column filled
+    description = ""
+
+    def pending(self):
+        """Rows that still need the value (and can get one)."""
+        raise NotImplementedError
+
+    def unfillable(self):
+        """Rows that need the value but can't get one, counted in the report; None if there are none."""
+        return None
+
+    def expression(self, connection):
+        """The value as a database expression, or None to compute it per row."""
+        return None
+
+    def compute(self, obj):
+        raise NotImplementedError
+
+    def before_write(self, chunk):
+        """Called in the chunk's transaction before it is written; `chunk` is its pending rows."""
+
+    def after_write(self, filled):
+        """Called in the chunk's transaction after `filled` rows were written."""
+
+    def finish(self, result):
+        """Called once after the last chunk (not on dry runs)."""
+
+
+@dataclass
+class Progress:
+    name: str
+    done: int           # rows filled by this run
+    total: int          # rows pending when it started
+    elapsed: float      # seconds
+
+    @property
+    def rate(self):
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate, or None before the first chunk."""
+        return (self.total - self.done) / self.rate if self.rate else None
+
+
+@dataclass
+class Result:
+    name: str
+    method: str                 # "set-based" or "batched"
+    total: int                  # rows pending at the start
+    filled: int = 0
+    chunks: int = 0
+    unfillable: int = 0
+    resumed_after: int = 0      # last pk of the interrupted run resumed, 0 for a fresh start
+    elapsed: float = 0.0
+    dry_run: bool = False
+    sample: list = field(default_factory=list)     # (pk, value) of the first rows, dry runs only
+
+
+def run(backfill, *, chunk_size=CHUNK_SIZE, pause=PAUSE_SECONDS, dry_run=False, restart=False, progress=None):
+    """Fill `backfill`'s column (see the module docstring); returns a Result."""
+    expression = backfill.expression(connections[DEFAULT_DB_ALIAS])
+    pending = backfill.pending()
+    checkpoint = BackfillCheckpoint.objects.filter(name=backfill.name).first()
+    last = 0
+    if checkpoint and not checkpoint.finished_at and not restart:
+        last = checkpoint.last_pk
+    unfillable = backfill.unfillable()
+    result = Result(backfill.name, "set-based" if expression is not None else "batched",
+                    total=pending.filter(pk__gt=last).count(),
+                    unfillable=unfillable.count() if unfillable is not None else 0,
+                    resumed_after=last)
+
+    if dry_run:
+        result.dry_run = True
+        first = pending.filter(pk__gt=last).order_by("pk")
+        if expression is not None:
+            result.sample = list(first.annotate(value=expression).values_list("pk", "value")[:SAMPLE_SIZE])
+        else:
+            result.sample = [(obj.pk, backfill.compute(obj)) for obj in first[:SAMPLE_SIZE]]
+        return result
+
+    writes.run(_start, backfill.name, last)
+    started = clock.perf_counter()
+    while True:
+        upper = _upper_bound(pending, last, chunk_size)
+        if upper is None:
+            break
+        filled = writes.run(_chunk, backfill, pending, last, upper, expression)
+        result.filled += filled
+        result.chunks += 1
+        last = upper
+        result.elapsed = clock.perf_counter() - started
+        if progress:
+            progress(Progress(backfill.name, result.filled, result.total, result.elapsed))
+        if pause:
+            clock.sleep(pause)
+    writes.run(_finish, backfill.name)
+    result.elapsed = clock.perf_counter() - started
+    backfill.finish(result)
+    return result
+
+
+def _upper_bound(pending, last, chunk_size):
+    """The pk ending the next chunk after `last`: the chunk_size-th pending pk, or the last one."""
+    after = pending.filter(pk__gt=last)
+    found = list(after.order_by("pk").values_list("pk", flat=True)[chunk_size - 1:chunk_size])
+    if found:
+        return found[0]
+    return after.order_by("-pk").values_list("pk", flat=True).first()
+
+
+def _start(name, resumed_after):
+    if not resumed_after:
+        BackfillCheckpoint.objects.update_or_create(
+            name=name, defaults={"last_pk": 0, "rows": 0, "started_at": timezone.now(), "finished_at": None})
+
+
+def _chunk(backfill, pending, last, upper, expression):
+    chunk = pending.filter(pk__gt=last, pk__lte=upper)
+    backfill.before_write(chunk)
+    if expression is not None:
+        filled = chunk.update(**{backfill.field: expression})
+    else:
+        objs = list(chunk.order_by("pk"))
+        for obj in objs:
+            setattr(obj, backfill.field, backfill.compute(obj))
+        backfill.model._base_manager.bulk_update(objs, [backfill.field], batch_size=BATCH_SIZE)
+        filled = len(objs)
+    backfill.after_write(filled)
+    BackfillCheckpoint.objects.filter(name=backfill.name).update(last_pk=upper, rows=F("rows") + filled)
+    return filled
+
+
+def _finish(name):
+    BackfillCheckpoint.objects.filter(name=name).update(finished_at=timezone.now())
+
+
+class OccurredAtBackfill(Backfill):
+    """
+    TrafficEntry.occurred_at from trDate and trTime (timed_at()): an
+    untimed entry gets local midnight of its day, which makes it part of the
+    movement log. Entries without a date are left alone.
+    """
+    name = "traffic.occurred_at"
+    model = TrafficEntry
+    field = "occurred_at"
+    description = "TrafficEntry.occurred_at from trDate + trTime (midnight when untimed)"
+
+    def pending(self):
+        return TrafficEntry.objects.filter(occurred_at__isnull=True, trDate__isnull=False)
+
+    def unfillable(self):
+        return TrafficEntry.objects.filter(occurred_at__isnull=True, trDate__isnull=True)
+
+    def expression(self, connection):
+        if not LocalDateTime.supports(connection):
+            return None
+        return LocalDateTime(F("trDate"), Coalesce(F("trTime"), Value(time.min)))
+
+    def compute(self, obj):
+        return obj.timed_at(default_time=time.min)
+
+    def before_write(self, chunk):
+        # the chunk's boat movements join the log: snapshots from local midnight of the first one's day are stale
+        day = chunk.filter(trafficBoatId__isnull=False).aggregate(first=Min("trDate"))["first"]
+        if day is not None:
+            occupancy.invalidate((None, timezone.make_aware(datetime.combine(day, time.min)), None))
+
+    def after_write(self, filled):
+        if filled:
+            listcache.bump(TrafficEntry)
+
+
+BACKFILLS = {backfill.name: backfill for backfill in (OccurredAtBackfill,)}
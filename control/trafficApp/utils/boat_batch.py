@@ -0,0 +1,107 @@
+# trafficApp/utils/boat_batch.py
+"""
+Batch versions of the boat soft-delete / archive / cancel-delete transitions.
+
+Each call takes any number of pks and, per chunk, locks the rows, applies
+the state change with ONE conditional UPDATE (pk IN chunk AND precondition)
+and reports an outcome per id:
+
+    done             - the transition was applied
+    already_deleted  - soft-delete of a boat that is already deleted
+    already_archived - archive of a boat that is already archived
+    not_deleted      - archive / cancel of a boat that is not deleted
+    not_found        - no such boat
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Boat
+from . import listcache, live, writes
+
+CHUNK_SIZE = 500  # well below SQLite's bound-parameter limit
+MAX_IDS = 5000    # per request
+
+DONE = "done"
+NOT_FOUND = "not_found"
+
+
+def _soft_delete_outcome(deleted, archived):
+    if archived:
+        return "already_archived"
+    return "already_deleted" if deleted else DONE
+
+
+def _archive_outcome(deleted, archived):
+    if archived:
+        return "already_archived"
+    return DONE if deleted else "not_deleted"
+
+
+def _cancel_outcome(deleted, archived):
+    return DONE if deleted else "not_deleted"
+
+
+# action -> (precondition, outcome(deleted, archived), changes(now));
+# outcome() is the precondition evaluated on the locked row
+TRANSITIONS = {
+    "soft_delete": (
+        Q(deleted=False, archived=False),
+        _soft_delete_outcome,
+        lambda now: {"deleted": True, "deleted_at": now},
+    ),
+    "archive": (
+        Q(deleted=True, archived=False),
+        _archive_outcome,
+        lambda now: {"archived": True, "archived_at": now},
+    ),
+    "cancel_delete": (
+        Q(deleted=True),
+        _cancel_outcome,
+        lambda now: {"deleted": False, "deleted_at": None},
+    ),
+}
+
+
+# live event action (utils/live.py) per transition
+EVENTS = {"soft_delete": "deleted", "archive": "archived", "cancel_delete": "restored"}
+
+
+def _apply_chunk(chunk, precondition, outcome, changes, now, outcomes, event):
+    # lock the chunk so the outcomes we report are the ones the UPDATE sees
+    state = {
+        pk: (deleted, archived) for pk, deleted, archived in
+        Boat.all_objects.select_for_update().filter(pk__in=chunk)
+        .values_list("pk", "deleted", "archived")
+    }
+    for pk in chunk:
+        outcomes[pk] = outcome(*state[pk]) if pk in state else NOT_FOUND
+    done = [pk for pk in chunk if outcomes[pk] == DONE]
+    if done:
+        Boat.all_objects.filter(pk__in=chunk).filter(precondition).update(**changes(now))
+        listcache.bump(Boat)
+        live.publish("boat", event, pks=done)
+
+
+def apply(action, pks, *, chunk_size=CHUNK_SIZE):
+    """Run `action` on every pk; returns {pk: outcome} in input order."""
+    precondition, outcome, changes = TRANSITIONS[action]
+    pks = list(dict.fromkeys(pks))  # de-duplicate, keep order
+    now = timezone.now()
+    outcomes = {}
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        # one coordinated write (transaction) per chunk
+        writes.run(_apply_chunk, chunk, precondition, outcome, changes, now, outcomes, EVENTS[action])
+    return outcomes
+
+
+def soft_delete(pks, **kwargs):
+    return apply("soft_delete", pks, **kwargs)
+
+
+def archive(pks, **kwargs):
+    return apply("archive", pks, **kwargs)
+
+
+def cancel_delete(pks, **kwargs):
+    return apply("cancel_delete", pks, **kwargs)
@@ -0,0 +1,116 @@
+# trafficApp/utils/dbcopy.py
+"""
+Copy the data of one database into another, e.g. the SQLite file into a
+freshly migrated PostgreSQL database (manage.py copy_from_sqlite).
+
+Tables are copied in foreign-key order, in primary-key chunks: each chunk is
+one keyset query on the source and one insert in its own transaction on the
+target, so memory stays flat and an interrupted copy loses at most one
+chunk. A model's copy starts after the highest primary key the target
+already has, which makes a rerun resume where the last one stopped.
+
+Derived tables are not copied but rebuilt on the target afterwards (daily
+summaries, occupancy snapshots, search indexes, list cache versions), and
+the target's id sequences are moved past the copied ids.
+
+Rows are inserted verbatim (insert_raw): ids and auto_now_add timestamps
+as they are on the source, and no signals. utils/tiering.py moves rows to
+the cold tables the same way, and takes them out of the hot ones with
+delete_raw.
+"""
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from ..models import Boat, ChangeEvent, DailyTrafficSummary, TrafficEntry
+from . import listcache, occupancy, search
+
+CHUNK_SIZE = 5000      # rows per keyset query / target transaction
+BATCH_SIZE = 1000      # rows per INSERT
+
+# in foreign-key order
+COPIED_MODELS = (User, Boat, TrafficEntry, ChangeEvent)
+
+
+@dataclass
+class CopyReport:
+    rows: dict = field(default_factory=dict)       # model label -> rows copied
+    skipped: dict = field(default_factory=dict)    # model label -> rows already on the target
+
+
+def insert_raw(model, objs, *, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """INSERT `objs` as they are: every concrete column, ids and timestamps included, no signals."""
+    fields = model._meta.concrete_fields
+    for start in range(0, len(objs), batch_size):
+        # raw=True: values are taken as set, so auto_now_add keeps the source's `created`
+        model._base_manager._insert(objs[start:start + batch_size], fields=fields, using=using, raw=True)
+
+
+def delete_raw(model, pks, *, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """DELETE the rows with these pks as a plain statement: no signals, no cascades or SET_NULL."""
+    qn = connections[using].ops.quote_name
+    sql = f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN "
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            cursor.execute(sql + f"({', '.join(['%s'] * len(batch))})", batch)
+
+
+def copy_model(model, source, target, *, chunk_size=CHUNK_SIZE, progress=None):
+    """Copy `model`'s rows above the target's highest pk; returns (copied, already there)."""
+    manager = model._base_manager
+    attnames = [f.attname for f in model._meta.concrete_fields]
+    last = manager.using(target).aggregate(last=Max("pk"))["last"]
+    existing = manager.using(target).count() if last is not None else 0
+
+    copied = 0
+    rows = manager.using(source).order_by("pk").values_list(*attnames)
+    pk_index = attnames.index(model._meta.pk.attname)
+    while True:
+        chunk = list((rows.filter(pk__gt=last) if last is not None else rows)[:chunk_size])
+        if not chunk:
+            break
+        with transaction.atomic(using=target):
+            insert_raw(model, [model(**dict(zip(attnames, row))) for row in chunk], using=target)
+        copied += len(chunk)
+        last = chunk[-1][pk_index]
+        if progress:
+            progress(model._meta.label, copied)
+    return copied, existing
+
+
+def reset_sequences(models, using):
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Rebuild what the default database derives from the copied tables."""
+    DailyTrafficSummary.rebuild()
+    occupancy.build()
+    for model in (TrafficEntry, Boat):
+        search.install(model, rebuild=True)
+    listcache.bump(Boat)
+
+
+def copy_database(source, *, chunk_size=CHUNK_SIZE, rebuild=True, progress=None):
+    """Copy the `source` database alias into the default one; returns a CopyReport."""
+    target = DEFAULT_DB_ALIAS
+    if connections[source].settings_dict["NAME"] == connections[target].settings_dict["NAME"]:
+        raise ValueError("source and target are the same database")
+    report = CopyReport()
+    for model in COPIED_MODELS:
+        copied, existing = copy_model(model, source, target, chunk_size=chunk_size, progress=progress)
+        report.rows[model._meta.label] = copied
+        report.skipped[model._meta.label] = existing
+    reset_sequences(COPIED_MODELS, target)
+    if rebuild:
+        rebuild_derived()
+    return report
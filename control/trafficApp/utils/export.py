@@ -0,0 +1,205 @@
+# trafficApp/utils/export.py
+"""
+Streaming CSV / XLSX writers for StreamingHttpResponse.
+
+Both take a header and an iterable of row tuples and yield bytes as they go,
+so memory stays flat however many rows the iterable produces. The XLSX
+writer needs no third-party package: an .xlsx file is a zip of XML parts, and
+zipfile can write a member incrementally to a non-seekable sink which we
+drain after every few hundred rows.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time
+from xml.sax.saxutils import escape
+
+FLUSH_EVERY = 500  # rows between yields of the stream
+
+# control characters that are not allowed anywhere in an XML document
+XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _Sink:
+    """Write-only, non-seekable file object that hands back what was written."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _TextAdapter:
+    def __init__(self, sink):
+        self.sink = sink
+
+    def write(self, text):
+        return self.sink.write(text.encode())
+
+
+def iter_csv(header, rows):
+    sink = _Sink()
+    # csv needs a text file; encode each line as it is produced
+    writer = csv.writer(_TextAdapter(sink))
+    sink.write("\ufeff".encode())  # BOM so Excel opens UTF-8 correctly
+    writer.writerow(header)
+    yield sink.drain()
+    for n, row in enumerate(rows, 1):
+        writer.writerow(["" if v is None else _csv_value(v) for v in row])
+        if n % FLUSH_EVERY == 0:
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _csv_value(v):
+    if isinstance(v, datetime):
+        return v.strftime("%Y/%m/%d %H:%M")
+    if isinstance(v, date):
+        return v.strftime("%Y/%m/%d")
+    if isinstance(v, time):
+        return v.strftime("%H:%M")
+    return v
+
+
+# ---- XLSX ----
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# cellXfs indices in STYLES below
+STYLE_DATE, STYLE_TIME, STYLE_DATETIME, STYLE_HEADER = 1, 2, 3, 4
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="3">'
+    '<numFmt numFmtId="164" formatCode="yyyy/mm/dd"/>'
+    '<numFmt numFmtId="165" formatCode="hh:mm"/>'
+    '<numFmt numFmtId="166" formatCode="yyyy/mm/dd hh:mm"/>'
+    '</numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="166" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _cell(ref, value, style=0):
+    if value is None or value == "":
+        return ""
+    s = f' s="{style}"' if style else ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{s}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{s}><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial:.10f}</v></c>'
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="{STYLE_DATE}"><v>{(value - EXCEL_EPOCH.date()).days}</v></c>'
+    if isinstance(value, time):
+        serial = (value.hour * 3600 + value.minute * 60 + value.second) / 86400
+        return f'<c r="{ref}" s="{STYLE_TIME}"><v>{serial:.10f}</v></c>'
+    text = escape(XML_ILLEGAL.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"{s}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row_xml(number, values, style=0):
+    cells = "".join(
+        _cell(f"{_column_letter(i)}{number}", v, style) for i, v in enumerate(values)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def iter_xlsx(header, rows, *, sheet_name="Sheet1"):
+    """
+    Yield an .xlsx workbook with one sheet. Datetimes must be naive local
+    times (Excel has no time zones); dates/times get real Excel number formats.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", CONTENT_TYPES)
+        zf.writestr("_rels/.rels", ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _workbook(sheet_name))
+        zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        zf.writestr("xl/styles.xml", STYLES)
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_row_xml(1, header, STYLE_HEADER).encode())
+            buffered = []
+            for number, row in enumerate(rows, 2):
+                buffered.append(_row_xml(number, row))
+                if len(buffered) >= FLUSH_EVERY:
+                    sheet.write("".join(buffered).encode())
+                    buffered.clear()
+                    yield sink.drain()
+            sheet.write("".join(buffered).encode())
+            sheet.write(b'</sheetData></worksheet>')
+        yield sink.drain()
+    yield sink.drain()  # central directory
@@ -0,0 +1,552 @@
+# trafficApp/utils/importer.py
+"""
+Bulk import of legacy traffic logs and the boat registry from XLSX / CSV.
+
+Rows are stream-parsed (csv.reader, or iterparse over the sheet XML, with
+every processed row cleared), validated with the same field rules as
+NewTrafficForm / NewBoatForm and inserted in chunks, each in its own short
+transaction, so the SQLite write lock is released between chunks. Traffic
+rows are matched to boats through an in-memory (name, berth) index built
+with one query.
+
+Traffic logs run to hundreds of thousands of rows, so the work around
+each row is kept small: spreadsheet dates and times in the local formats
+are parsed with a regex before the form fields see them, form and model
+fields are looked up once per import rather than per row, each chunk goes
+in with one bulk_create, and the daily summary is written once per chunk.
+Even so a large log takes tens of seconds, so /import/ hands uploads over
+IMPORT_INLINE_MAX_BYTES to start_job(), which imports them in a thread
+and records the progress in an ImportJob row.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from xml.etree.ElementTree import iterparse
+
+from django import forms
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..forms import NewBoatForm, NewTrafficForm
+from ..models import Boat, DailyTrafficSummary, ImportJob, TrafficEntry
+from . import listcache, live, occupancy, writes
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000  # rows per insert / transaction
+INSERT_BATCH_SIZE = 500  # rows per INSERT statement (SQLite's parameter limit lowers it further)
+MAX_REPORTED_ERRORS = 1000
+
+# Spreadsheet header -> field name. Headers are compared lower-cased with
+# everything but letters and digits removed, so "E.R. Date" == "erdate".
+TRAFFIC_HEADERS = {
+    "type": "boatType", "boattype": "boatType",
+    "name": "name", "boatname": "name", "boat": "name",
+    "date": "trDate", "trdate": "trDate",
+    "time": "trTime", "trtime": "trTime",
+    "direction": "direction", "dir": "direction",
+    "passengers": "passengers", "pax": "passengers",
+    "purpose": "purpose",
+    "erdate": "edr", "edr": "edr",
+    "ertime": "etr", "etr": "etr", "edt": "etr",
+    "comments": "trComments", "trcomments": "trComments",
+    "berth": "berth",
+}
+BOAT_HEADERS = {
+    "type": "boatType", "boattype": "boatType",
+    "name": "name", "boatname": "name",
+    "berth": "berth",
+    "state": "state",
+    "checkin": "cid", "cid": "cid",
+    "checkout": "ecod", "ecod": "ecod",
+}
+
+# Accepted in addition to Django's DATE_INPUT_FORMATS (which are US-style)
+DATE_FORMATS = ("%Y/%m/%d", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y")
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%H.%M")
+
+
+class ImportReport:
+    """Counts plus the first MAX_REPORTED_ERRORS (row number, errors) pairs."""
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.failed = 0
+        self.matched_boats = 0
+        self.errors = []
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, errors))
+
+    def write_csv(self, fileobj):
+        writer = csv.writer(fileobj)
+        writer.writerow(["row", "field", "error"])
+        for row_number, errors in self.errors:
+            for field, messages in errors.items():
+                for message in messages:
+                    writer.writerow([row_number, field, message])
+
+
+# ---- reading ----
+def _normalize_header(value):
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+
+def read_rows(fileobj, filename, headers):
+    """
+    Yield (row_number, {field: raw value}) for each non-empty data row.
+    Columns whose header is not in `headers` are ignored.
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        rows = iter_xlsx_rows(fileobj)
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        rows = csv.reader(text)
+
+    columns = None
+    for row_number, row in enumerate(rows, 1):
+        if columns is None:
+            columns = [headers.get(_normalize_header(h)) for h in row]
+            continue
+        record = {
+            field: value for field, value in zip(columns, row)
+            if field and value not in (None, "")
+        }
+        if record:
+            yield row_number, record
+
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+BUILTIN_DATE_FORMATS = {14: "date", 15: "date", 16: "date", 17: "date",
+                        18: "time", 19: "time", 20: "time", 21: "time",
+                        22: "datetime", 45: "time", 46: "time", 47: "time"}
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def _first_sheet_path(zf):
+    try:
+        with zf.open("xl/workbook.xml") as fh:
+            sheet = next(el for _, el in iterparse(fh) if el.tag == f"{NS}sheet")
+        rel_id = sheet.get(f"{REL_NS}id")
+        with zf.open("xl/_rels/workbook.xml.rels") as fh:
+            for _, el in iterparse(fh):
+                if el.get("Id") == rel_id:
+                    target = el.get("Target").lstrip("/")
+                    return target if target.startswith("xl/") else f"xl/{target}"
+    except (KeyError, StopIteration):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def _shared_strings(zf):
+    strings = []
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return strings
+    with zf.open("xl/sharedStrings.xml") as fh:
+        for _, el in iterparse(fh):
+            if el.tag == f"{NS}si":
+                strings.append("".join(t.text or "" for t in el.iter(f"{NS}t")))
+                el.clear()
+    return strings
+
+
+def _date_styles(zf):
+    """Map cell style index -> 'date' / 'time' / 'datetime' for date-formatted styles."""
+    if "xl/styles.xml" not in zf.namelist():
+        return {}
+    custom, xfs, in_cell_xfs = {}, [], False
+    with zf.open("xl/styles.xml") as fh:
+        for event, el in iterparse(fh, events=("start", "end")):
+            if el.tag == f"{NS}numFmt" and event == "end":
+                code = re.sub(r'"[^"]*"|\[[^\]]*\]', "", el.get("formatCode", "").lower())
+                has_date = any(ch in code for ch in "dy") or "mmm" in code
+                has_time = any(ch in code for ch in "hs")
+                if has_date or has_time:
+                    kind = "datetime" if has_date and has_time else ("date" if has_date else "time")
+                    custom[int(el.get("numFmtId"))] = kind
+            elif el.tag == f"{NS}cellXfs":
+                in_cell_xfs = event == "start"
+            elif el.tag == f"{NS}xf" and in_cell_xfs and event == "end":
+                xfs.append(int(el.get("numFmtId", 0)))
+    kinds = {}
+    for index, fmt in enumerate(xfs):
+        kind = custom.get(fmt) or BUILTIN_DATE_FORMATS.get(fmt)
+        if kind:
+            kinds[index] = kind
+    return kinds
+
+
+def _column_index(ref):
+    index = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def _convert_serial(serial, kind):
+    moment = EXCEL_EPOCH + timedelta(days=serial)
+    # round to the second; serials carry float noise
+    moment = (moment + timedelta(microseconds=500_000)).replace(microsecond=0)
+    if kind == "date":
+        return moment.date()
+    if kind == "time":
+        return moment.time()
+    return moment
+
+
+def iter_xlsx_rows(fileobj):
+    """Yield each row of the first sheet as a list of Python values."""
+    with zipfile.ZipFile(fileobj) as zf:
+        strings = _shared_strings(zf)
+        date_styles = _date_styles(zf)
+        with zf.open(_first_sheet_path(zf)) as fh:
+            sheet_data = None
+            for event, el in iterparse(fh, events=("start", "end")):
+                if event == "start":
+                    if el.tag == f"{NS}sheetData":
+                        sheet_data = el
+                    continue
+                if el.tag != f"{NS}row":
+                    continue
+                row = []
+                for cell in el.iter(f"{NS}c"):
+                    col = _column_index(cell.get("r", "")) if cell.get("r") else len(row)
+                    while len(row) < col:
+                        row.append(None)
+                    row.append(_cell_value(cell, strings, date_styles))
+                # drop the parsed row so memory stays flat on large sheets
+                el.clear()
+                if sheet_data is not None:
+                    sheet_data.remove(el)
+                yield row
+
+
+def _cell_value(cell, strings, date_styles):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{NS}t"))
+    v = cell.find(f"{NS}v")
+    if v is None or v.text is None:
+        return None
+    if kind == "s":
+        return strings[int(v.text)]
+    if kind == "b":
+        return v.text == "1"
+    if kind in ("str", "e"):
+        return v.text
+    number = float(v.text)
+    style = date_styles.get(int(cell.get("s", 0)))
+    if style:
+        return _convert_serial(number, style)
+    return int(number) if number.is_integer() else number
+
+
+# ---- cleaning ----
+# the shapes of DATE_FORMATS / TIME_FORMATS, matched without strptime;
+# anything else (or an impossible date) goes through _coerce
+DATE_RE = re.compile(r"(\d{4})([/-])(\d\d?)\2(\d\d?)|(\d\d?)([/.])(\d\d?)\6(\d{4})")
+TIME_RE = re.compile(r"(\d\d?):(\d\d?)(?::(\d\d?))?|(\d\d?)\.(\d\d?)")
+
+
+def _coerce(value, formats, parse):
+    """Turn spreadsheet strings in our local formats into date/time objects."""
+    if isinstance(value, str):
+        text = value.strip()
+        for fmt in formats:
+            try:
+                return parse(text, fmt)
+            except ValueError:
+                continue
+    return value
+
+
+def _parse_date(text, fmt):
+    return datetime.strptime(text, fmt).date()
+
+
+def _parse_time(text, fmt):
+    return datetime.strptime(text, fmt).time()
+
+
+def _coerce_date(value):
+    if isinstance(value, str):
+        m = DATE_RE.fullmatch(value.strip())
+        if m:
+            year, month, day = (m[1], m[3], m[4]) if m[1] else (m[8], m[7], m[5])
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                pass
+    return _coerce(value, DATE_FORMATS, _parse_date)
+
+
+def _coerce_time(value):
+    if isinstance(value, str):
+        m = TIME_RE.fullmatch(value.strip())
+        if m:
+            hour, minute, second = (m[1], m[2], m[3] or 0) if m[1] else (m[4], m[5], 0)
+            try:
+                return time(int(hour), int(minute), int(second))
+            except ValueError:
+                pass
+    return _coerce(value, TIME_FORMATS, _parse_time)
+
+
+def _prepare_date(value):
+    return value.date() if isinstance(value, datetime) else _coerce_date(value)
+
+
+def _prepare_time(value):
+    return value.time() if isinstance(value, datetime) else _coerce_time(value)
+
+
+def _prepare_upper(value):
+    return value.strip().upper() if isinstance(value, str) else _prepare_text(value)
+
+
+def _prepare_stripped(value):
+    return value.strip() if isinstance(value, str) else _prepare_text(value)
+
+
+def _prepare_direction(value):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        return {"arrival": "in", "departure": "out"}.get(value, value)
+    return _prepare_text(value)
+
+
+def _prepare_text(value):
+    if value is not None and not isinstance(value, (str, date, time)):
+        return str(value)
+    return value
+
+
+# field name -> how the spreadsheet value is turned into form input
+TRAFFIC_PREPARERS = {
+    "trDate": _prepare_date, "edr": _prepare_date,
+    "trTime": _prepare_time, "etr": _prepare_time,
+    "name": _prepare_upper, "berth": _prepare_upper,
+    "boatType": _prepare_stripped,
+    "direction": _prepare_direction,
+}
+
+
+def traffic_fields(fields):
+    """
+    {name: (form field, preparer, model field)} for clean_traffic_row; built
+    once per import rather than looked up per row.
+    """
+    return {name: (field, TRAFFIC_PREPARERS.get(name, _prepare_text), TrafficEntry._meta.get_field(name))
+            for name, field in fields.items()}
+
+
+def clean_traffic_row(record, fields):
+    """
+    Validate one row with NewTrafficForm's rules: the form fields' clean()
+    plus the model field validators the ModelForm runs in full_clean (e.g.
+    passengers >= 1). The form has no form-level clean. `fields` comes from
+    traffic_fields(). Returns (cleaned, errors).
+    """
+    cleaned, errors = {}, {}
+    for name, (field, prepare, model_field) in fields.items():
+        try:
+            cleaned[name] = field.clean(prepare(record.get(name)))
+            if cleaned[name] not in (None, ""):
+                model_field.run_validators(cleaned[name])
+        except forms.ValidationError as exc:
+            errors[name] = exc.messages
+    return cleaned, errors
+
+
+class BoatIndex:
+    """In-memory lookup of boat ids by (NAME, BERTH), then by NAME if unique."""
+    def __init__(self, boats=None):
+        boats = boats if boats is not None else Boat.all_objects.filter(archived=False)
+        self.by_name_berth = {}
+        by_name = defaultdict(set)
+        for pk, name, berth in boats.values_list("id", "name", "berth").iterator(chunk_size=2000):
+            key_name = (name or "").upper()
+            self.by_name_berth.setdefault((key_name, (berth or "").upper()), pk)
+            by_name[key_name].add(pk)
+        self.by_name = {name: next(iter(ids)) for name, ids in by_name.items() if len(ids) == 1}
+
+    def match(self, name, berth):
+        name, berth = (name or "").upper(), (berth or "").upper()
+        return self.by_name_berth.get((name, berth)) or self.by_name.get(name)
+
+
+# ---- importing ----
+def _insert_traffic(entries):
+    TrafficEntry.objects.bulk_create(entries, batch_size=INSERT_BATCH_SIZE)
+    # bulk_create skips signals: add the chunk to the daily summary, drop the occupancy
+    # snapshots it lands before, and tell open pages once per chunk rather
+    # than per row
+    DailyTrafficSummary.apply_many(e.summary_contribution() for e in entries)
+    occupancy.invalidate(*(e.movement() for e in entries))
+    listcache.bump(TrafficEntry)
+    live.publish("traffic", "imported", count=len(entries))
+
+
+def _flush_traffic(entries, report, dry_run, progress):
+    if not entries:
+        return
+    if not dry_run:
+        writes.run(_insert_traffic, entries)
+    report.created += len(entries)
+    entries.clear()
+    if progress:
+        progress(report)
+
+
+def import_traffic(fileobj, filename, *, dry_run=False, chunk_size=CHUNK_SIZE, progress=None):
+    """Import a traffic log; progress(report), if given, is called after every chunk."""
+    report = ImportReport()
+    fields = traffic_fields(NewTrafficForm.base_fields)
+    boats = BoatIndex()
+    tz = timezone.get_current_timezone()
+    pending = []
+
+    for row_number, record in read_rows(fileobj, filename, TRAFFIC_HEADERS):
+        report.total += 1
+        cleaned, errors = clean_traffic_row(record, fields)
+        if errors:
+            report.add_error(row_number, errors)
+            continue
+        entry = TrafficEntry(**cleaned)
+        # what TrafficEntry.save() does; bulk_create does not call it
+        entry.occurred_at = entry.timed_at(tz=tz)
+        boat_id = boats.match(entry.name, entry.berth)
+        if boat_id:
+            entry.trafficBoatId_id = boat_id
+            report.matched_boats += 1
+        pending.append(entry)
+        if len(pending) >= chunk_size:
+            _flush_traffic(pending, report, dry_run, progress)
+    _flush_traffic(pending, report, dry_run, progress)
+    return report
+
+
+def _boat_form_data(record):
+    """Map a registry row onto NewBoatForm's POST shape (booking_type + dates)."""
+    data = {k: v for k, v in record.items() if k not in ("cid", "ecod")}
+    if isinstance(data.get("state"), str):
+        data["state"] = data["state"].strip().lower()
+    cid, ecod = record.get("cid"), record.get("ecod")
+    marker = str(cid or "").strip().lower()
+    if marker in ("yearly", "guest"):
+        data["booking_type"] = marker
+    else:
+        data["booking_type"] = "daily_monthly"
+        for key, value in (("cid", cid), ("ecod", ecod)):
+            value = _coerce(value, DATE_FORMATS, _parse_date)
+            if isinstance(value, datetime):
+                value = value.date()
+            if isinstance(value, date):
+                data[key] = value.isoformat()
+    return data
+
+
+def _insert_boats(boats):
+    Boat.objects.bulk_create(boats)
+    listcache.bump(Boat)
+    live.publish("boat", "imported", count=len(boats))
+
+
+def _flush_boats(boats, report, dry_run, progress):
+    if not boats:
+        return
+    if not dry_run:
+        writes.run(_insert_boats, boats)
+    report.created += len(boats)
+    boats.clear()
+    if progress:
+        progress(report)
+
+
+def import_boats(fileobj, filename, *, dry_run=False, chunk_size=CHUNK_SIZE, progress=None):
+    """Import a boat registry; progress(report), if given, is called after every chunk."""
+    report = ImportReport()
+    pending = []
+    for row_number, record in read_rows(fileobj, filename, BOAT_HEADERS):
+        report.total += 1
+        form = NewBoatForm(data=_boat_form_data(record))
+        if not form.is_valid():
+            report.add_error(row_number, {field: list(errs) for field, errs in form.errors.items()})
+            continue
+        boat = form.save(commit=False)
+        # what Boat.save() would do; bulk_create does not call it
+        boat.name, boat.berth = boat.name.upper(), boat.berth.upper()
+        boat.deleted = boat.archived = False
+        pending.append(boat)
+        if len(pending) >= chunk_size:
+            _flush_boats(pending, report, dry_run, progress)
+    _flush_boats(pending, report, dry_run, progress)
+    return report
+
+
+# ---- background jobs ----
+IMPORTERS = {"traffic": import_traffic, "boats": import_boats}
+
+
+def start_job(upload, kind, *, dry_run=False):
+    """
+    Copy the upload to a temporary file (Django removes its own when the
+    request ends) and import it in a thread of this process; returns the
+    ImportJob, whose row the thread keeps up to date.
+    """
+    with tempfile.NamedTemporaryFile(prefix="import-", delete=False) as fh:
+        for data in upload.chunks():
+            fh.write(data)
+    job = writes.run(ImportJob.objects.create, kind=kind, filename=upload.name, dry_run=dry_run)
+    thread = threading.Thread(target=run_job, args=(job.pk, fh.name), name=f"import-{job.pk}", daemon=True)
+    thread.start()
+    return job
+
+
+PROGRESS_FIELDS = ["total", "created", "failed", "matched_boats"]
+
+
+def _copy_counts(job, report):
+    for name in PROGRESS_FIELDS:
+        setattr(job, name, getattr(report, name))
+
+
+def run_job(job_pk, path):
+    """Import the file at `path` for ImportJob `job_pk`, then delete the file."""
+    job = ImportJob.objects.get(pk=job_pk)
+    report = ImportReport()
+
+    def progress(latest):
+        nonlocal report
+        report = latest
+        _copy_counts(job, report)
+        writes.run(job.save, update_fields=PROGRESS_FIELDS)
+
+    try:
+        with open(path, "rb") as fh:
+            report = IMPORTERS[job.kind](fh, job.filename, dry_run=job.dry_run, progress=progress)
+    except Exception as exc:
+        # the chunks committed so far stay imported; the job says where it stopped
+        logger.exception("Import job %s failed", job_pk)
+        job.error = f"{type(exc).__name__}: {exc}"
+    finally:
+        os.unlink(path)
+    try:
+        _copy_counts(job, report)
+        job.errors = [[row_number, errors] for row_number, errors in report.errors]
+        job.finished_at = timezone.now()
+        writes.run(job.save, update_fields=[*PROGRESS_FIELDS, "errors", "error", "finished_at"])
+    finally:
+        close_old_connections()
@@ -0,0 +1,222 @@
+# trafficApp/utils/listcache.py
+"""
+Cached results of the list views (boats, traffic, pending deletions), so a
+GET for data that has not changed since the last one runs a single small
+query instead of all of them.
+
+An entry is keyed on the view, its normalized GET parameters and the
+version counter of every model it lists (CacheVersion, one row per model).
+Every write bumps the counters of what it changes, in its own transaction:
+post_save / post_delete do it through signals.py, the queryset .update()
+and bulk_create() paths call bump() next to the write. A committed write
+therefore moves every process to new keys at once (the counters live in
+the database, not in the cache), and the old entries are never read
+again; they age out of the LRU.
+
+Entries are kept in a per-process LRU bounded by LIST_CACHE_MAX_ENTRIES
+and LIST_CACHE_MAX_BYTES (pickled size). LIST_CACHE_ALIAS can name a CACHES
+alias to share them between the worker processes (a FileBasedCache
+directory, or another LocMemCache to give them their own bound); a local
+miss is then looked up there, and new results are written to both.
+
+Nothing read inside a transaction is cached: it may include writes that
+are rolled back, and their version number would be reused by the next
+write.
+"""
+import copy
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.db.models import F
+
+from ..models import CacheVersion
+
+PAGINATOR_FIELDS = ("count", "num_pages", "per_page", "min_day", "max_day")
+
+
+class LRU:
+    """Least recently used first out, bounded by entry count and total size. Thread-safe."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.size -= dropped
+                self.evictions += 1
+
+
+class FrozenPaginator:
+    """What the list templates and pagers read from a paginator, without its queryset."""
+
+    def __init__(self, paginator):
+        for name in PAGINATOR_FIELDS:
+            if hasattr(paginator, name):
+                setattr(self, name, getattr(paginator, name))
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def validate_number(self, number):
+        # what Django's Page asks of its paginator for the neighbouring page numbers
+        if not 1 <= number <= self.num_pages:
+            raise InvalidPage("That page does not exist")
+        return number
+
+
+_lock = threading.Lock()
+_store = None
+
+
+def enabled():
+    return getattr(settings, "LIST_CACHE_ENABLED", False)
+
+
+def store():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = LRU(getattr(settings, "LIST_CACHE_MAX_ENTRIES", 256),
+                             getattr(settings, "LIST_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    return _store
+
+
+def clear():
+    """Drop this process's entries (and pick up changed LIST_CACHE_* settings)."""
+    global _store
+    _store = None
+
+
+def stats():
+    lru = store()
+    return {"entries": len(lru), "bytes": lru.size, "hits": lru.hits, "misses": lru.misses,
+            "evictions": lru.evictions}
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def bump(*models):
+    """Start a new version of each model's cached results. Call it in the transaction of the write."""
+    names = [_label(model) for model in models]
+    if CacheVersion.objects.filter(name__in=names).update(version=F("version") + 1) < len(names):
+        # a model's first write: create its counter (bumping the others twice is harmless)
+        CacheVersion.objects.bulk_create([CacheVersion(name=name) for name in names], ignore_conflicts=True)
+        CacheVersion.objects.filter(name__in=names).update(version=F("version") + 1)
+
+
+def versions(*models):
+    names = [_label(model) for model in models]
+    found = dict(CacheVersion.objects.filter(name__in=names).values_list("name", "version"))
+    return tuple(found.get(name, 0) for name in names)
+
+
+async def aversions(*models):
+    names = [_label(model) for model in models]
+    found = {name: version async for name, version in
+             CacheVersion.objects.filter(name__in=names).values_list("name", "version")}
+    return tuple(found.get(name, 0) for name in names)
+
+
+def freeze_page(page):
+    """A copy of a page (Django's, DayPage or KeysetPage) that pickles without its querysets."""
+    frozen = copy.copy(page)
+    frozen.object_list = list(page.object_list)
+    frozen.paginator = FrozenPaginator(page.paginator)
+    return frozen
+
+
+def fetch(name, params, models, compute):
+    """
+    compute()'s result for this view and these parameters, from the cache
+    when none of `models` has changed since it was stored. The result must
+    pickle (lists of model instances, frozen pages; no querysets).
+    """
+    if not enabled() or connection.in_atomic_block:
+        return compute()
+    key = _key(name, params, versions(*models))
+    lru = store()
+    result = lru.get(key)
+    if result is not None:
+        return result
+
+    shared = _shared()
+    data = shared.get(key) if shared is not None else None
+    if data is not None:
+        result = pickle.loads(data)
+    else:
+        result = compute()
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        if shared is not None:
+            shared.set(key, data)
+    lru.set(key, result, len(data))
+    return result
+
+
+async def afetch(name, params, models, compute):
+    """fetch() for async views; `compute` is a coroutine function."""
+    if not enabled() or connection.in_atomic_block:
+        return await compute()
+    key = _key(name, params, await aversions(*models))
+    lru = store()
+    result = lru.get(key)
+    if result is not None:
+        return result
+
+    shared = _shared()
+    data = await shared.aget(key) if shared is not None else None
+    if data is not None:
+        result = pickle.loads(data)
+    else:
+        result = await compute()
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        if shared is not None:
+            await shared.aset(key, data)
+    lru.set(key, result, len(data))
+    return result
+
+
+def _key(name, params, version):
+    raw = repr((name, sorted(params.items()), version))
+    return "lists:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _shared():
+    alias = getattr(settings, "LIST_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
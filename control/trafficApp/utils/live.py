@@ -0,0 +1,244 @@
+# trafficApp/utils/live.py
+"""
+Live updates for the open list pages, over server-sent events.
+
+Writers call publish() inside their write transaction; it appends a
+ChangeEvent row. Each server process runs one Hub: a poller task on the ASGI
+event loop that reads new rows and fans them out to the SSE streams of that
+process. It is woken right after a commit made in the same process, and
+otherwise polls every LIVE_EVENTS_POLL_SECONDS to pick up writes from other
+processes (other workers, management commands, the import). That is one
+query per poll per process, however many clients are connected, and no
+broker.
+
+Ids are handed out when a row is inserted, not when it commits, so on
+PostgreSQL a lower id can become visible after a higher one. A Cursor
+therefore remembers the ids it skipped and reads them again for
+LIVE_EVENTS_GAP_SECONDS; an id still missing after that belonged to a
+rolled-back write. Events can thus arrive slightly out of id order.
+
+On the wire (views.live_events):
+
+    id: 42
+    event: boat
+    data: {"action":"state","pks":[7],"state":"out"}
+
+    traffic: created / updated / deleted {pk, day}, imported {count};
+             a created event also carries {boats, state} when the movement
+             moved boats (the quick-entry form, batch movements)
+    boat:    created / updated {pks, state}, state {pks, state},
+             deleted / archived / restored {pks}, imported {count};
+             the sweeper's archived event has no pks (it archives by cutoff)
+    reset:   the client fell too far behind and should reload its list
+
+The event id lets a reconnecting EventSource resume from Last-Event-ID.
+"""
+import asyncio
+import logging
+import time
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+
+from ..models import ChangeEvent
+from . import writes
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 500    # events buffered per client before it is sent a reset
+BATCH = 500         # events read per poll / replayed on reconnect
+PRUNE_EVERY = 100   # prune the log on every Nth event
+RETRY_MS = 3000     # EventSource reconnect delay
+MAX_GAPS = 1000     # skipped ids a cursor keeps looking for
+
+RESET = "event: reset\ndata: {}\n\n"
+
+
+def enabled():
+    return getattr(settings, "LIVE_EVENTS_ENABLED", False)
+
+
+def publish(topic, action, **data):
+    """
+    Record a change for the open list pages. Call it in the transaction that
+    makes the change (it joins it); on its own it is a write of its own.
+    `data` must be JSON-serialisable (dates as ISO strings).
+    """
+    if not enabled():
+        return None
+    if connection.in_atomic_block:
+        # part of the caller's write: no savepoint, it commits or rolls back with it
+        return _append(topic, action, data)
+    return writes.run(_append, topic, action, data)
+
+
+def _append(topic, action, data):
+    event = ChangeEvent.objects.create(topic=topic, action=action, data=data)
+    if event.pk % PRUNE_EVERY == 0:
+        retain = getattr(settings, "LIVE_EVENTS_RETAIN", 10_000)
+        ChangeEvent.objects.filter(pk__lte=event.pk - retain).delete()
+    transaction.on_commit(HUB.notify)
+    return event
+
+
+def format_event(event):
+    data = orjson.dumps({"action": event.action, **event.data}).decode()
+    return f"id: {event.pk}\nevent: {event.topic}\ndata: {data}\n\n"
+
+
+def latest_id():
+    return ChangeEvent.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def events_after(last, limit=BATCH, gaps=()):
+    """Events after id `last`, plus those among the ids `gaps` that have committed since."""
+    condition = Q(pk__gt=last)
+    if gaps:
+        condition |= Q(pk__in=list(gaps))
+    return list(ChangeEvent.objects.filter(condition).order_by("pk")[:limit])
+
+
+class Cursor:
+    """
+    How far a reader got in the event log: the highest id it has read, and
+    the lower ids it has not seen yet (each with when it was first missed).
+    """
+    def __init__(self, last):
+        self.last = last
+        self.gaps = {}
+
+    def read(self, limit=BATCH):
+        return self.advance(events_after(self.last, limit, self.gaps))
+
+    def advance(self, events):
+        """Move past `events` (in id order); returns those not seen before."""
+        now = time.monotonic()
+        fresh = []
+        for event in events:
+            if event.pk in self.gaps:
+                del self.gaps[event.pk]
+            elif event.pk > self.last:
+                self.gaps.update(dict.fromkeys(range(max(self.last + 1, event.pk - MAX_GAPS), event.pk), now))
+                self.last = event.pk
+            else:
+                continue
+            fresh.append(event)
+        grace = getattr(settings, "LIVE_EVENTS_GAP_SECONDS", 10)
+        self.gaps = {pk: since for pk, since in self.gaps.items() if now - since < grace}
+        if len(self.gaps) > MAX_GAPS:
+            self.gaps = dict(sorted(self.gaps.items())[-MAX_GAPS:])
+        return fresh
+
+
+def backlog(since):
+    """Events after `since` for a resuming client, or None if it must reset."""
+    if since and not ChangeEvent.objects.filter(pk=since).exists():
+        return None  # pruned (or not ours): events may be missing
+    events = events_after(since, BATCH + 1)
+    return events if len(events) <= BATCH else None
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Hub:
+    """Per-process fan-out of the ChangeEvent log to the SSE streams."""
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    def notify(self):
+        """Poll now (called on commit; from any thread)."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def subscribe(self, start):
+        """A new client that has seen everything up to event id `start`."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # first client, or a new event loop (server restart, tests)
+            self._loop, self._wake, self._task = loop, asyncio.Event(), None
+            self._subscribers = set()
+        subscriber = Subscriber()
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(start))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def _deliver(self, event):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # a stuck client: drop it, its stream sends a reset
+                subscriber.overflowed = True
+                self._subscribers.discard(subscriber)
+
+    async def _run(self, last):
+        poll = getattr(settings, "LIVE_EVENTS_POLL_SECONDS", 1.0)
+        cursor = Cursor(last)
+        while self._subscribers:
+            try:
+                await asyncio.wait_for(self._wake.wait(), poll)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                events = await sync_to_async(cursor.read)()
+            except DatabaseError:
+                logger.exception("Reading live events failed")
+                await sync_to_async(close_old_connections)()
+                continue
+            for event in events:
+                self._deliver(event)
+
+
+HUB = Hub()
+
+
+async def stream(since=None):
+    """The SSE body of one client: events after `since` (default: from now on)."""
+    keepalive = getattr(settings, "LIVE_EVENTS_KEEPALIVE_SECONDS", 15)
+    last = since if since is not None else await sync_to_async(latest_id)()
+    subscriber = HUB.subscribe(last)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # Read after subscribing: whatever committed before the poller got
+        # to it is replayed here, anything later arrives through the queue
+        # (and what arrives both ways is sent once).
+        replay = await sync_to_async(backlog)(last)
+        if replay is None:
+            yield RESET
+            return
+        cursor = Cursor(last)
+        for event in cursor.advance(replay):
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # also how a dead connection is noticed
+                continue
+            if subscriber.overflowed:
+                yield RESET
+                return
+            for event in cursor.advance([event]):
+                yield format_event(event)
+    finally:
+        HUB.unsubscribe(subscriber)
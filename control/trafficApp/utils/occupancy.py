@@ -0,0 +1,202 @@
+# trafficApp/utils/occupancy.py
+"""
+Boat states as of any moment, replayed from the traffic log.
+
+A boat's state at time T is the direction of its last timed movement at or
+before T: a TrafficEntry with trafficBoatId and occurred_at (untimed entries
+are not part of the log; fill_occurred_at gives them a time). A boat without
+one has no known state. Boat.state is only the latest of these, as recorded
+when the entry was made.
+
+OccupancySnapshot rows hold every boat's state at fixed boundaries, local
+midnights OCCUPANCY_SNAPSHOT_DAYS apart, so as_of(T) reads the snapshot at
+or before T and replays only the movements since, off the occurred_at index:
+at most one interval of traffic. `manage.py rebuild_occupancy` builds them
+(--extend from cron adds the new ones) and reconciles Boat.state with the
+log. Any change to the log at or before a snapshot deletes it and the later
+ones (signals.py, the importer), so a stale snapshot is never read; until
+they are rebuilt, queries replay from the previous one.
+
+Entries moved to the cold tier (utils/tiering.py) stay in the log: log()
+merges ColdTrafficEntry with TrafficEntry, and moving them changes no
+state, so the snapshots stay valid.
+"""
+import heapq
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Boat, ColdTrafficEntry, OccupancySnapshot, State, TrafficEntry
+from . import listcache, live, writes
+
+CHUNK_SIZE = 5000
+
+
+@dataclass
+class Occupancy:
+    at: datetime
+    states: dict            # boat pk -> state, for boats with a movement up to `at`
+    snapshot: datetime      # the snapshot the replay started from (None: the beginning)
+    replayed: int           # movements replayed on top of it
+
+    def counts(self):
+        return Counter(self.states.values())
+
+    def boats(self, state):
+        return sorted(pk for pk, s in self.states.items() if s == state)
+
+
+def interval():
+    return timedelta(days=getattr(settings, "OCCUPANCY_SNAPSHOT_DAYS", 7))
+
+
+def next_boundary(after):
+    """The first snapshot time after `after`: a local midnight on a day whose ordinal is a multiple of the interval."""
+    days = max(1, interval().days)
+    day = timezone.localtime(after).date()
+    day += timedelta(days=-day.toordinal() % days)
+    while True:
+        boundary = timezone.make_aware(datetime.combine(day, time.min))
+        if boundary > after:
+            return boundary
+        day += timedelta(days=days)
+
+
+def movements(after=None, until=None, model=TrafficEntry):
+    """(boat pk, direction, occurred_at) of one tier's timed log in (after, until], in order."""
+    qs = model.objects.filter(trafficBoatId__isnull=False, occurred_at__isnull=False)
+    if after is not None:
+        qs = qs.filter(occurred_at__gt=after)
+    if until is not None:
+        qs = qs.filter(occurred_at__lte=until)
+    return qs.order_by("occurred_at", "id").values_list("trafficBoatId", "direction", "occurred_at")
+
+
+def log(after=None, until=None):
+    """movements() of both tiers, merged in (occurred_at, id) order; an iterator."""
+    if not movements(after, until, ColdTrafficEntry).exists():
+        return movements(after, until).iterator(chunk_size=CHUNK_SIZE)
+    tiers = [
+        movements(after, until, model).values_list("occurred_at", "id", "trafficBoatId", "direction")
+        .iterator(chunk_size=CHUNK_SIZE)
+        for model in (ColdTrafficEntry, TrafficEntry)
+    ]
+    # ids are unique across the tiers, so the tuples never compare past the id
+    return ((boat, direction, at) for at, _, boat, direction in heapq.merge(*tiers))
+
+
+def first_movement(until):
+    """occurred_at of the first timed movement up to `until` in either tier, or None."""
+    times = [movements(until=until, model=model).values_list("occurred_at", flat=True).first()
+             for model in (ColdTrafficEntry, TrafficEntry)]
+    return min((t for t in times if t is not None), default=None)
+
+
+def pack(states):
+    grouped = {}
+    for pk, state in states.items():
+        grouped.setdefault(state, []).append(pk)
+    return {state: sorted(pks) for state, pks in sorted(grouped.items())}
+
+
+def unpack(snapshot):
+    return {pk: state for state, pks in snapshot.states.items() for pk in pks}
+
+
+def as_of(when):
+    """Every boat's state at `when`: one snapshot read plus the replay since it."""
+    snapshot = OccupancySnapshot.objects.filter(taken_at__lte=when).order_by("-taken_at").first()
+    start = snapshot.taken_at if snapshot else None
+    states = unpack(snapshot) if snapshot else {}
+    replayed = 0
+    for boat, direction, _ in log(after=start, until=when):
+        states[boat] = direction
+        replayed += 1
+    return Occupancy(when, states, start, replayed)
+
+
+def state_of(boat, when):
+    """One boat's state at `when` (None if it has no movement by then); one index lookup per tier."""
+    boat = getattr(boat, "pk", boat)
+    latest = [
+        model.objects
+        .filter(trafficBoatId=boat, occurred_at__lte=when)
+        .order_by("-occurred_at", "-id")
+        .values_list("occurred_at", "id", "direction")
+        .first()
+        for model in (TrafficEntry, ColdTrafficEntry)
+    ]
+    found = max(filter(None, latest), default=None)
+    return found[2] if found else None
+
+
+def invalidate(*movements):
+    """Drop the snapshots a changed log entry falls into (TrafficEntry.movement() values, or None)."""
+    times = [movement[1] for movement in movements if movement]
+    if not times:
+        return 0
+    deleted, _ = OccupancySnapshot.objects.filter(taken_at__gte=min(times)).delete()
+    return deleted
+
+
+def build(*, extend=False, now=None):
+    """
+    (Re)build the snapshots up to `now`, in one pass over the log; with
+    extend=True only the ones after the latest existing snapshot. Returns the
+    number of snapshots written.
+    """
+    return writes.run(_build, extend, now or timezone.now())
+
+
+def _build(extend, now):
+    latest = OccupancySnapshot.objects.order_by("-taken_at").first() if extend else None
+    if latest is None:
+        OccupancySnapshot.objects.all().delete()
+        first = first_movement(now)
+        if first is None:
+            return 0
+        after, states, boundary = None, {}, next_boundary(first)
+    else:
+        after, states, boundary = latest.taken_at, unpack(latest), next_boundary(latest.taken_at)
+
+    snapshots = []
+    for boat, direction, occurred_at in log(after=after, until=now):
+        while occurred_at > boundary:
+            snapshots.append(OccupancySnapshot(taken_at=boundary, states=pack(states)))
+            boundary = next_boundary(boundary)
+        states[boat] = direction
+    while boundary <= now:
+        snapshots.append(OccupancySnapshot(taken_at=boundary, states=pack(states)))
+        boundary = next_boundary(boundary)
+    OccupancySnapshot.objects.bulk_create(snapshots, batch_size=100)
+    return len(snapshots)
+
+
+def reconcile(*, fix=False, now=None):
+    """
+    Boats (not archived) whose Boat.state differs from their last movement up
+    to `now`, as {pk: (recorded state, logged state)}. With fix=True they are
+    set to the logged state, one UPDATE per state.
+    """
+    logged = as_of(now or timezone.now()).states
+    recorded = Boat.all_objects.filter(archived=False).values_list("pk", "state")
+    mismatched = {
+        pk: (state, logged[pk]) for pk, state in recorded
+        if pk in logged and state != logged[pk] and logged[pk] in State.values
+    }
+    if fix and mismatched:
+        writes.run(_set_states, mismatched)
+    return mismatched
+
+
+def _set_states(mismatched):
+    by_state = {}
+    for pk, (_, state) in mismatched.items():
+        by_state.setdefault(state, []).append(pk)
+    for state, pks in by_state.items():
+        Boat.all_objects.filter(pk__in=pks).update(state=state)
+        live.publish("boat", "state", pks=sorted(pks), state=state)
+    listcache.bump(Boat)
@@ -1,16 +1,20 @@
 # trafficApp/utils/paginators.py
-from datetime import timedelta
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, time, timedelta
+from django.core.exceptions import ValidationError
 from django.core.paginator import InvalidPage
-from django.db.models import Min, Max, F
-from django.db.models.functions import TruncDate, Coalesce
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
 
 class DayPage:
     """A minimal Page-like object Django templates expect."""
-    def __init__(self, *, day, object_list, number, paginator):
+    def __init__(self, *, day, object_list, number, paginator, summary=None):
         self.day = day
         self.object_list = object_list
         self.number = number
         self.paginator = paginator
+        self.summary = summary
 
     def has_other_pages(self): return self.paginator.num_pages > 1
     def has_previous(self):    return self.number > 1
@@ -24,53 +28,228 @@ class DayPage:
 
 class DayPaginator:
     """
-    Paginates a queryset by calendar day (descending), optionally including empty days.
+    Paginates a queryset by calendar day (descending), including empty days.
     Expects the queryset to be fully filtered/sorted for intra-day order already.
-    """
-    def __init__(self, base_qs, *, include_empty_days=True):
-        self.base_qs = base_qs
 
-        # Normalize a date column: day = date(occurred_at) or fallback to trDate
-        dates_qs = (
-            base_qs
-            .annotate(day=Coalesce(TruncDate("occurred_at"), F("trDate")))
-            .exclude(day__isnull=True)
-        )
+    A row's day is the local date of occurred_at, or trDate for rows without a
+    time (occurred_at is NULL). Pages are pure date arithmetic from the newest
+    day: page 1 is max_day, page n is max_day - (n - 1) days.
 
-        if include_empty_days:
-            agg = dates_qs.aggregate(min=Min("day"), max=Max("day"))
-            start, end = agg["min"], agg["max"]
-            self.days = []
-            if start and end:
-                cur = end
-                while cur >= start:
-                    self.days.append(cur)
-                    cur -= timedelta(days=1)
+    When `summaries` (a DailyTrafficSummary queryset) is given, the bounds and
+    each page's summary row come from that small table instead of the traffic
+    table; only pass it when base_qs is unfiltered, since the summary covers
+    all traffic.
+    """
+    def __init__(self, base_qs, *, summaries=None):
+        self.base_qs = base_qs
+        self.summaries = summaries
+        if summaries is not None:
+            self.min_day = summaries.order_by("day").values_list("day", flat=True).first()
+            self.max_day = summaries.order_by("-day").values_list("day", flat=True).first()
         else:
-            self.days = list(
-                dates_qs.values_list("day", flat=True).distinct().order_by("-day")
-            )
+            self.min_day, self.max_day = self._bounds()
 
-        self.count = len(self.days)
+        self.count = (self.max_day - self.min_day).days + 1 if self.max_day else 0
         self.num_pages = self.count or 1
         self.page_range = range(1, self.num_pages + 1)
 
+    def _bounds(self):
+        # One aggregate pass over the matching rows. Ordered single-row lookups
+        # look cheaper, but on a searched queryset the planner walks the
+        # occurred_at index testing the search on every row until one matches,
+        # which for a rare match is most of the table (seconds on PostgreSQL).
+        bounds = self.base_qs.aggregate(
+            first_at=Min("occurred_at"),
+            last_at=Max("occurred_at"),
+            first_day=Min("trDate", filter=Q(occurred_at__isnull=True)),
+            last_day=Max("trDate", filter=Q(occurred_at__isnull=True)),
+        )
+        candidates_min = [bounds["first_day"]]
+        candidates_max = [bounds["last_day"]]
+        if bounds["first_at"]:
+            candidates_min.append(timezone.localtime(bounds["first_at"]).date())
+            candidates_max.append(timezone.localtime(bounds["last_at"]).date())
+
+        candidates_min = [d for d in candidates_min if d]
+        candidates_max = [d for d in candidates_max if d]
+        if not candidates_min:
+            return None, None
+        return min(candidates_min), max(candidates_max)
+
+    def day_for_page(self, number):
+        return self.max_day - timedelta(days=number - 1)
+
+    def page_for_day(self, day):
+        """Page number showing `day`, clamped to the available range."""
+        if not self.max_day or day >= self.max_day:
+            return 1
+        if day <= self.min_day:
+            return self.num_pages
+        return (self.max_day - day).days + 1
+
+    def day_filter(self, day):
+        """Half-open [day 00:00, next day 00:00) on occurred_at, trDate for untimed rows."""
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+        return (
+            Q(occurred_at__gte=start, occurred_at__lt=end)
+            | Q(occurred_at__isnull=True, trDate=day)
+        )
+
     def page(self, number):
         try:
-            number = int(number or 1)
-        except ValueError:
+            number = int(number)
+        except (TypeError, ValueError):
             raise InvalidPage("Invalid page number")
 
         if number < 1 or number > self.num_pages:
             raise InvalidPage("That page does not exist")
 
-        if not self.days:  # no rows at all
+        if not self.max_day:  # no rows at all
             return DayPage(day=None, object_list=self.base_qs.none(), number=1, paginator=self)
 
-        day = self.days[number - 1]
-        day_qs = (
-            self.base_qs
-            .annotate(day=Coalesce(TruncDate("occurred_at"), F("trDate")))
-            .filter(day=day)
+        day = self.day_for_page(number)
+        day_qs = self.base_qs.filter(self.day_filter(day))
+        summary = self.summaries.filter(day=day).first() if self.summaries is not None else None
+        return DayPage(day=day, object_list=day_qs, number=number, paginator=self, summary=summary)
+
+
+class KeysetPage:
+    """
+    Page-like object for KeysetPaginator.
+
+    There is no total count, so there is no page number either: templates link
+    to the neighbouring pages with the opaque next_cursor / previous_cursor.
+    """
+    def __init__(self, *, object_list, paginator, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):        return iter(self.object_list)
+    def __len__(self):         return len(self.object_list)
+    def has_other_pages(self): return self._has_next or self._has_previous
+    def has_previous(self):    return self._has_previous
+    def has_next(self):        return self._has_next
+
+
+class KeysetPaginator:
+    """
+    Seek ("keyset") pagination over a single sort field plus the id tiebreaker.
+
+    Mirrors the ordering TrafficListView uses:
+        <field> ASC|DESC NULLS LAST, id ASC|DESC (same direction)
+    but instead of COUNT(*) + OFFSET it filters on the (field, id) of the
+    last/first row of the current page and fetches per + 1 rows, the extra row
+    being the cheap "is there more" probe. Page N costs the same as page 1.
+
+    The ordering is walked as two segments, non-null values then nulls, each
+    with a plain range predicate, so every query is an index SEARCH on
+    (field, id); an "OR field IS NULL" branch would turn it into a scan.
+
+    Cursors are opaque url-safe strings carrying the boundary row's key, the
+    direction of travel and the sort they were issued for; a cursor from a
+    different sort is ignored and the first page is returned instead.
+    """
+    NEXT, PREVIOUS = "n", "p"
+
+    def __init__(self, base_qs, *, per, field, direction="desc"):
+        self.base_qs = base_qs
+        self.per = per
+        self.field = field
+        self.direction = "asc" if direction == "asc" else "desc"
+        self.model_field = base_qs.model._meta.get_field(field)
+
+    # ---- cursor encoding ----
+    def encode_cursor(self, obj, travel):
+        value = getattr(obj, self.model_field.attname)
+        if hasattr(value, "isoformat"):
+            # isoformat keeps microseconds (DjangoJSONEncoder truncates them),
+            # which matters for exact equality on `created`/`occurred_at`.
+            value = value.isoformat()
+        payload = {"s": self.field, "o": self.direction, "t": travel,
+                   "v": value, "id": obj.pk}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return (travel, value, pk) or None if the cursor is unusable."""
+        if not cursor:
+            return None
+        try:
+            raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            if payload["s"] != self.field or payload["o"] != self.direction:
+                return None
+            travel = payload["t"]
+            if travel not in (self.NEXT, self.PREVIOUS):
+                return None
+            value = payload["v"]
+            if value is not None:
+                value = self.model_field.to_python(value)
+            return travel, value, int(payload["id"])
+        except (ValueError, TypeError, KeyError, ValidationError):
+            return None
+
+    # ---- segments and seek predicates ----
+    def _segments(self, travel, value=None, pk=None, bounded=False):
+        """
+        Querysets that, read in order, continue the walk from (value, pk) in
+        the direction of travel: a slice of the non-null segment and/or of
+        the nulls segment (nulls come last going forward).
+        """
+        f = self.field
+        # direction of the walk over the (field, id) index
+        ascending = (self.direction == "asc") == (travel == self.NEXT)
+        op = "gt" if ascending else "lt"
+        tiebreak = "id" if ascending else "-id"
+        values = self.base_qs.filter(**{f"{f}__isnull": False}).order_by(
+            F(f).asc() if ascending else F(f).desc(), tiebreak)
+        nulls = self.base_qs.filter(**{f"{f}__isnull": True}).order_by(tiebreak)
+
+        if not bounded:
+            return [values, nulls]
+        if value is None:
+            nulls = nulls.filter(**{f"id__{op}": pk})
+            return [nulls] if travel == self.NEXT else [nulls, values]
+        values = values.filter(Q(**{f"{f}__{op}": value}) | Q(**{f: value}, **{f"id__{op}": pk}))
+        return [values, nulls] if travel == self.NEXT else [values]
+
+    @staticmethod
+    def _take(segments, limit):
+        rows = []
+        for qs in segments:
+            rows.extend(qs[:limit - len(rows)])
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        if decoded is None:
+            rows = self._take(self._segments(self.NEXT), self.per + 1)
+            has_next, has_previous = len(rows) > self.per, False
+            rows = rows[:self.per]
+        else:
+            travel, value, pk = decoded
+            rows = self._take(self._segments(travel, value, pk, bounded=True), self.per + 1)
+            if travel == self.NEXT:
+                has_next, has_previous = len(rows) > self.per, True
+                rows = rows[:self.per]
+            else:
+                has_next, has_previous = True, len(rows) > self.per
+                rows = rows[:self.per][::-1]
+
+        return KeysetPage(
+            object_list=rows,
+            paginator=self,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self.encode_cursor(rows[-1], self.NEXT) if rows else None,
+            previous_cursor=self.encode_cursor(rows[0], self.PREVIOUS) if rows else None,
         )
-        return DayPage(day=day, object_list=day_qs, number=number, paginator=self)
@@ -0,0 +1,257 @@
+# trafficApp/utils/perf.py
+"""
+Per-request performance metrics (see trafficApp/middleware.py).
+
+RequestMetrics collects one request's SQL time / count (through a
+connection.execute_wrapper), template render time and its slowest queries.
+The process-wide REGISTRY keeps, per URL name, rolling histograms of the
+total / SQL / template time over the last PERF_METRICS_WINDOW_SECONDS and the
+slowest queries seen in that window, and renders them in the Prometheus text
+format for the metrics view. The slow queries' SQL is not a label there (it
+would make a series per statement); the slow_queries view lists it.
+
+Everything here is per process: with several workers, scrape each one.
+"""
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds in seconds, as in Prometheus' default buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOT_SECONDS = 60
+SLOWEST_KEPT = 5
+
+_current = ContextVar("perf_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, keep=SLOWEST_KEPT):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql_time = 0.0
+        self.sql_count = 0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self._keep = keep
+        self.slowest = []  # min-heap of (seconds, sql)
+
+    # connection.execute_wrapper hook
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_time += elapsed
+            self.sql_count += 1
+            if len(self.slowest) < self._keep:
+                heapq.heappush(self.slowest, (elapsed, sql))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, sql))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.slowest.sort(reverse=True)
+        return self
+
+    def server_timing(self):
+        app = max(self.total - self.sql_time - self.template_time, 0.0)
+        return ", ".join([
+            f"total;dur={self.total * 1000:.1f}",
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f"tpl;dur={self.template_time * 1000:.1f}",
+            f"app;dur={app * 1000:.1f}",
+        ])
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper that records into the current request's metrics, if there is one."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+# ---- template timing ----
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """
+    Time top-level template renders (render(), TemplateResponse,
+    render_to_string) by wrapping the Django template backend's render once.
+    Includes are rendered inside that call, so they are counted with it.
+    """
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    from django.template.backends.django import Template
+
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context, request)
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics._template_depth -= 1
+            if metrics._template_depth == 0:
+                metrics.template_time += time.perf_counter() - started
+
+    Template.render = render
+    _template_timer_installed = True
+
+
+# ---- rolling histograms ----
+class RollingHistogram:
+    """Bucket counts in SLOT_SECONDS slots; reads cover the last `window` seconds."""
+    def __init__(self, window):
+        self.slots = max(1, int(window // SLOT_SECONDS))
+        self._data = {}  # slot index -> [bucket counts..., +Inf count, sum]
+
+    def _slot(self, now):
+        return int(now // SLOT_SECONDS)
+
+    def observe(self, value, now):
+        slot = self._slot(now)
+        data = self._data.get(slot)
+        if data is None:
+            data = self._data[slot] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for old in [s for s in self._data if s <= slot - self.slots]:
+                del self._data[old]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                data[i] += 1
+                break
+        else:
+            data[len(BUCKETS)] += 1
+        data[-1] += value
+
+    def snapshot(self, now):
+        """(cumulative bucket counts incl. +Inf, count, sum) over the window."""
+        oldest = self._slot(now) - self.slots
+        counts = [0] * (len(BUCKETS) + 1)
+        total = 0.0
+        for slot, data in self._data.items():
+            if slot > oldest:
+                for i in range(len(counts)):
+                    counts[i] += data[i]
+                total += data[-1]
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, running, total
+
+
+class Registry:
+    SERIES = ("request", "sql", "template")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}  # view name -> {"request"/"sql"/"template": RollingHistogram, ...}
+
+    @property
+    def window(self):
+        return getattr(settings, "PERF_METRICS_WINDOW_SECONDS", 900)
+
+    def record(self, view, metrics, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    name: RollingHistogram(self.window) for name in self.SERIES
+                }
+                entry["queries"] = RollingHistogram(self.window)  # only count/sum are read
+                entry["slowest"] = []
+            entry["request"].observe(metrics.total, now)
+            entry["sql"].observe(metrics.sql_time, now)
+            entry["template"].observe(metrics.template_time, now)
+            entry["queries"].observe(metrics.sql_count, now)
+            slowest = entry["slowest"]
+            for seconds, sql in metrics.slowest:
+                slowest.append((seconds, now, sql))
+            cutoff = now - self.window
+            slowest[:] = sorted((s for s in slowest if s[1] > cutoff), reverse=True)[:SLOWEST_KEPT]
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def slowest(self, now=None):
+        """{view: [(seconds, sql), ...]}: the slowest queries in the window, slowest first."""
+        cutoff = (time.time() if now is None else now) - self.window
+        with self._lock:
+            return {view: [(seconds, sql) for seconds, at, sql in entry["slowest"] if at > cutoff]
+                    for view, entry in sorted(self._views.items())}
+
+    def prometheus(self, now=None, extra=()):
+        now = time.time() if now is None else now
+        lines = []
+        with self._lock:
+            views = sorted(self._views.items())
+            for series, help_text in (
+                ("request", "Request time"),
+                ("sql", "SQL time per request"),
+                ("template", "Template render time per request"),
+            ):
+                metric = f"traffic_{series}_duration_seconds"
+                lines.append(f"# HELP {metric} {help_text}, last {self.window}s, by URL name.")
+                lines.append(f"# TYPE {metric} histogram")
+                for view, entry in views:
+                    lines.extend(_histogram_lines(metric, view, entry[series].snapshot(now), BUCKETS))
+
+            metric = "traffic_request_queries"
+            lines.append(f"# HELP {metric} SQL queries per request, last {self.window}s, by URL name.")
+            lines.append(f"# TYPE {metric} summary")
+            for view, entry in views:
+                _, count, total = entry["queries"].snapshot(now)
+                lines.append(f'{metric}_count{{view="{_label(view)}"}} {count}')
+                lines.append(f'{metric}_sum{{view="{_label(view)}"}} {total:g}')
+
+            metric = "traffic_slow_query_seconds"
+            lines.append(f"# HELP {metric} Slowest queries in the last {self.window}s, by URL name "
+                         f"(their SQL: /metrics/slow/).")
+            lines.append(f"# TYPE {metric} gauge")
+            for view, entry in views:
+                for rank, (seconds, _, _) in enumerate(entry["slowest"], 1):
+                    lines.append(f'{metric}{{view="{_label(view)}",rank="{rank}"}} {seconds:.6f}')
+        for name, kind, help_text, value in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", " ").replace('"', '\\"')
+
+
+def _histogram_lines(metric, view, snapshot, bounds):
+    cumulative, count, total = snapshot
+    label = _label(view)
+    lines = [f'{metric}_bucket{{view="{label}",le="{bound:g}"}} {n}'
+             for bound, n in zip(bounds, cumulative)]
+    lines.append(f'{metric}_bucket{{view="{label}",le="+Inf"}} {cumulative[-1]}')
+    lines.append(f'{metric}_sum{{view="{label}"}} {total:.6f}')
+    lines.append(f'{metric}_count{{view="{label}"}} {count}')
+    return lines
+
+
+REGISTRY = Registry()
@@ -0,0 +1,323 @@
+# trafficApp/utils/reports.py
+"""
+Occupancy per berth or per boat type over a date range, by day or by hour.
+
+The range's movements are read in one values_list pass into columns
+(stdlib arrays and lists), and every boat's state when the range starts
+comes from the occupancy snapshots (utils/occupancy.py).
+Each boat's "in" followed by its next "out" / "repair" becomes one interval.
+Intervals go into the matrix with difference arrays: an interval adds its
+fraction to its first and last bucket and +1 / -1 at the ends of the fully
+covered run between them, and one running sum per row fills in the rest.
+The work is proportional to movements + rows x buckets, never to
+movements x buckets, and with numpy (requirements.txt) both parts are array
+operations: an hourly year over a few hundred berths is millions of cells.
+Without numpy the same arithmetic runs as plain Python loops.
+
+A bucket's value is the average number of boats present during it: a berth
+that held one boat for half the day reads 0.5 for that day.
+
+Movements that do not pair up are counted, not guessed at: an "in" for a
+boat that is already in (its interval continues) or an "out" for a boat that
+is not. Boats in when the range starts are put at their registered berth;
+boats still in at its end (or now, whichever is first) stay in until then.
+Ranges reaching into the cold tier (utils/tiering.py) read both traffic
+tables, merged in time order, and boats from Boat and ColdBoat.
+
+Reports are cached per range, grouping and resolution, keyed on the latest
+ChangeEvent id, so any change made through the app starts new entries.
+REPORT_CACHE_SECONDS bounds how long an entry outlives a change made behind
+the app's back (raw SQL, seed_benchmark).
+"""
+import heapq
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from itertools import accumulate, chain, islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # optional: matrix() falls back to plain lists
+    np = None
+
+from ..models import Boat, ColdBoat, ColdTrafficEntry, State, TrafficEntry
+from . import live, occupancy
+
+CHUNK_SIZE = 5000
+
+
+class Epoch(Func):
+    """A datetime column as epoch seconds, computed by the database (no datetime per row in Python)."""
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # stored as UTC text; whole seconds are plenty here. %%%% -> % after both formatting passes
+        return self.as_sql(compiler, connection, template="CAST(strftime('%%%%s', %(expressions)s) AS REAL)",
+                           **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="EXTRACT(EPOCH FROM %(expressions)s)::float",
+                           **extra_context)
+
+
+@dataclass
+class MovementLog:
+    """The timed log of a range, one column per field, in time order."""
+    boat: array = field(default_factory=lambda: array("q"))
+    at: array = field(default_factory=lambda: array("d"))     # epoch seconds
+    inbound: bytearray = field(default_factory=bytearray)     # 1 for "in"
+    berth: list = field(default_factory=list)
+    boat_type: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.at)
+
+
+@dataclass
+class Intervals:
+    """Stays in the marina as columns; `start` / `end` in epoch seconds."""
+    boat: array = field(default_factory=lambda: array("q"))
+    start: array = field(default_factory=lambda: array("d"))
+    end: array = field(default_factory=lambda: array("d"))
+    berth: list = field(default_factory=list)
+    boat_type: list = field(default_factory=list)
+    carried_in: int = 0         # boats already in when the range starts
+    still_in: int = 0           # boats still in when it ends
+    unmatched_in: int = 0       # "in" for a boat that was already in
+    unmatched_out: int = 0      # "out" / "repair" for a boat that was not in
+
+    def __len__(self):
+        return len(self.start)
+
+
+@dataclass
+class Report:
+    start: object               # first day
+    end: object                 # last day (inclusive)
+    by: str
+    resolution: str
+    buckets: list               # start of each bucket (aware datetimes)
+    keys: list                  # row labels (berths or boat types), sorted
+    rows: list                  # one list of len(buckets) averages per key
+    movements: int
+    intervals: int
+    carried_in: int
+    still_in: int
+    unmatched_in: int
+    unmatched_out: int
+
+    def summary(self):
+        """(key, mean, peak, % of buckets occupied at all) per row, rounded for display."""
+        n = len(self.buckets) or 1
+        return [
+            (key, round(sum(row) / n, 2), round(max(row, default=0), 2), round(100 * sum(map(bool, row)) / n))
+            for key, row in zip(self.keys, self.rows)
+        ]
+
+
+def bucket_edges(start, end, resolution):
+    """Local bucket boundaries from the first day's midnight to the midnight after the last day."""
+    edges = []
+    day = start
+    while day <= end:
+        midnight = timezone.make_aware(datetime.combine(day, time.min))
+        if resolution == "hour":
+            edges.extend(midnight + timedelta(hours=h) for h in range(24))
+        else:
+            edges.append(midnight)
+        day += timedelta(days=1)
+    edges.append(timezone.make_aware(datetime.combine(day, time.min)))
+    return edges
+
+
+def _fetch(model, since, until):
+    """One tier's movements as chunks of raw rows (boat, epoch, direction, berth, type, id)."""
+    qs = (
+        occupancy.movements(after=since, until=until, model=model)
+        .annotate(epoch=Epoch("occurred_at"))
+        .values_list("trafficBoatId", "epoch", "direction", "berth", "boatType", "id")
+    )
+    # plain DB values all (epoch instead of a datetime), so no per-row converters are needed
+    sql, params = qs.query.sql_with_params()
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while chunk := cursor.fetchmany(CHUNK_SIZE):
+            yield chunk
+
+
+def load_log(since, until):
+    """Movements with since < occurred_at <= until, in bulk, column by column."""
+    log = MovementLog()
+    chunks = _fetch(TrafficEntry, since, until)
+    if occupancy.movements(after=since, until=until, model=ColdTrafficEntry).exists():
+        # both tiers, merged on (time, id) and cut into chunks again
+        merged = heapq.merge(*(chain.from_iterable(_fetch(model, since, until))
+                               for model in (ColdTrafficEntry, TrafficEntry)),
+                             key=lambda row: (row[1], row[5]))
+        chunks = iter(lambda: list(islice(merged, CHUNK_SIZE)), [])
+    for chunk in chunks:
+        boat, at, direction, berth, boat_type, _ = zip(*chunk)
+        log.boat.extend(boat)
+        log.at.extend(at)
+        log.inbound.extend(d == State.IN for d in direction)
+        log.berth.extend(berth)
+        log.boat_type.extend(boat_type)
+    return log
+
+
+def pair(log, carried, since, until):
+    """
+    Turn a time-ordered log into intervals. `carried` maps the boats in at
+    `since` to their (berth, boat type); intervals are cut at `until`.
+    """
+    out = Intervals(carried_in=len(carried))
+    since, until = since.timestamp(), until.timestamp()
+    open_ = {pk: (since, berth, kind) for pk, (berth, kind) in carried.items()}
+
+    def close(pk, end):
+        start, berth, kind = open_.pop(pk)
+        out.boat.append(pk)
+        out.start.append(start)
+        out.end.append(end)
+        out.berth.append(berth)
+        out.boat_type.append(kind)
+
+    for i in range(len(log)):
+        pk = log.boat[i]
+        if log.inbound[i]:
+            if pk in open_:
+                out.unmatched_in += 1
+            else:
+                open_[pk] = (log.at[i], log.berth[i], log.boat_type[i])
+        elif pk in open_:
+            close(pk, log.at[i])
+        else:
+            out.unmatched_out += 1
+    out.still_in = len(open_)
+    for pk in list(open_):
+        close(pk, until)
+    return out
+
+
+def matrix(intervals, edges, by):
+    """Average boats present per bucket, per berth / boat type: (keys, rows)."""
+    if np is None:
+        return _matrix_lists(intervals, edges, by)
+    bounds = np.array([edge.timestamp() for edge in edges])
+    n = len(bounds) - 1
+    lengths = np.diff(bounds)
+    labels = np.array(intervals.berth if by == "berth" else intervals.boat_type, dtype=object)
+    a = np.maximum(np.frombuffer(intervals.start), bounds[0])
+    b = np.minimum(np.frombuffer(intervals.end), bounds[-1])
+    inside = b > a
+    labels, a, b = labels[inside], a[inside], b[inside]
+    keys = sorted(set(labels))
+    if not keys:
+        return [], []
+    row = np.searchsorted(np.array(keys, dtype=object), labels)
+    i = np.searchsorted(bounds, a, side="right") - 1
+    j = np.searchsorted(bounds, b, side="right") - 1
+
+    # fractions of the first / last bucket, as (flat cell, value) pairs
+    same = i == j
+    head = np.where(same, b - a, bounds[i + 1] - a) / lengths[i]
+    tail = ~same & (j < n)
+    tail &= b > bounds[np.minimum(j, n)]
+    jt = j[tail]
+    width = n + 1  # row length of the difference array below
+    cells = np.concatenate([row * width + i, row[tail] * width + jt])
+    parts = np.concatenate([head, (b[tail] - bounds[jt]) / lengths[jt]])
+
+    # +1 / -1 at the ends of the fully covered runs, then one running sum per row
+    runs = ~same
+    full = np.zeros((len(keys), width))
+    np.add.at(full, (row[runs], i[runs] + 1), 1)
+    np.add.at(full, (row[runs], j[runs]), -1)
+    np.cumsum(full, axis=1, out=full)
+
+    cells, where = np.unique(cells, return_inverse=True)
+    flat = full.reshape(-1)
+    # Python's round(), not np.round: it rounds some halves the other way
+    flat[cells] = [round(v, 3) for v in (flat[cells] + np.bincount(where, weights=parts)).tolist()]
+    return keys, full[:, :n].tolist()
+
+
+def _matrix_lists(intervals, edges, by):
+    """matrix() without numpy."""
+    bounds = [edge.timestamp() for edge in edges]
+    n = len(bounds) - 1
+    lengths = [bounds[k + 1] - bounds[k] for k in range(n)]
+    first, last = bounds[0], bounds[-1]
+    labels = intervals.berth if by == "berth" else intervals.boat_type
+    diffs, partials = {}, {}
+
+    for label, a, b in zip(labels, intervals.start, intervals.end):
+        a, b = max(a, first), min(b, last)
+        if b <= a:
+            continue
+        diff = diffs.get(label)
+        if diff is None:
+            diff = diffs[label] = [0.0] * (n + 1)
+            partials[label] = [0.0] * n
+        partial = partials[label]
+        i = bisect_right(bounds, a) - 1
+        j = bisect_right(bounds, b) - 1
+        if i == j:
+            partial[i] += (b - a) / lengths[i]
+            continue
+        partial[i] += (bounds[i + 1] - a) / lengths[i]
+        if j < n and b > bounds[j]:
+            partial[j] += (b - bounds[j]) / lengths[j]
+        diff[i + 1] += 1
+        diff[j] -= 1
+
+    keys = sorted(diffs)
+    rows = [
+        [round(full + part, 3) if part else full for full, part in zip(accumulate(diffs[key]), partials[key])]
+        for key in keys
+    ]
+    return keys, rows
+
+
+def occupancy_report(start, end, *, by="berth", resolution="day", now=None):
+    """The occupancy matrix for the days start..end (inclusive)."""
+    edges = bucket_edges(start, end, resolution)
+    since = edges[0]
+    until = min(edges[-1], now or timezone.now())
+    if until <= since:
+        return Report(start, end, by, resolution, edges[:-1], [], [], 0, 0, 0, 0, 0, 0)
+
+    states = occupancy.as_of(since).states
+    inside = [pk for pk, state in states.items() if state == State.IN]
+    carried = {pk: (berth, kind) for manager in (Boat.all_objects, ColdBoat.objects) for pk, berth, kind in
+               manager.filter(pk__in=inside).values_list("pk", "berth", "boatType")}
+    log = load_log(since, until)
+    intervals = pair(log, carried, since, until)
+    keys, rows = matrix(intervals, edges, by)
+    return Report(
+        start, end, by, resolution, edges[:-1], keys, rows,
+        movements=len(log), intervals=len(intervals),
+        carried_in=intervals.carried_in, still_in=intervals.still_in,
+        unmatched_in=intervals.unmatched_in, unmatched_out=intervals.unmatched_out,
+    )
+
+
+def cached_occupancy_report(start, end, *, by="berth", resolution="day"):
+    """occupancy_report() through the cache (see the module docstring)."""
+    version = live.latest_id() if live.enabled() else "off"
+    key = f"reports:occupancy:{by}:{resolution}:{start.isoformat()}:{end.isoformat()}:{version}"
+    if end >= timezone.localdate():
+        # open stays keep growing until the range is over
+        key += timezone.now().strftime(":%Y%m%d%H")
+    report = cache.get(key)
+    if report is None:
+        report = occupancy_report(start, end, by=by, resolution=resolution)
+        cache.set(key, report, getattr(settings, "REPORT_CACHE_SECONDS", 600))
+    return report
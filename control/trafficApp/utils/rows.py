@@ -0,0 +1,261 @@
+# trafficApp/utils/rows.py
+"""
+Compiled renderers for the list row partials.
+
+`lists/_table.html` used to `{% include row_partial %}` once per object: with
+MAX_PER rows that is hundreds of template renders, each resolving a dozen
+variables, the date/time filters and the `{% url %}` tags. The renderers here
+build the same HTML in plain Python:
+
+* every value goes through the template engine's own output path
+  (render_value_in_context / the date and time filters), so escaping,
+  localisation and time zone conversion are unchanged;
+* numeric date/time formats ("Y/m/d", "H:i", "c") are compiled once into
+  %-format strings instead of going through dateformat per value;
+* URL patterns are reversed once per page and filled in per row.
+
+The row templates stay the reference: a partial without a renderer is
+rendered through the template, and the tests check that both paths produce
+identical HTML. Changing a `_row.html` means changing its renderer here too.
+"""
+import functools
+import html
+from datetime import date, datetime, time
+from operator import attrgetter
+
+from django.conf import settings
+from django.template.base import render_value_in_context
+from django.template.defaultfilters import date as date_filter, time as time_filter
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.timezone import template_localtime
+
+# whitespace the row include sat in inside {% for %} in lists/_table.html
+ROW_PREFIX = "\n            "
+ROW_SUFFIX = "\n      "
+
+_URL_SENTINEL = 987654321
+
+# dateformat characters that are plain zero-padded numbers
+_NUMERIC_FORMATS = {
+    "Y": ("%04d", "year"),
+    "m": ("%02d", "month"),
+    "d": ("%02d", "day"),
+    "H": ("%02d", "hour"),
+    "i": ("%02d", "minute"),
+    "s": ("%02d", "second"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def compile_format(arg):
+    """
+    A fast equivalent of dateformat.format(value, arg) for formats made only
+    of numeric characters and punctuation, or None if arg needs dateformat.
+    """
+    if arg == "c":
+        return lambda value: value.isoformat()
+    pattern, attrs = [], []
+    for char in arg:
+        if char in _NUMERIC_FORMATS:
+            spec, attr = _NUMERIC_FORMATS[char]
+            pattern.append(spec)
+            attrs.append(attr)
+        elif char.isalpha() or char in '\\<>&"\'':
+            return None
+        else:
+            pattern.append(char.replace("%", "%%"))
+    if not attrs:
+        return None
+    pattern, getter = "".join(pattern), attrgetter(*attrs)
+    return lambda value: pattern % getter(value)
+
+
+class UrlPattern:
+    """A reversed URL with one integer argument, split around that argument."""
+    def __init__(self, name):
+        url = reverse(name, args=[_URL_SENTINEL])
+        self.head, _, self.tail = url.partition(str(_URL_SENTINEL))
+
+    def __call__(self, pk):
+        return conditional_escape(f"{self.head}{pk}{self.tail}")
+
+
+class RowRenderer:
+    template_name = None
+
+    def __init__(self, context):
+        self.context = context
+        self.setup()
+
+    def setup(self):
+        """Per-page preparation (URL patterns, flags from the context)."""
+
+    def value(self, value):
+        """{{ value }}"""
+        kind = type(value)
+        if kind is str:  # not SafeString: that one goes through unescaped below
+            return html.escape(value)
+        if value is None:
+            return "None"
+        if kind is int and not settings.USE_THOUSAND_SEPARATOR:
+            return str(value)
+        return render_value_in_context(value, self.context)
+
+    def date(self, value, arg):
+        """{{ value|date:arg }}"""
+        value = template_localtime(value, self.context.use_tz)
+        fast = compile_format(arg)
+        if fast is not None and isinstance(value, date):
+            try:
+                return fast(value)
+            except AttributeError:  # e.g. "H" on a date: let the filter decide
+                pass
+        return conditional_escape(date_filter(value, arg))
+
+    def time(self, value, arg):
+        """{{ value|time:arg }}"""
+        value = template_localtime(value, self.context.use_tz)
+        fast = compile_format(arg)
+        if fast is not None and isinstance(value, (time, datetime)) and arg != "c":
+            try:
+                return fast(value)
+            except AttributeError:
+                pass
+        return conditional_escape(time_filter(value, arg))
+
+    def row(self, obj):
+        raise NotImplementedError
+
+    def render(self, objects):
+        return "".join(f"{ROW_PREFIX}{self.row(obj)}{ROW_SUFFIX}" for obj in objects)
+
+
+class BoatRowRenderer(RowRenderer):
+    template_name = "lists/boats/_row.html"
+
+    def setup(self):
+        self.update_url = UrlPattern("update")
+        self.selectable = bool(self.context.get("batch_actions"))
+
+    def row(self, obj):
+        v = self.value
+        pk, boat_type, name, berth, state = v(obj.id), v(obj.boatType), v(obj.name), v(obj.berth), v(obj.state)
+        select = (f'<td class="select-col"><input type="checkbox" class="js-select-row" value="{pk}" '
+                  f'aria-label="Select {name}"></td>') if self.selectable else ""
+        return (
+            f'\n<tr>\n'
+            f'  {select}\n'
+            f'  <td data-col-index="0">{boat_type}</td>\n'
+            f'  <td data-col-index="1">{name}</td>\n'
+            f'  <td data-col-index="2">{berth}</td>\n'
+            f'  <td data-col-index="3" class="state-{state}">{state}</td>\n'
+            f'  <td data-col-index="4">{v(obj.cid)}</td>\n'
+            f'  <td data-col-index="5">{v(obj.ecod)}</td>\n'
+            f'  <td data-col-index="6">\n'
+            f'    <a href="#" class="js-traffic"\n'
+            f'        data-boat-id="{pk}"\n'
+            f'        data-boat-type="{boat_type}"\n'
+            f'        data-boat-name="{name}"\n'
+            f'        data-berth="{berth}"\n'
+            f'        data-state="{state}"\n'
+            f'    >\n'
+            f'        Traffic\n'
+            f'    </a>\n'
+            f'    <a href="{self.update_url(obj.id)}">Edit</a>\n'
+            f'    <a href="#" class="js-boat-delete"\n'
+            f'        data-boat-id="{pk}"\n'
+            f'        data-boat-type="{boat_type}"\n'
+            f'        data-boat-name="{name}"\n'
+            f'        data-boat-berth="{berth}"\n'
+            f'    >\n'
+            f'        Delete\n'
+            f'    </a>\n'
+            f'  </td>\n'
+            f'</tr>\n'
+        )
+
+
+class PendingDeletionRowRenderer(RowRenderer):
+    template_name = "lists/pending_deletions_/_row.html"
+
+    def setup(self):
+        self.selectable = bool(self.context.get("batch_actions"))
+
+    def row(self, obj):
+        v = self.value
+        pk, name = v(obj.id), v(obj.name)
+        select = (f'<td class="select-col"><input type="checkbox" class="js-select-row" value="{pk}" '
+                  f'aria-label="Select {name}"></td>') if self.selectable else ""
+        return (
+            f'\n<tr data-pk="{pk}" data-deleted-at="{self.date(obj.deleted_at, "c")}" '
+            f'data-archive-at="{self.date(obj.archive_deadline, "c")}">\n'
+            f'  {select}\n'
+            f'  <td data-col-index="0">{v(obj.boatType)}</td>\n'
+            f'  <td data-col-index="1">{name}</td>\n'
+            f'  <td data-col-index="2">{v(obj.berth)}</td>\n'
+            f'    <td data-col-index="3" class="remaining-time">\n'
+            f'        <!-- JS will populate this on page load. Friendly placeholder: -->\n'
+            f'        --:--:--\n'
+            f'    </td>\n'
+            f'  <td data-col-index="4">\n'
+            f'    <a href="#" class="js-cancel-delete" data-pk="{pk}">Undo</a>\n'
+            f'  </td>\n'
+            f'</tr>\n'
+        )
+
+
+class TrafficRowRenderer(RowRenderer):
+    template_name = "lists/traffic/_row.html"
+
+    def setup(self):
+        self.update_url = UrlPattern("update")
+        self.delete_url = UrlPattern("delete")
+
+    def optional_date(self, value, arg):
+        # {% if value %}{{ value|date:arg }}{% else %}/{% endif %}, with the template's indentation
+        text = self.date(value, arg) if value else "/"
+        return f"\n        {text}\n    \n"
+
+    def row(self, obj):
+        v = self.value
+        return (
+            f'\n<tr>\n'
+            f'  <td data-col-index="0">{v(obj.boatType)}</td>\n'
+            f'  <td data-col-index="1">{v(obj.name)}</td>\n'
+            f'  <td data-col-index="2">\n'
+            f'    {self.optional_date(obj.trDate, "Y/m/d")}'
+            f'  </td>\n'
+            f'  <td data-col-index="3">{self.time(obj.trTime, "H:i")}</td>\n'
+            f'  <td data-col-index="4" class="direction-{v(obj.direction)}">{v(obj.direction)}</td>\n'
+            f'  <td data-col-index="5">{v(obj.passengers)}</td>\n'
+            f'  <td data-col-index="6">{v(obj.purpose)}</td>\n'
+            f'  <td data-col-index="7">\n'
+            f'    {self.optional_date(obj.edr, "Y/m/d")}'
+            f'  </td>\n'
+            f'  <td data-col-index="8">{self.time(obj.etr, "H:i")}</td>\n'
+            f'  <td data-col-index="9">{v(obj.trComments)}</td>\n'
+            f'  <td data-col-index="10">{v(obj.berth)}</td>\n'
+            f'  <td data-col-index="11">\n'
+            f'    <a href="{self.update_url(obj.id)}">Edit</a>\n'
+            f'    <a href="{self.delete_url(obj.id)}">Delete</a>\n'
+            f'  </td>\n'
+            f'  <td data-col-index="12">\n'
+            f'    {self.optional_date(obj.occurred_at, "Y/m/d H:i")}'
+            f'  </td>\n'
+            f'</tr>'
+        )
+
+
+RENDERERS = {
+    renderer.template_name: renderer
+    for renderer in (BoatRowRenderer, PendingDeletionRowRenderer, TrafficRowRenderer)
+}
+
+
+def renderer_for(template_name, context):
+    """The compiled renderer for a row partial, or None to use the template."""
+    renderer = RENDERERS.get(template_name)
+    if renderer is None or not context.autoescape:
+        return None
+    return renderer(context)
@@ -0,0 +1,221 @@
+# trafficApp/utils/search.py
+"""
+Search indexes for the list views, per backend.
+
+SQLite: each indexed model gets an external-content FTS5 table (the text
+lives in the model's own table, FTS only stores the index) kept in sync by
+AFTER INSERT/UPDATE/DELETE triggers, so ORM saves, queryset.update(),
+bulk_create() and raw SQL all stay searchable.
+
+PostgreSQL: a pg_trgm GIN index per indexed column, over
+trafficapp_search_text(column), overloaded per column type: upper() of
+text, the decimal digits of an integer, and dates, times and timestamps
+through to_char() with a fixed numeric pattern (timestamps in UTC). A plain
+::text cast of a date or timestamp depends on the session's DateStyle and
+TimeZone, so it can't be indexed; the fixed patterns don't, which is what
+makes declaring the functions IMMUTABLE true. They render what Django's
+icontains sees on its UTC connection. The search is the same substring
+match as icontains, written against that expression so every branch of the
+OR is an index scan. Postgres keeps the indexes up to date itself.
+
+The indexes are installed on post_migrate (see apps.py) and can be rebuilt
+with `manage.py rebuild_search_index`. On other backends, or when the index
+can't be created (SQLite without FTS5, no pg_trgm), filter_queryset()
+returns None and the caller keeps its icontains search.
+"""
+import re
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Func, Q, TextField
+from django.db.models.expressions import RawSQL
+
+# model label -> columns to index (db column names; equal to the field names here)
+INDEXED_COLUMNS = {
+    "trafficApp.TrafficEntry": (
+        "boatType", "name", "trDate", "trTime", "direction", "passengers",
+        "purpose", "edr", "etr", "trComments", "berth", "occurred_at",
+    ),
+    "trafficApp.Boat": ("name", "boatType", "berth", "state", "cid", "ecod"),
+}
+
+TOKEN_RE = re.compile(r"\w+")
+
+# (alias, fts table) -> bool, filled lazily by is_available()
+_available = {}
+
+# argument type -> body; varchar columns resolve to the text one
+SEARCH_TEXT_BODIES = {
+    "text": "upper($1)",
+    "integer": "$1::text",
+    "date": "to_char($1, 'YYYY-MM-DD')",
+    "time": "to_char($1, 'HH24:MI:SS')",
+    "timestamptz": "to_char($1 AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS') || '+00'",
+}
+SEARCH_TEXT_FUNCTIONS = [
+    f"CREATE OR REPLACE FUNCTION trafficapp_search_text({arg}) RETURNS text "
+    f"LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT {body} $$"
+    for arg, body in SEARCH_TEXT_BODIES.items()
+]
+# the first version: one upper($1::text) for every type, which wasn't immutable for dates
+# and timestamps; dropping it drops its indexes, so install() recreates them
+OLD_SEARCH_TEXT_FUNCTION = "trafficapp_search_text(anyelement)"
+
+
+class SearchText(Func):
+    """The indexed text of a column on PostgreSQL (see the module docstring)."""
+    function = "trafficapp_search_text"
+    output_field = TextField()
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def trigram_index(model, column):
+    return f"{model._meta.db_table}_{column}_trgm"
+
+
+def _trigger_sql(model, columns):
+    table = model._meta.db_table
+    fts = fts_table(model)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    new = ", ".join(f'new."{c}"' for c in columns)
+    old = ", ".join(f'old."{c}"' for c in columns)
+    insert = f'INSERT INTO "{fts}"(rowid, {cols}) VALUES (new.id, {new});'
+    delete = f'INSERT INTO "{fts}"("{fts}", rowid, {cols}) VALUES (\'delete\', old.id, {old});'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE ON "{table}" BEGIN {delete} {insert} END',
+    ]
+
+
+def _existing(cursor, names):
+    placeholders = ", ".join(["%s"] * len(names))
+    if cursor.db.vendor == "postgresql":
+        cursor.execute(f"SELECT indexname FROM pg_indexes WHERE indexname IN ({placeholders})", names)
+    else:
+        cursor.execute(f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})", names)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def install(model, using="default", rebuild=False):
+    """
+    Create the FTS table and triggers (SQLite) or the trigram indexes
+    (PostgreSQL) for `model` if any are missing.
+
+    Migrations that make SQLite rebuild the content table drop its triggers,
+    so this runs after every migrate; whenever something had to be (re)created
+    the index is rebuilt from the content table. Returns True if the index is
+    usable.
+    """
+    connection = connections[using]
+    _available.pop((using, fts_table(model)), None)
+    if connection.vendor == "postgresql":
+        return _install_trigram(model, using, rebuild)
+    if connection.vendor != "sqlite":
+        return False
+
+    columns = INDEXED_COLUMNS[model._meta.label]
+    fts = fts_table(model)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    try:
+        with connection.cursor() as cursor:
+            expected = [fts, f"{fts}_ai", f"{fts}_ad", f"{fts}_au"]
+            missing = set(expected) - _existing(cursor, expected)
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5({cols}, '
+                f"content='{model._meta.db_table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            for sql in _trigger_sql(model, columns):
+                cursor.execute(sql)
+            if missing or rebuild:
+                cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+    except DatabaseError:
+        # e.g. SQLite compiled without FTS5: keep using icontains
+        return False
+    return True
+
+
+def _install_trigram(model, using, rebuild):
+    table = model._meta.db_table
+    try:
+        # a savepoint, so a failure leaves an enclosing transaction usable
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(f"DROP FUNCTION IF EXISTS {OLD_SEARCH_TEXT_FUNCTION} CASCADE")
+            for sql in SEARCH_TEXT_FUNCTIONS:
+                cursor.execute(sql)
+            for column in INDEXED_COLUMNS[model._meta.label]:
+                name = trigram_index(model, column)
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+                    f'USING gin (trafficapp_search_text("{column}") gin_trgm_ops)'
+                )
+                if rebuild:
+                    cursor.execute(f'REINDEX INDEX "{name}"')
+    except DatabaseError:
+        # e.g. pg_trgm not installed on the server, or no right to create it
+        return False
+    return True
+
+
+def is_available(model, using="default"):
+    key = (using, fts_table(model))
+    if key not in _available:
+        connection = connections[using]
+        ok = connection.vendor in ("sqlite", "postgresql") and model._meta.label in INDEXED_COLUMNS
+        if ok and connection.vendor == "postgresql":
+            names = [trigram_index(model, column) for column in INDEXED_COLUMNS[model._meta.label]]
+            with connection.cursor() as cursor:
+                ok = len(_existing(cursor, names)) == len(names)
+        elif ok:
+            with connection.cursor() as cursor:
+                ok = bool(_existing(cursor, [fts_table(model)]))
+        _available[key] = ok
+    return _available[key]
+
+
+def match_expression(fields, text):
+    """
+    FTS5 MATCH string for `text` restricted to `fields`: the words as one
+    phrase, the last word as a prefix ("alp" finds ALPHA, "2025/07" finds
+    2025-07-14). Returns None if the text has no searchable words.
+    """
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return "{%s} : \"%s\"*" % (" ".join(fields), " ".join(tokens))
+
+
+def filter_queryset(qs, fields, text):
+    """
+    Restrict qs to rows whose `fields` match `text` through the search
+    index. Returns None when the index can't answer the query, so the caller
+    can fall back to icontains.
+    """
+    model = qs.model
+    indexed = INDEXED_COLUMNS.get(model._meta.label, ())
+    if not set(fields) <= set(indexed) or not is_available(model, qs.db):
+        return None
+    if connections[qs.db].vendor == "postgresql":
+        # a needle under three characters has no trigram to look up, so the
+        # index would be read end to end, slower than the plain scan
+        if len(text.strip()) < 3:
+            return None
+        return trigram_filter(qs, fields, text)
+    match = match_expression(fields, text)
+    if match is None:
+        return None
+    fts = fts_table(model)
+    return qs.filter(pk__in=RawSQL(f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [match]))
+
+
+def trigram_filter(qs, fields, text):
+    """icontains over `fields`, on the expressions the trigram indexes cover."""
+    needle = text.upper()
+    match = Q()
+    for field in fields:
+        match |= Q(**{f"_search_{field}__contains": needle})
+    return qs.alias(**{f"_search_{field}": SearchText(field) for field in fields}).filter(match)
@@ -0,0 +1,118 @@
+# trafficApp/utils/tiering.py
+"""
+Hot / cold tiering of the boat registry and the traffic log.
+
+The day-to-day pages (lists, search, typeahead, pending deletions) only read
+Boat and TrafficEntry. `manage.py move_to_cold` keeps those tables to what
+is still in use by moving out
+
+* traffic entries from before the horizon, local midnight TIERING_HOT_DAYS
+  ago (occurred_at, or trDate for untimed entries), into ColdTrafficEntry;
+* archived boats that no hot entry refers to any more into ColdBoat.
+
+The cold tables are in the same database, so a chunk is one write
+(writes.run): insert the rows verbatim (ids and timestamps kept,
+dbcopy.insert_raw), delete them from the hot table (dbcopy.delete_raw) and
+take them out of the daily summary. A row is always in exactly one tier; an interrupted move is
+resumed by running it again, which selects whatever is still due. Entries
+without any date stay hot.
+
+Ids are never reused (AUTOINCREMENT / sequences), so an id names the same
+row in either tier and ColdTrafficEntry.trafficBoatId can point into both.
+The history view and the admin read both tiers; occupancy and reports
+replay the log from both (occupancy.log()).
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Boat, ColdBoat, ColdTrafficEntry, DailyTrafficSummary, TrafficEntry
+from . import listcache, live, writes
+from .dbcopy import delete_raw, insert_raw
+
+
+@dataclass
+class MoveReport:
+    horizon: datetime
+    traffic: int = 0        # entries moved to ColdTrafficEntry
+    boats: int = 0          # boats moved to ColdBoat
+
+
+def hot_days():
+    return getattr(settings, "TIERING_HOT_DAYS", 730)
+
+
+def horizon(days=None, now=None):
+    """Local midnight `days` (default TIERING_HOT_DAYS) before today: older traffic is cold."""
+    day = timezone.localdate(now) - timedelta(days=hot_days() if days is None else days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def due_traffic(cutoff):
+    """Hot entries from before `cutoff`, by occurred_at or, without one, by trDate."""
+    return TrafficEntry.objects.filter(
+        Q(occurred_at__lt=cutoff) | Q(occurred_at__isnull=True, trDate__lt=timezone.localdate(cutoff))
+    )
+
+
+def due_boats():
+    """Archived boats that no hot traffic entry refers to."""
+    return Boat.all_objects.filter(archived=True).filter(
+        ~Exists(TrafficEntry.objects.filter(trafficBoatId=OuterRef("pk")))
+    )
+
+
+def cold_copy(row, cold_model, moved_at):
+    """`row` as an unsaved `cold_model` instance: same id, same values, foreign keys as plain ids."""
+    hot = type(row)._meta
+    values = {
+        field.attname: getattr(row, hot.get_field(field.name).attname)
+        for field in cold_model._meta.concrete_fields if field.name != "moved_at"
+    }
+    return cold_model(moved_at=moved_at, **values)
+
+
+def move(*, days=None, chunk_size=None, now=None, progress=None):
+    """Move everything that is due to the cold tables; returns a MoveReport."""
+    now = now or timezone.now()
+    chunk_size = chunk_size or getattr(settings, "TIERING_CHUNK_SIZE", 2000)
+    report = MoveReport(horizon(days, now))
+    # traffic first: boats become due once their last hot entry has moved
+    while moved := writes.run(_move_traffic, report.horizon, chunk_size, now):
+        report.traffic += moved
+        if progress:
+            progress("traffic", report.traffic)
+    while moved := writes.run(_move_boats, chunk_size, now):
+        report.boats += moved
+        if progress:
+            progress("boats", report.boats)
+    if report.traffic:
+        # one refresh for the open traffic lists, not one per chunk
+        live.publish("traffic", "archived", count=report.traffic)
+    return report
+
+
+def _move_traffic(cutoff, chunk_size, now):
+    rows = list(due_traffic(cutoff).order_by("pk")[:chunk_size])
+    if not rows:
+        return 0
+    insert_raw(ColdTrafficEntry, [cold_copy(row, ColdTrafficEntry, now) for row in rows])
+    # no signals: the summary is adjusted below in one upsert, and the
+    # occupancy snapshots stay valid (the log still holds the rows)
+    delete_raw(TrafficEntry, [row.pk for row in rows])
+    DailyTrafficSummary.apply_many([row.summary_contribution() for row in rows], sign=-1)
+    listcache.bump(TrafficEntry)
+    return len(rows)
+
+
+def _move_boats(chunk_size, now):
+    rows = list(due_boats().order_by("pk")[:chunk_size])
+    if not rows:
+        return 0
+    insert_raw(ColdBoat, [cold_copy(row, ColdBoat, now) for row in rows])
+    delete_raw(Boat, [row.pk for row in rows])
+    listcache.bump(Boat)
+    return len(rows)
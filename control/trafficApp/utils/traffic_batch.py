@@ -0,0 +1,69 @@
+# trafficApp/utils/traffic_batch.py
+"""
+One movement for many boats at once: a regatta leaving, a charter fleet
+coming back, tenders going out together.
+
+record() takes boat pks and the fields they share (BatchTrafficForm: date,
+time, direction, purpose) and, in one coordinated write, locks the boats,
+inserts an entry per boat with ONE bulk_create (type, name and berth copied
+from the boat, occurred_at set as TrafficEntry.save() sets it), moves the
+boats to the new state with ONE UPDATE, and does once for the batch what the
+post_save receivers do per entry: daily summary, occupancy snapshots, list
+cache and live events. It reports an outcome per id:
+
+    done       - the entry was recorded
+    deleted    - the boat is pending deletion or archived
+    not_found  - no such boat
+"""
+from ..models import Boat, DailyTrafficSummary, TrafficEntry
+from . import listcache, live, occupancy, writes
+
+# per request. The boat lookup and the state UPDATE take one parameter per id,
+# under SQLite's 999; bulk_create splits the inserts itself (999 // 14 columns
+# = 71 rows per INSERT on SQLite, so 8 INSERTs for a full batch).
+MAX_IDS = 500
+
+DONE = "done"
+DELETED = "deleted"
+NOT_FOUND = "not_found"
+
+
+def record(pks, **shared):
+    """Record the movement `shared` for every boat in `pks`; returns ({pk: outcome} in input order, entries)."""
+    pks = list(dict.fromkeys(pks))  # de-duplicate, keep order
+    return writes.run(_record, pks, shared)
+
+
+def _record(pks, shared):
+    boats = {boat.pk: boat for boat in Boat.all_objects.select_for_update().filter(pk__in=pks)
+             .only("id", "boatType", "name", "berth", "deleted", "archived")}
+    outcomes = {}
+    entries = []
+    for pk in pks:
+        boat = boats.get(pk)
+        if boat is None:
+            outcomes[pk] = NOT_FOUND
+        elif boat.deleted or boat.archived:
+            outcomes[pk] = DELETED
+        else:
+            outcomes[pk] = DONE
+            entry = TrafficEntry(boatType=boat.boatType, name=boat.name, berth=boat.berth,
+                                 trafficBoatId_id=pk, **shared)
+            # what TrafficEntry.save() does; bulk_create does not call it
+            entry.occurred_at = entry.timed_at()
+            entries.append(entry)
+    if not entries:
+        return outcomes, entries
+
+    TrafficEntry.objects.bulk_create(entries)
+    done = [entry.trafficBoatId_id for entry in entries]
+    direction = shared["direction"]
+    Boat.all_objects.filter(pk__in=done).update(state=direction)
+    # bulk_create skips signals: the same bookkeeping, once for the batch
+    DailyTrafficSummary.apply_many(entry.summary_contribution() for entry in entries)
+    occupancy.invalidate(*(entry.movement() for entry in entries))
+    listcache.bump(TrafficEntry, Boat)
+    day = entries[0].day
+    live.publish("traffic", "created", pks=[entry.pk for entry in entries], day=day.isoformat() if day else None,
+                 boats=done, state=direction)
+    return outcomes, entries
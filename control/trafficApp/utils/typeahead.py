@@ -0,0 +1,117 @@
+# trafficApp/utils/typeahead.py
+"""
+In-process prefix index of the visible boats, for the typeahead endpoint.
+
+Every boat is filed under its name, each later word of its name and its
+berth, upper-cased, in one sorted list; a lookup is two bisects for the
+prefix range plus a rank of what falls in it, without touching the
+database. The boat registry is small (thousands of rows), so the whole
+index is rebuilt rather than patched.
+
+The index is rebuilt lazily, on the first lookup after a change:
+
+* Boat saves and deletes in this process bump a generation counter
+  (signals.py), once their transaction commits;
+* every write path that changes boats also bumps Boat's list cache version
+  (utils/listcache.py, a CacheVersion row written in the same transaction),
+  so that version is part of the index version too; it covers queryset
+  updates (soft delete, batch actions, the sweeper, state changes) and
+  writes made by other processes, with or without live events, for the
+  price of one primary-key query per lookup.
+"""
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from ..models import Boat
+from . import listcache
+
+# match ranks, best first
+EXACT, NAME, WORD, BERTH = range(4)
+
+_generation = 0
+_lock = threading.Lock()
+_index = None
+
+
+@dataclass(frozen=True)
+class BoatMatch:
+    id: int
+    name: str
+    berth: str
+    boatType: str
+    state: str
+
+
+class PrefixIndex:
+    def __init__(self, boats):
+        self.boats = {}
+        entries = []
+        for boat in boats:
+            self.boats[boat.id] = boat
+            name, berth = boat.name.upper(), boat.berth.upper()
+            entries.append((name, NAME, boat.id))
+            for word in name.split()[1:]:
+                entries.append((word, WORD, boat.id))
+            if berth:
+                entries.append((berth, BERTH, boat.id))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [(rank, pk) for _, rank, pk in entries]
+
+    def __len__(self):
+        return len(self.boats)
+
+    def search(self, text, limit):
+        """The best `limit` boats whose name, a word of it or berth starts with `text`."""
+        prefix = " ".join(text.upper().split())
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "￿", lo)
+        best = {}
+        for key, (rank, pk) in zip(self.keys[lo:hi], self.entries[lo:hi]):
+            if key == prefix and rank != BERTH:
+                rank = EXACT
+            if rank < best.get(pk, BERTH + 1):
+                best[pk] = rank
+        ranked = sorted(best.items(), key=lambda item: (item[1], self.boats[item[0]].name, item[0]))
+        return [self.boats[pk] for pk, _ in ranked[:limit]]
+
+
+def _version():
+    return _generation, listcache.versions(Boat)[0]
+
+
+def _build():
+    rows = Boat.objects.visible().values_list("id", "name", "berth", "boatType", "state")
+    return PrefixIndex(BoatMatch(*row) for row in rows)
+
+
+def get_index():
+    """The current index, rebuilt first if boats changed since it was built."""
+    global _index
+    version = _version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            index = _build()
+            index.version = version
+            _index = index
+        return _index
+
+
+def invalidate():
+    """Rebuild on the next lookup (after the current transaction commits, if any)."""
+    def bump():
+        global _generation
+        _generation += 1
+    transaction.on_commit(bump)
+
+
+def search_boats(text, limit):
+    return get_index().search(text, limit)
@@ -0,0 +1,128 @@
+# trafficApp/utils/writes.py
+"""
+Write coordination for SQLite.
+
+SQLite allows one writer at a time. Connection setup (settings.DATABASES)
+already puts the database in WAL mode, sets a busy timeout and starts every
+transaction with BEGIN IMMEDIATE. On top of that, this module:
+
+* serializes writes inside the process, so threads queue on a lock instead of
+  colliding on the database file (the lock is not held while backing off, so
+  other threads' writes go ahead in the meantime);
+* retries a write that still hits "database is locked" / "busy" (another
+  process held the lock for longer than the busy timeout), with exponential
+  backoff and full jitter — the one retry policy for the whole app;
+* counts writes, lock waits and retries (see stats()).
+
+Usage:
+
+    writes.run(form.save)              # runs form.save() in a transaction
+    await writes.arun(form.save)       # from an async view
+
+Inside an enclosing transaction (e.g. a write calling another write) the
+function simply runs once: a retry can't restart the outer transaction.
+On PostgreSQL (row-level locks, many writers) the process lock is skipped;
+the retry policy still applies, to deadlocks and serialization failures.
+"""
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.02   # seconds; doubles each attempt
+MAX_DELAY = 0.5
+
+_writer = threading.RLock()
+_stats_lock = threading.Lock()
+_stats = {
+    "writes": 0,             # write transactions committed
+    "lock_waits": 0,         # times a thread had to queue for the writer lock
+    "lock_wait_seconds": 0.0,
+    "retries": 0,            # attempts repeated after a locked/busy error
+    "failures": 0,           # writes that gave up after MAX_ATTEMPTS
+}
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, delta in deltas.items():
+            _stats[key] += delta
+
+
+def stats():
+    """A copy of the counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = type(_stats[key])()
+
+
+LOCK_ERRORS = (
+    "locked", "busy",                                  # SQLite
+    "deadlock detected", "could not serialize access",  # PostgreSQL
+)
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return any(text in message for text in LOCK_ERRORS)
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff for the given (1-based) attempt."""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def _acquire(lock):
+    if lock.acquire(blocking=False):
+        return
+    started = time.monotonic()
+    lock.acquire()
+    _count(lock_waits=1, lock_wait_seconds=time.monotonic() - started)
+
+
+def run(fn, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Call fn(*args, **kwargs) in a transaction as a coordinated write."""
+    connection = connections[using]
+    if connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            return fn(*args, **kwargs)
+
+    serialize = connection.vendor == "sqlite"
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if serialize:
+            _acquire(_writer)
+        try:
+            with transaction.atomic(using=using):
+                result = fn(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_lock_error(exc):
+                raise
+            if attempt == MAX_ATTEMPTS:
+                _count(failures=1)
+                raise
+            _count(retries=1)
+        else:
+            _count(writes=1)
+            return result
+        finally:
+            if serialize:
+                _writer.release()
+        # back off without the lock, so other threads' writes aren't held up
+        time.sleep(backoff(attempt))
+
+
+async def arun(fn, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    run() for async views. Django has no async transactions, so the write
+    runs in the request's sync thread; the event loop is free meanwhile.
+    """
+    return await sync_to_async(run)(fn, *args, using=using, **kwargs)
+
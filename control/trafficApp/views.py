@@ -1,22 +1,40 @@
 from django.shortcuts import render, redirect
-from .models import Boat, TrafficEntry
-from .forms import NewBoatForm, NewTrafficForm
-from .utils.paginators import DayPaginator
+from .models import Boat, ColdBoat, ColdTrafficEntry, TrafficEntry, DailyTrafficSummary, ImportJob, State
+from .forms import (NewBoatForm, NewTrafficForm, BatchTrafficForm, ImportForm, OccupancyForm, OccupancyReportForm,
+                    HistoryForm)
+from .utils.paginators import DayPaginator, KeysetPaginator
+from .utils import search
+from .utils.export import iter_csv, iter_xlsx
+from .utils import importer
+from .utils import boat_batch
+from .utils import traffic_batch
+from .utils import writes
+from .utils import perf
+from .utils import live
+from .utils import occupancy
+from .utils import reports
+from .utils import typeahead
+from .utils import listcache
 # from .filters import EntryFilter
-from django.db.models import Q, F
+from django.conf import settings
+from django.db.models import Q, F, Value
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView
 from django.views.generic.edit import FormMixin
-from django.http import JsonResponse, HttpResponseBadRequest
-from django.db import transaction
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator, InvalidPage
 from django.db.models.expressions import OrderBy
 from django.utils.functional import cached_property
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 from django.views.decorators.http import require_POST
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from asgiref.sync import sync_to_async
 from django.utils import timezone
-from django.db.utils import OperationalError
+from django.utils.cache import patch_vary_headers
+from django.db.models.query import QuerySet
+import orjson
 
 
 
@@ -39,6 +57,7 @@ SORT_MAP = {
 }
 
 MAX_PER = 500  # protect DB and template; tune for your infra
+TYPEAHEAD_RECENT_BOATS = 3  # typeahead: recent movements of this many best matches
 
 class BaseListCreateView(FormMixin, ListView):
     """
@@ -54,6 +73,15 @@ class BaseListCreateView(FormMixin, ListView):
     page_title    = ''
     row_partial   = ''
     form_partial  = ''
+    batch_actions = ()      # [{'label':..., 'url': reverse_lazy(...), 'confirm':...}]; adds row checkboxes
+
+    # Fragments: the same URL answers an htmx request (HX-Request header) with
+    # just fragment_template, and a client preferring application/json with
+    # {"columns": fragment_fields, "rows": [[...]], "pager": {...}}
+    fragment_template = "lists/_table.html"
+    fragment_fields   = ()
+    live_list     = ''      # which live events patch this list (static/js/liveUpdates.js)
+    cache_models  = ()      # GET results are cached until one of these changes (utils/listcache.py)
 
     def get_success_url(self):
         return self.success_url or self.request.path
@@ -69,11 +97,87 @@ class BaseListCreateView(FormMixin, ListView):
         ctx = self.get_context_data(form=form)
         return self.render_to_response(ctx)
 
-    # ---- GET: list + empty form ----
+    # ---- GET: list + empty form, or just the list fragment ----
     def get(self, request, *args, **kwargs):
-        self.object_list = self.get_queryset()
-        form = self.get_form()
-        return self.render_to_response(self.get_context_data(form=form))
+        self.object_list = self.get_object_list()
+        return self.list_response()
+
+    def list_response(self):
+        fragment = self.fragment_format()
+        if fragment:
+            response = self.render_fragment(fragment, self.get_context_data(form=None))
+        else:
+            response = self.render_to_response(self.get_context_data(form=self.get_form()))
+        patch_vary_headers(response, ("Accept", "HX-Request"))
+        return response
+
+    def get_object_list(self):
+        """The rows to list: get_queryset(), fetched once per change of cache_models."""
+        qs = self.get_queryset()
+        if not self.cache_models:
+            return qs
+        return listcache.fetch(type(self).__name__, self.cache_params(), self.cache_models, lambda: list(qs))
+
+    async def aget_object_list(self):
+        """get_object_list() with the async ORM (AsyncListMixin)."""
+        # built in the sync thread: the first search checks for the FTS table
+        qs = await sync_to_async(self.get_queryset)()
+
+        async def fetch():
+            return [obj async for obj in qs]
+        if not self.cache_models:
+            return await fetch()
+        return await listcache.afetch(type(self).__name__, self.cache_params(), self.cache_models, fetch)
+
+    def cache_params(self):
+        # the GET parameters the cached result depends on, normalized
+        return {"q": self.request.GET.get("q", "").strip()}
+
+    def fragment_format(self):
+        headers = self.request.headers
+        # a history-restore request (back button, cache miss) needs the full page
+        if headers.get("HX-Request") and not headers.get("HX-History-Restore-Request"):
+            return "html"
+        if self.request.get_preferred_type(["text/html", "application/json"]) == "application/json":
+            return "json"
+        return None
+
+    def render_fragment(self, fragment, ctx):
+        if fragment == "json":
+            payload = {
+                "columns": list(self.fragment_fields),
+                "rows": self.fragment_rows(ctx["object_list"]),
+                "pager": self.fragment_pager(ctx),
+            }
+            return HttpResponse(orjson.dumps(payload), content_type="application/json")
+        return self.response_class(
+            request=self.request,
+            template=[self.fragment_template],
+            context=ctx,
+            using=self.template_engine,
+        )
+
+    def fragment_rows(self, object_list):
+        fields = self.fragment_fields
+        attnames = {f.name: f.attname for f in self.model._meta.concrete_fields}
+        if isinstance(object_list, QuerySet) and set(fields) <= attnames.keys():
+            # no model instances needed
+            return [list(row) for row in object_list.values_list(*fields)]
+        # FKs as their pk, like values_list
+        attrs = [attnames.get(f, f) for f in fields]
+        return [[getattr(obj, attr) for attr in attrs] for obj in object_list]
+
+    def fragment_pager(self, ctx):
+        page_obj = ctx.get("page_obj")
+        if page_obj is None:
+            return {}
+        return {
+            "page": page_obj.number,
+            "num_pages": page_obj.paginator.num_pages,
+            "count": page_obj.paginator.count,
+            "has_previous": page_obj.has_previous(),
+            "has_next": page_obj.has_next(),
+        }
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -99,10 +203,14 @@ class BaseListCreateView(FormMixin, ListView):
         qs = super().get_queryset()
         q  = self.request.GET.get("q", "").strip()
         if q and self.search_fields:
-            or_query = Q()
-            for field in self.search_fields:
-                or_query |= Q(**{f"{field}__icontains": q})
-            qs = qs.filter(or_query)
+            # FTS5 index when available, otherwise icontains over every field
+            searched = search.filter_queryset(qs, self.search_fields, q)
+            if searched is None:
+                or_query = Q()
+                for field in self.search_fields:
+                    or_query |= Q(**{f"{field}__icontains": q})
+                searched = qs.filter(or_query)
+            qs = searched
         return qs  # no order_by here; sorting is JS-only
 
     def get_context_data(self, **kwargs):
@@ -115,6 +223,8 @@ class BaseListCreateView(FormMixin, ListView):
             "form_partial": self.form_partial,
             "traffic_form": NewTrafficForm(),
             "show_traffic_controls": getattr(self, "show_traffic_controls", False),
+            "batch_actions": self.batch_actions,
+            "live_list":   self.live_list if live.enabled() else '',
         })
         return ctx
 
@@ -137,13 +247,38 @@ class BoatListView(BaseListCreateView):
         {"field": "actions",  "label": "Actions"},
     ]
     row_partial  = "lists/boats/_row.html"
+    live_list    = "boats"
+    cache_models = (Boat,)
+    fragment_fields = ("id", "boatType", "name", "berth", "state", "cid", "ecod")
     form_partial = "lists/boats/_form_fields.html"
 
+    batch_actions = [
+        # "dialog": the shared fields are asked for first (lists/boats/_batch_traffic_dialog.html)
+        {"label": "Record movement", "url": reverse_lazy("traffic-batch-create"),
+         "dialog": "batchTrafficDialog", "style": "primary"},
+        {"label": "Delete selected", "url": reverse_lazy("boat-batch-soft-delete"),
+         "confirm": "Delete the selected boats?"},
+    ]
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["batch_traffic_form"] = BatchTrafficForm(auto_id="id_batch_%s")
+        return ctx
+
     def get_queryset(self):
         # Start from BaseListCreateView.get_queryset (this applies q-search)
         qs = super().get_queryset()
         # Only show not-deleted and not-archived boats
-        return Boat.objects.visible()
+        return qs.visible()
+
+def _update_boat(pk, event, qs, **changes):
+    # qs.update() plus its live event, in one transaction (run via writes.run)
+    updated = qs.update(**changes)
+    if updated:
+        listcache.bump(Boat)
+        live.publish("boat", event, pks=[pk])
+    return updated
+
 
 @require_POST
 def boat_soft_delete(request, pk):
@@ -161,24 +296,15 @@ def boat_soft_delete(request, pk):
     if boat.deleted:
         return JsonResponse({"ok": False, "error": "already_deleted"}, status=400)
 
-    now = timezone.now()
-    # Retry loop to be resilient to transient "database is locked" on SQLite
-    for attempt in range(1, 4):
-        try:
-            with transaction.atomic():
-                Boat.objects.filter(pk=pk, deleted=False).update(
-                    deleted=True,
-                    deleted_at=now,
-                    # deleted_by_id = request.user.pk if you track deleter and field exists
-                )
-            return JsonResponse({"ok": True, "id": pk})
-        except OperationalError as exc:
-            if 'locked' in str(exc).lower() and attempt < 3:
-                import time
-                time.sleep(0.05 * attempt)
-                continue
-            raise
-    return None
+    # one coordinated write: queued behind other writers, retried if locked
+    writes.run(
+        _update_boat, pk, "deleted",
+        Boat.objects.filter(pk=pk, deleted=False),
+        deleted=True,
+        deleted_at=timezone.now(),
+        # deleted_by_id = request.user.pk if you track deleter and field exists
+    )
+    return JsonResponse({"ok": True, "id": pk})
 
 
 class TrafficCreateView(CreateView):
@@ -192,32 +318,42 @@ class TrafficCreateView(CreateView):
         return super().form_invalid(form)
 
     def form_valid(self, form):
-        # Save traffic entry and update the referenced boat (by PK).
-        with transaction.atomic():
-            obj = form.save()
-
-            # Get submitted boat_id (hidden input). It's optional — check safely.
-            boat_id = self.request.POST.get('boat_id')
-            updated = 0
-            if boat_id:
-                try:
-                    boat_pk = int(boat_id)
-                except (ValueError, TypeError):
-                    boat_pk = None
-                if boat_pk is not None:
-                    # update by PK — efficient single UPDATE query
-                    TrafficEntry.objects.filter(pk=obj.pk).update(trafficBoatId_id=boat_pk)
-                    if obj.direction == 'arrival':
-                        obj.direction = 'in'
-                    elif obj.direction == 'departure':
-                        obj.direction = 'out'
-                    updated = Boat.objects.filter(pk=boat_pk).update(state=obj.direction)
+        obj, updated = writes.run(self.save_entry, form)
 
         # Return JSON for AJAX as before
         if self.request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return JsonResponse({"ok": True, "id": obj.id, "boat_updated": bool(updated)})
         return super().form_valid(form)
 
+    def save_entry(self, form):
+        # Save traffic entry and update the referenced boat (by PK).
+        # Runs inside writes.run(), i.e. one transaction.
+        obj = form.instance
+
+        # Get submitted boat_id (hidden input). It's optional — check safely.
+        boat_id = self.request.POST.get('boat_id')
+        updated = 0
+        if boat_id:
+            try:
+                boat_pk = int(boat_id)
+            except (ValueError, TypeError):
+                boat_pk = None
+            if boat_pk is not None:
+                if obj.direction == 'arrival':
+                    obj.direction = 'in'
+                elif obj.direction == 'departure':
+                    obj.direction = 'out'
+                # update by PK — efficient single UPDATE query; it also tells us the boat exists
+                updated = Boat.objects.filter(pk=boat_pk).update(state=obj.direction)
+                if updated:
+                    # the link goes in with the INSERT below; the post_save
+                    # receivers bump the boat list and announce the new state
+                    # along with the entry
+                    obj.trafficBoatId_id = boat_pk
+                    obj.moved_boats = [boat_pk]
+        obj = form.save()
+        return obj, updated
+
 
 
 # -- keep SORT_MAP, MAX_PER as you have --
@@ -238,12 +374,15 @@ class TrafficListView(BaseListCreateView):
     # ---- Controls from GET ----
     @cached_property
     def mode(self):
+        # day    -> one calendar day per page
+        # per    -> numbered pages (COUNT + OFFSET)
+        # cursor -> keyset pages (next/prev only, constant cost at any depth)
         m = (self.request.GET.get("mode") or "day").lower()
-        return "day" if m == "day" else "per"
+        return m if m in ("day", "cursor") else "per"
 
     @cached_property
     def per(self):
-        if self.mode != "per":
+        if self.mode == "day":
             return None
         try:
             n = int(self.request.GET.get("per", 10))
@@ -265,10 +404,11 @@ class TrafficListView(BaseListCreateView):
         qs = super().get_queryset()  # keeps your search filter
         field = SORT_MAP[self.sort_key]
         if self.sort_dir == "asc":
-            ordering = [F(field).asc(nulls_last=True)]
+            ordering = [F(field).asc(nulls_last=True), "id"]
         else:
-            ordering = [F(field).desc(nulls_last=True)]
-        ordering.append("id")  # stable tiebreaker
+            ordering = [F(field).desc(nulls_last=True), "-id"]
+        # stable tiebreaker, same direction as the key so the (field, id)
+        # index serves the whole ORDER BY (see TrafficEntry.Meta.indexes)
         return qs.order_by(*ordering)
 
 
@@ -289,6 +429,11 @@ class TrafficListView(BaseListCreateView):
     ]
     row_partial  = "lists/traffic/_row.html"
     form_partial = "lists/traffic/_form_fields.html"
+    fragment_template = "lists/traffic/_fragment.html"
+    live_list    = "traffic"
+    cache_models = (TrafficEntry,)   # the daily summary only changes with it
+    fragment_fields = ("id", "boatType", "name", "trDate", "trTime", "direction", "passengers",
+                       "purpose", "edr", "etr", "trComments", "berth", "occurred_at", "trafficBoatId")
 
 
     def get_context_data(self, **kwargs):
@@ -299,18 +444,66 @@ class TrafficListView(BaseListCreateView):
             "sort": self.sort_key,
             "dir":  self.sort_dir,
         })
+        page = getattr(self, "page_context", None)  # fetched ahead by AsyncTrafficListView
+        ctx.update(page if page is not None else self.cached_page(ctx["object_list"]))
+        return ctx
 
+    def get_object_list(self):
+        # only the current page is fetched (and cached, see cached_page)
+        return self.get_queryset()
+
+    def cache_params(self):
+        params = super().cache_params()
+        params.update(mode=self.mode, per=self.per, sort=self.sort_key, dir=self.sort_dir)
+        for name in ("day", "page", "cursor"):
+            params[name] = self.request.GET.get(name) or ""
+        return params
+
+    def cached_page(self, qs):
+        """paginate_traffic() with its page frozen, through the list cache."""
+        return listcache.fetch(type(self).__name__, self.cache_params(), self.cache_models,
+                               lambda: self.frozen_page(qs))
+
+    def frozen_page(self, qs):
+        pagination = self.paginate_traffic(qs)
+        page_obj = listcache.freeze_page(pagination["page_obj"])
+        return {**pagination, "page_obj": page_obj, "paginator": page_obj.paginator,
+                "object_list": page_obj.object_list}
+
+    def fragment_pager(self, ctx):
+        page_obj = ctx["page_obj"]
+        pager = {
+            "mode": self.mode,
+            "per": self.per,
+            "sort": self.sort_key,
+            "dir": self.sort_dir,
+            "has_previous": page_obj.has_previous(),
+            "has_next": page_obj.has_next(),
+        }
+        if self.mode == "cursor":
+            pager.update(previous_cursor=page_obj.previous_cursor, next_cursor=page_obj.next_cursor)
+        else:
+            pager.update(page=page_obj.number, num_pages=ctx["paginator"].num_pages)
+        if self.mode == "day":
+            pager.update(day=ctx["group_day"], empty=ctx["empty_day"],
+                         min_day=ctx["min_day"] or None, max_day=ctx["max_day"] or None)
+        return pager
+
+    def paginate_traffic(self, qs):
+        """
+        Select the current day / page / cursor page of the (searched, sorted)
+        queryset. Returns the pagination context, including the page's
+        object_list; shared by the list page and the export.
+        """
         # pagination
         if self.mode == "day":
-            qs = ctx["object_list"]
-            paginator = DayPaginator(qs, include_empty_days=True)
+            # Unfiltered list: bounds and "No traffic" come from the per-day summary
+            q = self.request.GET.get("q", "").strip()
+            summaries = None if q else DailyTrafficSummary.objects.all()
+            paginator = DayPaginator(qs, summaries=summaries)
 
             # Min/max for the date picker
-            if paginator.days:
-                max_day = paginator.days[0]  # newest first in our DayPaginator
-                min_day = paginator.days[-1]  # oldest
-            else:
-                max_day = min_day = None
+            max_day, min_day = paginator.max_day, paginator.min_day
 
             # If a specific day is requested, compute its page index
             requested_day_str = self.request.GET.get("day")
@@ -320,17 +513,8 @@ class TrafficListView(BaseListCreateView):
                 except ValueError:
                     requested_day = None
                 # If within range, jump there; otherwise clamp to range
-                if requested_day and paginator.days:
-                    if requested_day > max_day:
-                        page_number = 1
-                    elif requested_day < min_day:
-                        page_number = paginator.num_pages
-                    else:
-                        try:
-                            page_number = paginator.days.index(requested_day) + 1
-                        except ValueError:
-                            # Shouldn't happen with include_empty_days=True, but guard anyway
-                            page_number = 1
+                if requested_day:
+                    page_number = paginator.page_for_day(requested_day)
                 else:
                     page_number = 1
             else:
@@ -339,33 +523,107 @@ class TrafficListView(BaseListCreateView):
                 page_obj = paginator.page(page_number)
             except InvalidPage:
                 page_obj = paginator.page(1)
-            ctx.update({
+            return {
                 "is_paginated": True,
                 "paginator": paginator,
                 "page_obj": page_obj,
                 "object_list": page_obj.object_list,
                 "group_day": page_obj.day,
-                "empty_day": not page_obj.object_list.exists(),
+                "empty_day": (page_obj.summary is None if summaries is not None
+                              else not page_obj.object_list.exists()),
                 # expose bounds for the date picker
                 "min_day": min_day.isoformat() if min_day else "",
                 "max_day": max_day.isoformat() if max_day else "",
-            })
+            }
+        elif self.mode == "cursor":
+            paginator = KeysetPaginator(qs, per=self.per or 10,
+                                        field=SORT_MAP[self.sort_key],
+                                        direction=self.sort_dir)
+            page_obj = paginator.page(self.request.GET.get("cursor"))
+            return {
+                "is_paginated": True,
+                "paginator": paginator,
+                "page_obj": page_obj,
+                "object_list": page_obj.object_list,
+            }
         else:
-            from django.core.paginator import Paginator
             per = self.per or 10
-            paginator = Paginator(ctx["object_list"], per)
+            paginator = Paginator(qs, per)
             page_number = self.request.GET.get("page") or 1
             try:
                 page_obj = paginator.page(page_number)
             except InvalidPage:
                 page_obj = paginator.page(1)
-            ctx.update({
+            return {
                 "is_paginated": True,
                 "paginator": paginator,
                 "page_obj": page_obj,
                 "object_list": page_obj.object_list,
-            })
-        return ctx
+            }
+
+
+
+
+
+class TrafficExportView(TrafficListView):
+    """
+    Streams what TrafficListView shows for the same query string (q, sort/dir,
+    mode and day/page/cursor) as XLSX or CSV. scope=all exports every row the
+    search matches instead of just the current page.
+    """
+    http_method_names = ["get"]
+    export_chunk_size = 2000
+
+    export_columns = [
+        ("boatType",    "Type"),
+        ("name",        "Name"),
+        ("trDate",      "Date"),
+        ("trTime",      "Time"),
+        ("direction",   "Direction"),
+        ("passengers",  "Passengers"),
+        ("purpose",     "Purpose"),
+        ("edr",         "E.R.Date"),
+        ("etr",         "E.R.Time"),
+        ("trComments",  "Comments"),
+        ("berth",       "Berth"),
+        ("occurred_at", "Occurred at"),
+    ]
+
+    def get(self, request, *args, **kwargs):
+        fmt = "csv" if request.GET.get("format") == "csv" else "xlsx"
+        rows = self.export_rows()
+        header = [label for _, label in self.export_columns]
+        stamp = timezone.localtime().strftime("%Y%m%d-%H%M")
+
+        if fmt == "csv":
+            response = StreamingHttpResponse(iter_csv(header, rows),
+                                             content_type="text/csv; charset=utf-8")
+        else:
+            response = StreamingHttpResponse(
+                iter_xlsx(header, rows, sheet_name="Traffic"),
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        response["Content-Disposition"] = f'attachment; filename="traffic-{stamp}.{fmt}"'
+        return response
+
+    def export_rows(self):
+        qs = self.get_queryset()
+        if self.request.GET.get("scope") != "all":
+            qs = self.paginate_traffic(qs)["object_list"]
+
+        fields = [field for field, _ in self.export_columns]
+        at = fields.index("occurred_at")
+        if isinstance(qs, list):
+            # cursor pages are already fetched (at most MAX_PER rows)
+            values = ([getattr(obj, f) for f in fields] for obj in qs)
+        else:
+            values = (list(row) for row in
+                      qs.values_list(*fields).iterator(chunk_size=self.export_chunk_size))
+        for row in values:
+            if row[at] is not None:
+                # spreadsheets have no time zones: export local wall-clock time
+                row[at] = timezone.localtime(row[at]).replace(tzinfo=None)
+            yield row
 
 
 
@@ -433,16 +691,25 @@ class PendingDeletionsView(BaseListCreateView):
     ]
 
     row_partial  = "lists/pending_deletions_/_row.html"
+    live_list    = "pending"
+    cache_models = (Boat,)   # every pending boat, paginated in memory
     form_partial = "lists/pending_deletions_/empty_form.html"
+    fragment_fields = ("id", "boatType", "name", "berth", "deleted_at", "archive_deadline")
+
+    batch_actions = [
+        {"label": "Undo selected", "url": reverse_lazy("boat-batch-cancel-delete"),
+         "confirm": "Restore the selected boats to the main list?"},
+        {"label": "Archive selected now", "url": reverse_lazy("boat-batch-archive"),
+         "confirm": "Archive the selected boats now?"},
+    ]
 
     def get_queryset(self):
         qs = super().get_queryset()
         # Only deleted and not yet archived
-        qs = qs.filter(deleted=True, archived=False).order_by('-deleted_at', '-created')
-        q = self.request.GET.get("q", "").strip()
-        if q:
-            # reuse same simple q search against name/berth/boatType
-            qs = qs.filter(Q(name__icontains=q) | Q(berth__icontains=q) | Q(boatType__icontains=q))
+        # (q-search over search_fields is already applied by the base class)
+        # Rows carry data-archive-at (Boat.archive_deadline); the archiving
+        # itself is done server-side by `manage.py archive_expired`
+        qs = qs.pending_deletions()
         return qs.order_by('-deleted_at', '-created')
 
 # Archive endpoint (set archived=True)
@@ -457,22 +724,13 @@ def boat_archive(request, pk):
     if not boat.deleted:
         return JsonResponse({'ok': False, 'error': 'not_deleted'}, status=400)
 
-    # lightly retry on sqlite lock
-    for attempt in range(1, 4):
-        try:
-            with transaction.atomic():
-                updated = Boat.objects.filter(pk=pk, deleted=True, archived=False).update(
-                    archived=True,
-                    archived_at=timezone.now()
-                )
-            return JsonResponse({'ok': bool(updated), 'id': pk})
-        except OperationalError as exc:
-            if 'locked' in str(exc).lower() and attempt < 3:
-                import time;
-                time.sleep(0.05 * attempt)
-                continue
-            raise
-    return None
+    updated = writes.run(
+        _update_boat, pk, "archived",
+        Boat.objects.filter(pk=pk, deleted=True, archived=False),
+        archived=True,
+        archived_at=timezone.now(),
+    )
+    return JsonResponse({'ok': bool(updated), 'id': pk})
 
 
 # Cancel pending deletion (unset deleted flag)
@@ -484,21 +742,216 @@ def boat_cancel_delete(request, pk):
     if not boat.deleted:
         return JsonResponse({'ok': False, 'error': 'not_deleted'}, status=400)
 
-    # retry lightly for sqlite lock in dev
-    for attempt in range(1, 4):
+    updated = writes.run(
+        _update_boat, pk, "restored",
+        Boat.objects.filter(pk=pk, deleted=True),
+        deleted=False,
+        deleted_at=None,
+    )
+    return JsonResponse({'ok': bool(updated), 'id': pk})
+
+
+def _batch_ids(request):
+    """pks from a JSON body {"ids": [...]} or repeated form fields ids=1&ids=2."""
+    if request.content_type == "application/json":
         try:
-            with transaction.atomic():
-                updated = Boat.objects.filter(pk=pk, deleted=True).update(
-                    deleted=False,
-                    deleted_at=None
-                )
-            return JsonResponse({'ok': bool(updated), 'id': pk})
-        except OperationalError as e:
-            if 'locked' in str(e).lower() and attempt < 3:
-                import time; time.sleep(0.05 * attempt)
-                continue
-            raise
-    return None
+            ids = json.loads(request.body or b"{}").get("ids", [])
+        except (ValueError, AttributeError):
+            return None
+    else:
+        ids = request.POST.getlist("ids")
+    if not isinstance(ids, list) or len(ids) > boat_batch.MAX_IDS:
+        return None
+    try:
+        return [int(pk) for pk in ids]
+    except (TypeError, ValueError):
+        return None
+
+
+def _batch_transition(request, action):
+    pks = _batch_ids(request)
+    if not pks:
+        return JsonResponse({"ok": False, "error": "bad_ids"}, status=400)
+    outcomes = boat_batch.apply(action, pks)
+    done = sum(1 for outcome in outcomes.values() if outcome == boat_batch.DONE)
+    return JsonResponse({
+        "ok": True,
+        "done": done,
+        "results": {str(pk): outcome for pk, outcome in outcomes.items()},
+    })
+
+
+# Batch variants of the three endpoints above: POST a list of pks, get an
+# outcome per id (see utils/boat_batch.py)
+@require_POST
+def boat_batch_soft_delete(request):
+    return _batch_transition(request, "soft_delete")
+
+
+@require_POST
+def boat_batch_archive(request):
+    return _batch_transition(request, "archive")
+
+
+@require_POST
+def boat_batch_cancel_delete(request):
+    return _batch_transition(request, "cancel_delete")
+
+
+def _batch_traffic(request):
+    """(pks, BatchTrafficForm) from a JSON body {"ids": [...], "trDate": ...} or form fields."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None, None
+        if not isinstance(data, dict):
+            return None, None
+    else:
+        data = request.POST
+    pks = _batch_ids(request)
+    if pks and len(pks) > traffic_batch.MAX_IDS:
+        pks = None
+    return pks, BatchTrafficForm(data)
+
+
+def _batch_traffic_response(form, result):
+    if not form.is_valid():
+        return JsonResponse({"ok": False, "error": "invalid", "errors": form.errors}, status=400)
+    outcomes, entries = result
+    return JsonResponse({
+        "ok": True,
+        "done": len(entries),
+        "state": form.cleaned_data["direction"],
+        "results": {str(pk): outcome for pk, outcome in outcomes.items()},
+        "entries": {str(entry.trafficBoatId_id): entry.pk for entry in entries},
+    })
+
+
+@require_POST
+def traffic_batch_create(request):
+    """
+    The same movement for several boats (Boat List multi-select): POST ids
+    plus the shared BatchTrafficForm fields; an outcome per id (see
+    utils/traffic_batch.py) and the new entry's id per recorded boat.
+    """
+    pks, form = _batch_traffic(request)
+    if not pks:
+        return JsonResponse({"ok": False, "error": "bad_ids"}, status=400)
+    result = traffic_batch.record(pks, **form.cleaned_data) if form.is_valid() else None
+    return _batch_traffic_response(form, result)
+
+
+# ---- async views: what the ASGI profile routes to (settings.ASYNC_VIEWS, see urls.py) ----
+class AsyncListMixin:
+    """
+    Async GET / POST for a BaseListCreateView. The rows come from the async
+    ORM (through the list cache), so the event loop serves other requests
+    while the database works; Django renders the template afterwards in the
+    request's sync thread, as for any TemplateResponse. POST (the create
+    form) is the sync code, run in that thread.
+    """
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await self.aget_object_list()
+        return self.list_response()
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+
+class AsyncBoatListView(AsyncListMixin, BoatListView):
+    pass
+
+
+class AsyncPendingDeletionsView(AsyncListMixin, PendingDeletionsView):
+    pass
+
+
+class AsyncTrafficListView(AsyncListMixin, TrafficListView):
+    async def aget_object_list(self):
+        qs = await sync_to_async(self.get_queryset)()
+
+        async def paginate():
+            # the paginators are sync (shared with the export): run them in the sync thread
+            return await sync_to_async(self.frozen_page)(qs)
+        self.page_context = await listcache.afetch(type(self).__name__, self.cache_params(),
+                                                   self.cache_models, paginate)
+        return qs
+
+
+class AsyncTrafficCreateView(TrafficCreateView):
+    """
+    The dialog's POST target under ASGI. Validation and the coordinated write
+    run in the sync thread (Django has no async transactions), so queueing
+    for the SQLite writer does not hold up the event loop.
+    """
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, *args, **kwargs):
+        self.object = None
+        form = self.get_form()
+        if not await sync_to_async(form.is_valid)():
+            return self.form_invalid(form)
+        self.object, updated = await writes.arun(self.save_entry, form)
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return JsonResponse({"ok": True, "id": self.object.id, "boat_updated": bool(updated)})
+        return redirect("traffic")
+
+
+@require_POST
+async def atraffic_batch_create(request):
+    pks, form = _batch_traffic(request)
+    if not pks:
+        return JsonResponse({"ok": False, "error": "bad_ids"}, status=400)
+    result = None
+    if await sync_to_async(form.is_valid)():
+        # record() is one coordinated write: run it in the request's sync thread, like writes.arun
+        result = await sync_to_async(traffic_batch.record)(pks, **form.cleaned_data)
+    return _batch_traffic_response(form, result)
+
+
+@require_POST
+async def aboat_soft_delete(request, pk):
+    boat = await aget_object_or_404(Boat, pk=pk)
+    if boat.deleted:
+        return JsonResponse({"ok": False, "error": "already_deleted"}, status=400)
+    await writes.arun(
+        _update_boat, pk, "deleted",
+        Boat.objects.filter(pk=pk, deleted=False),
+        deleted=True,
+        deleted_at=timezone.now(),
+    )
+    return JsonResponse({"ok": True, "id": pk})
+
+
+@require_POST
+async def aboat_archive(request, pk):
+    boat = await aget_object_or_404(Boat, pk=pk)
+    if boat.archived:
+        return JsonResponse({'ok': False, 'error': 'already_archived'}, status=400)
+    if not boat.deleted:
+        return JsonResponse({'ok': False, 'error': 'not_deleted'}, status=400)
+    updated = await writes.arun(
+        _update_boat, pk, "archived",
+        Boat.objects.filter(pk=pk, deleted=True, archived=False),
+        archived=True,
+        archived_at=timezone.now(),
+    )
+    return JsonResponse({'ok': bool(updated), 'id': pk})
+
+
+@require_POST
+async def aboat_cancel_delete(request, pk):
+    boat = await aget_object_or_404(Boat, pk=pk)
+    if not boat.deleted:
+        return JsonResponse({'ok': False, 'error': 'not_deleted'}, status=400)
+    updated = await writes.arun(
+        _update_boat, pk, "restored",
+        Boat.objects.filter(pk=pk, deleted=True),
+        deleted=False,
+        deleted_at=None,
+    )
+    return JsonResponse({'ok': bool(updated), 'id': pk})
 
 
 # Helper permission — change to appropriate condition for your app
@@ -511,13 +964,295 @@ def update(request, pk):
     if request.method == 'POST':
         form = NewBoatForm(request.POST, instance=boat)
         if form.is_valid():
-            form.save()
+            writes.run(form.save)
             return redirect('boats')
     return render(request, 'update.html', {'boat':boat, 'form': form})
 
 def delete(request, pk):
     boat = Boat.objects.get(id = pk)
     if request.method == 'POST':
-        boat.delete()
+        writes.run(boat.delete)
         return redirect('boats')
-    return render(request, 'delete.html', {'boat':boat})
\ No newline at end of file
+    return render(request, 'delete.html', {'boat':boat})
+
+
+def metrics(request):
+    """Prometheus text-format metrics of this process (staff only)."""
+    if not (request.user.is_active and request.user.is_staff):
+        return HttpResponseForbidden()
+    counters = writes.stats()
+    extra = [
+        ("traffic_writes_total", "counter", "Coordinated write transactions committed.", counters["writes"]),
+        ("traffic_write_lock_waits_total", "counter", "Writes that queued for the writer lock.",
+         counters["lock_waits"]),
+        ("traffic_write_lock_wait_seconds_total", "counter", "Time spent queued for the writer lock.",
+         counters["lock_wait_seconds"]),
+        ("traffic_write_retries_total", "counter", "Write attempts retried after a locked database.",
+         counters["retries"]),
+        ("traffic_write_failures_total", "counter", "Writes that gave up after every retry.",
+         counters["failures"]),
+    ]
+    cached = listcache.stats()
+    extra += [
+        ("traffic_list_cache_hits_total", "counter", "List results served from this process's cache.",
+         cached["hits"]),
+        ("traffic_list_cache_misses_total", "counter", "List results not in this process's cache.",
+         cached["misses"]),
+        ("traffic_list_cache_evictions_total", "counter", "List cache entries evicted (least recently used).",
+         cached["evictions"]),
+        ("traffic_list_cache_bytes", "gauge", "Pickled size of the list cache entries.", cached["bytes"]),
+    ]
+    return HttpResponse(perf.REGISTRY.prometheus(extra=extra),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def slow_queries(request):
+    """The SQL behind traffic_slow_query_seconds: this process's slowest queries per URL name (staff only)."""
+    if not (request.user.is_active and request.user.is_staff):
+        return HttpResponseForbidden()
+    lines = []
+    for view, queries in perf.REGISTRY.slowest().items():
+        lines.append(view)
+        lines.extend(f"  {rank}. {seconds * 1000:9.1f} ms  {sql}" for rank, (seconds, sql) in enumerate(queries, 1))
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; charset=utf-8")
+
+
+def import_data(request):
+    """
+    Upload a legacy traffic log / boat registry and show the import report.
+    Files over IMPORT_INLINE_MAX_BYTES are imported in the background
+    (importer.start_job) and followed at import_status.
+    """
+    report = None
+    form = ImportForm()
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload, kind, dry_run = (form.cleaned_data[k] for k in ('file', 'kind', 'dry_run'))
+            if upload.size > settings.IMPORT_INLINE_MAX_BYTES:
+                job = importer.start_job(upload, kind, dry_run=dry_run)
+                return redirect('import-status', pk=job.pk)
+            report = importer.IMPORTERS[kind](upload, upload.name, dry_run=dry_run)
+    return render(request, 'import.html', {
+        'form': form,
+        'report': report,
+        'kind': form.cleaned_data['kind'] if report else None,
+        'dry_run': form.cleaned_data['dry_run'] if report else None,
+    })
+
+
+def import_status(request, pk):
+    """Progress, then the report, of a background import; the page reloads itself until it ends."""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return render(request, 'import.html', {
+        'form': ImportForm(),
+        'job': job,
+        'report': job,
+        'kind': job.kind,
+        'dry_run': job.dry_run,
+    })
+
+
+def occupancy_view(request):
+    """
+    Which boats were in / out / in repair at a given moment (default: now),
+    replayed from the traffic log (utils/occupancy.py). Boats archived by then
+    are left out; boats in the cold tier that were not are included. Also
+    answers JSON when the client prefers it.
+    """
+    form = OccupancyForm(request.GET or None)
+    at, state = timezone.now().replace(second=0, microsecond=0), ""
+    if form.is_bound and form.is_valid():
+        at = form.cleaned_data["at"] or at
+        state = form.cleaned_data["state"]
+    else:
+        form = OccupancyForm(request.GET or None, initial={"at": timezone.localtime(at)})
+
+    result = occupancy.as_of(at)
+    registered = [
+        *Boat.all_objects.exclude(archived=True, archived_at__lte=at).values_list("pk", flat=True),
+        *ColdBoat.objects.filter(archived_at__gt=at).values_list("pk", flat=True),
+    ]
+    states = {pk: result.states[pk] for pk in registered if pk in result.states}
+    counts = {value: 0 for value in State.values}
+    for value in states.values():
+        counts[value] = counts.get(value, 0) + 1
+    unknown = len(registered) - len(states)
+    selected = [pk for pk, value in states.items() if not state or value == state]
+
+    if request.get_preferred_type(["text/html", "application/json"]) == "application/json":
+        payload = {
+            "at": at,
+            "counts": counts,
+            "unknown": unknown,
+            "states": {str(pk): states[pk] for pk in sorted(selected)},
+            "snapshot": result.snapshot,
+            "replayed": result.replayed,
+        }
+        return HttpResponse(orjson.dumps(payload), content_type="application/json")
+
+    boats = sorted([*Boat.all_objects.filter(pk__in=selected), *ColdBoat.objects.filter(pk__in=selected)],
+                   key=lambda boat: (boat.berth, boat.name))
+    return render(request, "occupancy.html", {
+        "form": form,
+        "at": at,
+        "state": state,
+        "counts": [(value, label, counts[value]) for value, label in State.choices],
+        "unknown": unknown,
+        "rows": [(boat, states[boat.pk]) for boat in boats],
+        "result": result,
+    })
+
+
+HISTORY_COLUMNS = ("id", "occurred_at", "trDate", "trTime", "boatType", "name", "berth",
+                   "direction", "passengers", "purpose", "trComments", "trafficBoatId")
+HISTORY_PER_PAGE = 50
+
+
+def history(request):
+    """
+    The whole traffic log, hot and cold tiers (utils/tiering.py) as one list,
+    newest first, and the boats of both tiers matching `q`. The list pages
+    only read the hot tables; this is where moved rows stay findable.
+    """
+    form = HistoryForm(request.GET or None)
+    params = form.cleaned_data if form.is_valid() else {}
+    q, start, end = params.get("q"), params.get("start"), params.get("end")
+
+    def midnight(day):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+    def entries(model, tier):
+        # same day rule as the traffic list: occurred_at, else trDate
+        qs = model.objects.all()
+        if q:
+            qs = qs.filter(Q(name__icontains=q) | Q(berth__icontains=q))
+        if start:
+            qs = qs.filter(Q(occurred_at__gte=midnight(start)) | Q(occurred_at__isnull=True, trDate__gte=start))
+        if end:
+            qs = qs.filter(Q(occurred_at__lt=midnight(end + timedelta(days=1)))
+                           | Q(occurred_at__isnull=True, trDate__lte=end))
+        return qs.values(*HISTORY_COLUMNS, tier=Value(tier))
+
+    log = entries(TrafficEntry, "hot").union(entries(ColdTrafficEntry, "cold"), all=True)
+    log = log.order_by(F("occurred_at").desc(nulls_last=True), F("trDate").desc(nulls_last=True), "-id")
+    page = Paginator(log, HISTORY_PER_PAGE).get_page(request.GET.get("page"))
+
+    boats = []
+    if q:
+        match = Q(name__icontains=q) | Q(berth__icontains=q)
+        boats = sorted([*Boat.all_objects.filter(match)[:HISTORY_PER_PAGE],
+                        *ColdBoat.objects.filter(match)[:HISTORY_PER_PAGE]],
+                       key=lambda boat: (boat.name, boat.berth))
+    query = request.GET.copy()
+    query.pop("page", None)
+    return render(request, "history.html", {
+        "form": form,
+        "page": page,
+        "boats": boats,
+        "query": query.urlencode(),
+    })
+
+
+def occupancy_report(request):
+    """
+    Occupancy per berth / boat type per day or hour over a date range
+    (utils/reports.py): a summary page, the full series as JSON when the
+    client prefers it, or CSV with format=csv.
+    """
+    today = timezone.localdate()
+    data = request.GET.copy()
+    # the last year per berth, by day, for whatever the query string leaves out
+    for name, value in (("start", today - timedelta(days=364)), ("end", today),
+                        ("by", "berth"), ("resolution", "day")):
+        data.setdefault(name, value)
+    form = OccupancyReportForm(data)
+    if not form.is_valid():
+        return render(request, "occupancy_report.html", {"form": form}, status=400)
+
+    params = form.cleaned_data
+    report = reports.cached_occupancy_report(params["start"], params["end"],
+                                             by=params["by"], resolution=params["resolution"])
+    label = "%Y-%m-%d %H:%M" if report.resolution == "hour" else "%Y-%m-%d"
+    buckets = [timezone.localtime(b).strftime(label) for b in report.buckets]
+
+    if request.GET.get("format") == "csv":
+        header = [dict(form.fields["by"].choices)[report.by]] + buckets
+        response = StreamingHttpResponse(iter_csv(header, ([key] + row for key, row in zip(report.keys, report.rows))),
+                                         content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = (f'attachment; filename="occupancy-{report.by}-{report.resolution}-'
+                                           f'{report.start:%Y%m%d}-{report.end:%Y%m%d}.csv"')
+        return response
+
+    stats = {name: getattr(report, name) for name in
+             ("movements", "intervals", "carried_in", "still_in", "unmatched_in", "unmatched_out")}
+    if request.get_preferred_type(["text/html", "application/json"]) == "application/json":
+        payload = {
+            "start": report.start, "end": report.end, "by": report.by, "resolution": report.resolution,
+            "buckets": buckets,
+            "series": dict(zip(report.keys, report.rows)),
+            "stats": stats,
+        }
+        return HttpResponse(orjson.dumps(payload), content_type="application/json")
+
+    return render(request, "occupancy_report.html", {
+        "form": form,
+        "report": report,
+        "summary": report.summary(),
+        "stats": stats,
+    })
+
+
+def typeahead_view(request):
+    """
+    Boats whose name (or a word of it) or berth starts with `q`, best first,
+    from the in-process prefix index (utils/typeahead.py), plus the latest
+    movements of the first few. `q` is echoed back so the client can drop
+    answers to keystrokes it has moved past.
+    """
+    q = request.GET.get("q", "")[:100]
+    limit = getattr(settings, "TYPEAHEAD_LIMIT", 10)
+    try:
+        limit = max(1, min(int(request.GET.get("limit", limit)), limit))
+    except ValueError:
+        pass
+    boats = typeahead.search_boats(q, limit)
+
+    recent = []
+    if boats:
+        # one LIMITed query over the best few matches, newest first
+        recent = list(
+            TrafficEntry.objects.filter(trafficBoatId__in=[b.id for b in boats[:TYPEAHEAD_RECENT_BOATS]],
+                                        occurred_at__isnull=False)
+            .order_by("-occurred_at", "-id")
+            .values("id", "trafficBoatId", "direction", "occurred_at")[:limit]
+        )
+    payload = {
+        "q": q,
+        "boats": [vars(b) for b in boats],
+        "traffic": [{"id": e["id"], "boat": e["trafficBoatId"], "direction": e["direction"],
+                     "occurred_at": e["occurred_at"]} for e in recent],
+    }
+    response = HttpResponse(orjson.dumps(payload), content_type="application/json")
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+async def live_events(request):
+    """
+    Server-sent events for the open list pages (utils/live.py). Needs the
+    ASGI server (see control/asgi.py): under WSGI a stream would hold a
+    worker thread per client, so it answers 204, which tells EventSource
+    not to reconnect.
+    """
+    if not live.enabled() or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        since = None
+    response = StreamingHttpResponse(live.stream(since), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass events through unbuffered
+    return response